@@ -0,0 +1,326 @@
+"""Materialized aggregates behind the analytics endpoints
+
+The cube is built in one pass over the columnar transaction store and holds
+count, sum and sum-of-squares for every
+month x category x region x segment x campaign window cell, exact amount
+distributions overall and per category, region, segment and campaign
+period (for median/min/max and percentiles), an amount quantile sketch of
+every row (for the ?approx=true median), the dense category
+x day series behind the trend windows (time_series.TimeSeries) and the
+per-customer feature table (customer_features.CustomerFeatures).
+Campaign windows are the elementary date intervals of a CampaignRegistry,
+so every registered campaign's periods are unions of window cells.
+Every dashboard metric is answered from these arrays, so endpoint latency
+depends on the number of cells and customers, not on the number of rows.
+New batches are folded in with add(), growing the axes when a batch brings
+new months, categories, regions, segments or customers.
+
+A lazy cube (one per filtered request) aggregates each of its PARTS only
+when a panel first reads it, and can take its cells from the full cube when
+the filters fall on cube axes (slice_cells), so a filtered panel pays only
+for the structures it reads.
+"""
+
+import numpy as np
+import pandas as pd
+
+from campaigns import CAMPAIGN_PERIOD_GROUPS
+from customer_features import CustomerFeatures
+from distributions import ValueCounts
+from sketches import QuantileSketch
+from time_series import TimeSeries
+
+DIMENSIONS = ['month', 'category', 'region', 'segment', 'window']
+
+# Groupings with an exact amount distribution: every row, a categorical dimension, or 'period'
+# (one group per campaign and CAMPAIGN_PERIOD_GROUPS entry, campaign by campaign)
+DISTRIBUTION_GROUPINGS = ['all', 'category', 'region', 'segment', 'period']
+
+# Cube attribute holding the labels of each categorical dimension
+AXIS_LABELS = {'category': 'categories', 'region': 'regions', 'segment': 'segments'}
+
+# Parts of the cube aggregated from its rows, with the attributes each one sets
+PARTS = {
+    'cells': ['count', 'sum_cents', 'sum_squares'],
+    'amounts': ['amounts', 'amount_sketch'],
+    'series': ['series'],
+    'customers': ['customers'],
+}
+_PART_OF = {attribute: part for part, attributes in PARTS.items() for attribute in attributes}
+
+
+def _expand_axis(array, axis, positions, size, fill=0):
+    """Copy of array with axis grown to size, the existing entries placed at positions"""
+    shape = list(array.shape)
+    shape[axis] = size
+    expanded = np.full(shape, fill, dtype=array.dtype)
+    index = [slice(None)] * array.ndim
+    index[axis] = positions
+    expanded[tuple(index)] = array
+    return expanded
+
+
+def _days(transactions):
+    """Day number (days since 1970-01-01) of every store row"""
+    return transactions['transaction_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+class AggregateCube:
+    def __init__(self, transactions, n_customers, campaigns, lazy=False):
+        """Aggregate store rows; lazy=True defers every part of PARTS until one of its attributes is read"""
+        self.campaigns = campaigns
+        self.n_windows = campaigns.n_windows
+        month_code = transactions['month_code'].to_numpy()
+        first_month = int(month_code.min()) if len(month_code) else 0
+        last_month = int(month_code.max()) if len(month_code) else -1
+
+        self.month_codes = np.arange(first_month, last_month + 1, dtype=np.int16)
+        self.categories = transactions['category'].cat.categories
+        self.regions = transactions['region'].cat.categories
+        self.segments = transactions['customer_segment'].cat.categories
+        self.shape = (len(self.month_codes), len(self.categories), len(self.regions), len(self.segments), self.n_windows)
+
+        # Rows and unbuilt parts; None once every part is built
+        self._pending = {'transactions': transactions, 'n_customers': n_customers, 'parts': set(PARTS), 'codes': None}
+        if not lazy:
+            self.build()
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set yet, i.e. the parts of a lazy cube not built so far
+        pending = self.__dict__.get('_pending')
+        if pending is None or _PART_OF.get(name) not in pending['parts']:
+            raise AttributeError(name)
+        self.build([_PART_OF[name]])
+        return self.__dict__[name]
+
+    def build(self, parts=PARTS):
+        """Aggregate the given parts (default all) from the cube's rows, if not built yet"""
+        pending = self._pending
+        parts = [part for part in parts if pending is not None and part in pending['parts']]
+        if not parts:
+            return
+        if pending['codes'] is None:
+            transactions = pending['transactions']
+            # Axes are the store's categories, so the rows' category codes are cube codes
+            pending['codes'] = {
+                'month': transactions['month_code'].to_numpy() - (int(self.month_codes[0]) if len(self.month_codes) else 0),
+                'category': transactions['category'].cat.codes.to_numpy(),
+                'region': transactions['region'].cat.codes.to_numpy(),
+                'segment': transactions['customer_segment'].cat.codes.to_numpy(),
+                'window': self.campaigns.windows(transactions['transaction_date'].to_numpy()),
+                'cents': transactions['amount_cents'].to_numpy(),
+                'days': _days(transactions),
+                'customer': transactions['customer_code'].to_numpy(),
+            }
+        for part in parts:
+            getattr(self, f'_build_{part}')(pending['n_customers'], **pending['codes'])
+            pending['parts'].discard(part)
+        if not pending['parts']:
+            self._pending = None
+
+    def _build_cells(self, n_customers, month, category, region, segment, window, cents, **_):
+        amount = cents / 100
+        cell = np.ravel_multi_index((month, category, region, segment, window), self.shape)
+        size = int(np.prod(self.shape))
+        self.count = np.bincount(cell, minlength=size).reshape(self.shape)
+        self.sum_cents = np.bincount(cell, weights=cents, minlength=size).round().astype(np.int64).reshape(self.shape)
+        self.sum_squares = np.bincount(cell, weights=amount * amount, minlength=size).astype(np.float64).reshape(self.shape)
+
+    def _build_amounts(self, n_customers, category, region, segment, window, cents, **_):
+        # Exact distributions of amounts for median, min, max and percentiles
+        self.amounts = self._amount_tables(category, region, segment, window, cents)
+        self.amount_sketch = QuantileSketch(1)
+        self._sketch_amounts(cents)
+
+    def _build_series(self, n_customers, category, cents, days, **_):
+        self.series = TimeSeries(len(self.categories))
+        self.series.add(category, days, cents)
+
+    def _build_customers(self, n_customers, category, region, segment, window, cents, days, customer, **_):
+        # Per-customer features, with presence per region and segment
+        self.customers = CustomerFeatures(n_customers, len(self.categories), self.campaigns,
+                                          len(self.regions), len(self.segments))
+        self.customers.add(customer, category, region, segment, window, days, cents, self.categories)
+
+    def slice_cells(self, other, selections):
+        """Take the cells from other, a cube over a superset of this cube's rows, instead of aggregating the rows
+
+        Valid when the rows are exactly other's rows with the selected labels:
+        selections maps dimensions to accepted labels (month codes for
+        'month'), so every cell of other holds all of its rows or none.
+        Returns False, leaving the cells to be aggregated, when a label of
+        this cube is not on other's axes.
+        """
+        own = {'month': self.month_codes, **{name: getattr(self, labels) for name, labels in AXIS_LABELS.items()}}
+        theirs = {'month': other.month_codes, **{name: getattr(other, labels) for name, labels in AXIS_LABELS.items()}}
+        positions = [pd.Index(theirs[name]).get_indexer(own[name]) for name in DIMENSIONS[:-1]]
+        if any((p < 0).any() for p in positions):
+            return False
+
+        keep = np.ones(self.shape, dtype=bool)
+        for name, accepted in selections.items():
+            shape = [1] * len(self.shape)
+            shape[DIMENSIONS.index(name)] = -1
+            keep &= pd.Index(own[name]).isin(accepted).reshape(shape)
+        index = np.ix_(*positions, np.arange(self.n_windows))
+        self.count = np.where(keep, other.count[index], 0)
+        self.sum_cents = np.where(keep, other.sum_cents[index], 0)
+        self.sum_squares = np.where(keep, other.sum_squares[index], 0.0)
+        if self._pending is not None:
+            self._pending['parts'].discard('cells')
+            if not self._pending['parts']:
+                self._pending = None
+        return True
+
+    def add(self, transactions, n_customers):
+        """Fold a batch of store rows into the cube in place
+
+        Work is proportional to the batch, plus the cube and customer arrays
+        when an axis has to grow. customer_code must index the same customer
+        space as the rows already in the cube.
+        """
+        self.build()
+        self.customers.grow(n_customers)
+        if not len(transactions):
+            return
+        month_code = transactions['month_code'].to_numpy()
+        self._grow_months(int(month_code.min()), int(month_code.max()))
+        category = self._axis_codes('category', transactions['category'])
+        region = self._axis_codes('region', transactions['region'])
+        segment = self._axis_codes('segment', transactions['customer_segment'])
+        window = self.campaigns.windows(transactions['transaction_date'].to_numpy())
+        cents = transactions['amount_cents'].to_numpy()
+        amount = cents / 100
+
+        # Accumulate only into the cells the batch touches
+        cell = np.ravel_multi_index((month_code - self.month_codes[0], category, region, segment, window), self.shape)
+        cells, inverse = np.unique(cell, return_inverse=True)
+        self.count.reshape(-1)[cells] += np.bincount(inverse)
+        self.sum_cents.reshape(-1)[cells] += np.bincount(inverse, weights=cents).round().astype(np.int64)
+        self.sum_squares.reshape(-1)[cells] += np.bincount(inverse, weights=amount * amount)
+
+        for grouping, table in self._amount_tables(category, region, segment, window, cents).items():
+            self.amounts[grouping].add(table)
+        self._sketch_amounts(cents)
+        days = _days(transactions)
+        self.series.add(category, days, cents)
+
+        self.customers.add(transactions['customer_code'].to_numpy(), category, region, segment, window,
+                           days, cents, self.categories)
+
+    def merge(self, other, customer_positions):
+        """Add another cube's partial aggregates into this one in place
+
+        customer_positions maps other's customer codes into this cube's
+        customer space. Axes are aligned by label and grown as needed;
+        customer features are merged the same way, region/segment coming from
+        other when it has them, as if its rows came after this cube's. Both cubes must use the same campaigns.
+        """
+        if other.campaigns != self.campaigns:
+            raise ValueError("Cannot merge cubes built for different campaign registries")
+        self.build()
+        customer_positions = np.asarray(customer_positions, dtype=np.int64)
+        self.customers.grow(int(customer_positions.max()) + 1 if len(customer_positions) else 0)
+        if len(other.month_codes):
+            self._grow_months(int(other.month_codes[0]), int(other.month_codes[-1]))
+        months = np.searchsorted(self.month_codes, other.month_codes)
+        categories = self._axis_positions('category', other.categories)
+        regions = self._axis_positions('region', other.regions)
+        segments = self._axis_positions('segment', other.segments)
+
+        index = np.ix_(months, categories, regions, segments, np.arange(self.n_windows))
+        self.count[index] += other.count
+        self.sum_cents[index] += other.sum_cents
+        self.sum_squares[index] += other.sum_squares
+        group_positions = {'category': categories, 'region': regions, 'segment': segments}
+        for grouping, table in other.amounts.items():
+            self.amounts[grouping].add(table, group_positions.get(grouping))
+        self.amount_sketch.counts += other.amount_sketch.counts
+        self.series.merge(other.series, categories)
+
+        self.customers.merge(other.customers, customer_positions, categories, regions, segments)
+
+    def _amount_tables(self, category, region, segment, window, cents):
+        """ValueCounts of the amounts for every DISTRIBUTION_GROUPINGS entry"""
+        tables = {'all': ValueCounts.from_values(1, 0, cents)}
+        for grouping, codes in [('category', category), ('region', region), ('segment', segment)]:
+            tables[grouping] = ValueCounts.from_values(len(getattr(self, AXIS_LABELS[grouping])), codes, cents)
+        # Campaign c's groups are c * 3 + its CAMPAIGN_PERIOD_GROUPS index
+        groups_per_campaign = len(CAMPAIGN_PERIOD_GROUPS)
+        tables['period'] = ValueCounts.concatenate([
+            ValueCounts.from_values(groups_per_campaign, self.campaigns.period_groups(c).argmax(axis=1)[window], cents)
+            for c in range(len(self.campaigns))
+        ])
+        return tables
+
+    def _sketch_amounts(self, cents):
+        self.amount_sketch.add(np.zeros(len(cents), dtype=np.int64), self.amount_sketch.keys(cents))
+
+    def _grow_months(self, first_month, last_month):
+        if len(self.month_codes):
+            first_month = min(first_month, int(self.month_codes[0]))
+            last_month = max(last_month, int(self.month_codes[-1]))
+        month_codes = np.arange(first_month, last_month + 1, dtype=np.int16)
+        if len(month_codes) == len(self.month_codes):
+            return
+        positions = np.searchsorted(month_codes, self.month_codes)
+        self._expand_cells(0, positions, len(month_codes))
+        self.month_codes = month_codes
+
+    def _axis_codes(self, dimension, values):
+        """Cube axis codes for a categorical batch column"""
+        return self._axis_positions(dimension, values.cat.categories)[values.cat.codes.to_numpy()]
+
+    def _axis_positions(self, dimension, labels):
+        """Positions of labels along a categorical axis, adding unseen labels to the axis in sorted order"""
+        current = getattr(self, AXIS_LABELS[dimension])
+        missing = pd.Index(labels).difference(current)
+        if len(missing):
+            expanded = current.append(missing).sort_values()
+            positions = expanded.get_indexer(current)
+            self._expand_cells(DIMENSIONS.index(dimension), positions, len(expanded))
+            self.customers.recode(dimension, positions, len(expanded))
+            if dimension == 'category':
+                self.series.recode(positions, len(expanded))
+            setattr(self, AXIS_LABELS[dimension], expanded)
+            current = expanded
+        return current.get_indexer(labels)
+
+    def _expand_cells(self, axis, positions, size):
+        self.count = _expand_axis(self.count, axis, positions, size)
+        self.sum_cents = _expand_axis(self.sum_cents, axis, positions, size)
+        self.sum_squares = _expand_axis(self.sum_squares, axis, positions, size)
+        self.shape = self.count.shape
+        if DIMENSIONS[axis] in self.amounts:
+            self.amounts[DIMENSIONS[axis]].regroup(positions, size)
+
+    def category_index(self, names):
+        """Positions of the given category names along the category axis (unknown names are skipped)"""
+        positions = self.categories.get_indexer(pd.Index(names))
+        return positions[positions >= 0]
+
+    def totals(self, keep=(), categories=None, windows=None):
+        """Sum count, sum_cents and sum_squares over every dimension not in keep
+
+        categories and windows optionally restrict those axes before summing.
+        """
+        count, sum_cents, sum_squares = self.count, self.sum_cents, self.sum_squares
+        if categories is not None:
+            index = self.category_index(categories)
+            count, sum_cents, sum_squares = (a[:, index] for a in (count, sum_cents, sum_squares))
+        if windows is not None:
+            index = list(windows)
+            count, sum_cents, sum_squares = (a[..., index] for a in (count, sum_cents, sum_squares))
+
+        axes = tuple(i for i, name in enumerate(DIMENSIONS) if name not in keep)
+        return count.sum(axis=axes), sum_cents.sum(axis=axes), sum_squares.sum(axis=axes)
+
+    def distinct_customers(self, categories, windows):
+        """Exact number of customers with a transaction in any of the given category x window cells"""
+        selected = np.zeros((len(self.categories), self.n_windows), dtype=bool)
+        selected[np.ix_(self.category_index(categories), list(windows))] = True
+        return self.customers.distinct(np.packbits(selected.ravel(), bitorder='little'))
+
+    def median_cents(self):
+        """Exact median amount in cents"""
+        return self.amounts['all'].quantiles([0.5])[0, 0]
@@ -16,6 +16,8 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from campaigns import DEFAULT_CAMPAIGNS
+
 # Set display options for better readability
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
@@ -64,24 +66,17 @@ transactions['month'] = transactions['transaction_date'].dt.month
 transactions['quarter'] = transactions['transaction_date'].dt.quarter
 transactions['day_of_week'] = transactions['transaction_date'].dt.day_name()
 
-# Define campaign periods
-campaign_start = pd.Timestamp('2024-07-01')
-campaign_end = pd.Timestamp('2024-09-30')
-pre_campaign_start = pd.Timestamp('2024-01-01')
-pre_campaign_end = pd.Timestamp('2024-06-30')
-post_campaign_start = pd.Timestamp('2024-10-01')
-post_campaign_end = pd.Timestamp('2024-12-31')
-
-# Add campaign period labels
-def classify_period(date):
-    if date < campaign_start:
-        return 'Pre-Campaign'
-    elif date <= campaign_end:
-        return 'During-Campaign'
-    else:
-        return 'Post-Campaign'
-
-transactions['campaign_period'] = transactions['transaction_date'].apply(classify_period)
+# Define campaign periods (the dashboard's campaign, as registered in campaigns.py)
+campaign = DEFAULT_CAMPAIGNS[0]
+campaign_start = pd.Timestamp(campaign.start)
+campaign_end = pd.Timestamp(campaign.end)
+pre_campaign_start = pd.Timestamp(campaign.baseline_start)
+pre_campaign_end = pd.Timestamp(campaign.baseline_end)
+pre_months = campaign.baseline_months
+campaign_months = campaign.months
+
+# Add campaign period labels: one searchsorted over the period boundaries, stored as a categorical
+transactions['campaign_period'] = campaign.dashboard_periods(transactions['transaction_date'])
 
 print("✓ Date features added: year_month, month, quarter, day_of_week")
 print("✓ Campaign period labels added")
@@ -192,14 +187,14 @@ print("SECTION 7: CAMPAIGN EFFECTIVENESS ANALYSIS")
 print("-" * 80)
 
 # Filter for campaign-relevant categories
-campaign_categories = ['Travel', 'Dining']
+campaign_categories = campaign.categories
 campaign_data = transactions[transactions['category'].isin(campaign_categories)]
 
 print(f"Analyzing {len(campaign_data):,} transactions in Travel & Dining categories")
 print()
 
 # Compare periods
-period_analysis = campaign_data.groupby(['campaign_period', 'category']).agg({
+period_analysis = campaign_data.groupby(['campaign_period', 'category'], observed=True).agg({
     'transaction_id': 'count',
     'amount': ['sum', 'mean'],
     'customer_id': 'nunique'
@@ -214,37 +209,38 @@ print()
 print("CAMPAIGN UPLIFT ANALYSIS:")
 print("-" * 40)
 
-for category in campaign_categories:
-    cat_data = campaign_data[campaign_data['category'] == category]
-    
-    pre_spend = cat_data[cat_data['campaign_period'] == 'Pre-Campaign']['amount'].sum()
-    during_spend = cat_data[cat_data['campaign_period'] == 'During-Campaign']['amount'].sum()
-    post_spend = cat_data[cat_data['campaign_period'] == 'Post-Campaign']['amount'].sum()
-    
-    # Calculate expected baseline (pre-campaign average for 3 months)
-    pre_months = 6
-    campaign_months = 3
-    expected_baseline = (pre_spend / pre_months) * campaign_months
-    
-    incremental = during_spend - expected_baseline
-    uplift_pct = (incremental / expected_baseline * 100) if expected_baseline > 0 else 0
-    
-    print(f"\\n{category} Category:")
-    print(f"  Pre-Campaign (6 months):     ${pre_spend:,.2f}")
-    print(f"  Expected Baseline (3 months): ${expected_baseline:,.2f}")
-    print(f"  During Campaign (3 months):   ${during_spend:,.2f}")
-    print(f"  Post-Campaign (3 months):     ${post_spend:,.2f}")
-    print(f"  Incremental Revenue:          ${incremental:,.2f}")
-    print(f"  Uplift:                       {uplift_pct:.2f}%")
+# Spend per category and period in one grouped pass, then uplift for every category at once
+period_spend = (campaign_data.groupby(['category', 'campaign_period'], observed=False)['amount'].sum()
+                .unstack('campaign_period')
+                .reindex(campaign_categories))
+
+# Expected baseline: pre-campaign monthly average scaled to the campaign length
+expected_baseline = period_spend['Pre-Campaign'] / pre_months * campaign_months
+incremental = period_spend['During-Campaign'] - expected_baseline
+uplift = pd.DataFrame({
+    'pre_campaign': period_spend['Pre-Campaign'],
+    'expected_baseline': expected_baseline,
+    'during_campaign': period_spend['During-Campaign'],
+    'post_campaign': period_spend['Post-Campaign'],
+    'incremental': incremental,
+    'uplift_pct': (incremental / expected_baseline * 100).where(expected_baseline > 0, 0),
+})
+
+for row in uplift.itertuples():
+    print(f"\n{row.Index} Category:")
+    print(f"  Pre-Campaign ({pre_months:g} months):     ${row.pre_campaign:,.2f}")
+    print(f"  Expected Baseline ({campaign_months:g} months): ${row.expected_baseline:,.2f}")
+    print(f"  During Campaign ({campaign_months:g} months):   ${row.during_campaign:,.2f}")
+    print(f"  Post-Campaign:                ${row.post_campaign:,.2f}")
+    print(f"  Incremental Revenue:          ${row.incremental:,.2f}")
+    print(f"  Uplift:                       {row.uplift_pct:.2f}%")
 
 print()
 
 # Overall campaign metrics
-total_pre = campaign_data[campaign_data['campaign_period'] == 'Pre-Campaign']['amount'].sum()
-total_during = campaign_data[campaign_data['campaign_period'] == 'During-Campaign']['amount'].sum()
-total_post = campaign_data[campaign_data['campaign_period'] == 'Post-Campaign']['amount'].sum()
+total_pre, total_during, total_post = period_spend[['Pre-Campaign', 'During-Campaign', 'Post-Campaign']].sum()
 
-expected_baseline_total = (total_pre / 6) * 3
+expected_baseline_total = (total_pre / pre_months) * campaign_months
 incremental_total = total_during - expected_baseline_total
 roi_total = (incremental_total / expected_baseline_total * 100) if expected_baseline_total > 0 else 0
 
@@ -311,7 +307,7 @@ pre_campaign_txns = transactions[
 ]
 
 campaign_by_segment = campaign_txns.groupby('customer_segment')['amount'].sum()
-pre_by_segment = pre_campaign_txns.groupby('customer_segment')['amount'].sum() / 6 * 3
+pre_by_segment = pre_campaign_txns.groupby('customer_segment')['amount'].sum() / pre_months * campaign_months
 
 uplift_by_segment = ((campaign_by_segment - pre_by_segment) / pre_by_segment * 100).round(2)
 
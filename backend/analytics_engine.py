@@ -1,53 +1,388 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from pathlib import Path
-import json
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from aggregate_cube import DISTRIBUTION_GROUPINGS, AggregateCube
+from campaigns import BASELINE, CAMPAIGN, CAMPAIGN_PERIOD_GROUPS, CampaignRegistry
+from customer_features import RESPONSE_THRESHOLD
+from dataset_io import read_transaction_part, read_transactions, transaction_parts
+from store_cache import is_mapped, load_store
+from store_index import FILTER_COLUMNS, StoreIndex
+from time_series import GRANULARITIES, growth_percentage, rolling_mean
+
+# Raw transaction columns the engine reads
+TRANSACTION_COLUMNS = ['transaction_id', 'customer_id', 'transaction_date', 'category', 'amount',
+                       'merchant_name', 'region', 'customer_segment', 'in_campaign_period']
+
+# Percentiles get_amount_distribution reports unless asked for others
+DEFAULT_QUANTILES = [0.25, 0.5, 0.75, 0.9, 0.99]
+HISTOGRAM_SCALES = ['linear', 'log']
+
+# Customer attributes get_campaign_response can break response rates down by ('all': no breakdown)
+RESPONSE_GROUPINGS = ['all', 'segment', 'region']
+
+# Low-cardinality string columns stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ['category', 'region', 'customer_segment', 'merchant_name']
+
+
+def _categorical(values):
+    """Dictionary-encode values with lexicographically sorted categories"""
+    encoded = pd.Categorical(values)
+    encoded = encoded.remove_unused_categories()
+    if not encoded.categories.is_monotonic_increasing:
+        encoded = encoded.reorder_categories(encoded.categories.sort_values())
+    return encoded
+
+
+def _transaction_codes(transaction_ids):
+    """Integer-code transaction ids, parsing the numeric part of TXNnnnnnnnn ids when possible"""
+    if pd.api.types.is_integer_dtype(transaction_ids):
+        return transaction_ids.to_numpy(dtype=np.int64)
+    try:
+        numeric = pc.cast(pc.replace_substring_regex(pa.array(transaction_ids.astype(str)), '^TXN', ''), pa.int64())
+        if not numeric.null_count:
+            return numeric.to_numpy()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    return pd.factorize(transaction_ids)[0].astype(np.int64)
+
+
+def table_output(columns, orient='records'):
+    """Return a table of equal-length columns as a list of records, or as the columns themselves
+
+    orient='columns' keeps NumPy columns intact so they can be serialized
+    straight from their buffers.
+    """
+    if orient == 'columns':
+        return columns
+    values = [column.tolist() if hasattr(column, 'tolist') else list(column) for column in columns.values()]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def month_labels(month_codes):
+    """Format month codes (months since 1970-01) as YYYY-MM strings"""
+    return np.datetime_as_string(np.asarray(month_codes).astype('datetime64[M]'), unit='M')
+
+
+def _whole_months(start_date, end_date, month_codes):
+    """The month codes an inclusive YYYY-MM-DD range covers, or None when a bound falls inside a month"""
+    first, last = -np.inf, np.inf
+    if start_date is not None:
+        start = np.datetime64(start_date, 'D')
+        if start.astype('datetime64[M]').astype('datetime64[D]') != start:
+            return None
+        first = start.astype('datetime64[M]').astype(np.int64)
+    if end_date is not None:
+        end = np.datetime64(end_date, 'D')
+        if (end + 1).astype('datetime64[M]') == end.astype('datetime64[M]'):
+            return None
+        last = end.astype('datetime64[M]').astype(np.int64)
+    return month_codes[(month_codes >= first) & (month_codes <= last)]
+
+
+def normalize_transactions(transactions_df):
+    """Build the compact columnar transaction store and the customer id lookup
+
+    customer_id and transaction_id become integer codes, dates are stored at
+    second resolution with an int16 month code, amounts as integer cents and
+    low-cardinality strings as categoricals. The input frame is not modified.
+    """
+    customer_codes, customer_ids = pd.factorize(transactions_df['customer_id'], sort=True)
+    dates = pd.to_datetime(transactions_df['transaction_date'], format='%Y-%m-%d').dt.as_unit('s')
+
+    store = pd.DataFrame({
+        'transaction_id': _transaction_codes(transactions_df['transaction_id']),
+        'customer_code': customer_codes.astype(np.int32),
+        'transaction_date': dates.to_numpy(),
+        'month_code': dates.to_numpy().astype('datetime64[M]').astype(np.int16),
+        'amount_cents': np.round(transactions_df['amount'].to_numpy(dtype=np.float64) * 100).astype(np.int32),
+    })
+    for column in CATEGORICAL_COLUMNS:
+        if column in transactions_df.columns:
+            store[column] = _categorical(transactions_df[column])
+    if 'in_campaign_period' in transactions_df.columns:
+        store['in_campaign_period'] = transactions_df['in_campaign_period'].to_numpy(dtype=bool)
+
+    return store, np.asarray(customer_ids, dtype=object)
+
+
+def concat_stores(stores):
+    """Concatenate columnar stores, unioning the categories of categorical columns (kept sorted)"""
+    columns = {}
+    for column in stores[0].columns:
+        if isinstance(stores[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = pd.api.types.union_categoricals([store[column] for store in stores], sort_categories=True)
+        else:
+            columns[column] = np.concatenate([store[column].to_numpy() for store in stores])
+    return pd.DataFrame(columns)
+
+
+def _build_partial(part, chunk_size, keep_store, campaigns):
+    """Worker task: stream one transaction part into (store or None, customer ids, cube)"""
+    engine = CreditCardAnalytics.from_chunks(
+        read_transaction_part(part, chunk_size), pd.DataFrame({'customer_id': []}), keep_store, campaigns
+    )
+    return (engine.transactions if keep_store else None), engine.customer_ids, engine.cube
+
 
 class CreditCardAnalytics:
-    def __init__(self, transactions_df, customers_df):
-        self.transactions = transactions_df.copy()
-        self.customers = customers_df.copy()
-        
-        # Convert date columns
-        self.transactions['transaction_date'] = pd.to_datetime(self.transactions['transaction_date'])
-        
-        # Add month and year columns
-        self.transactions['month'] = self.transactions['transaction_date'].dt.to_period('M')
-        self.transactions['year_month'] = self.transactions['transaction_date'].dt.strftime('%Y-%m')
+    def __init__(self, transactions_df, customers_df, campaigns=None):
+        """campaigns is the CampaignRegistry the campaign metrics evaluate (default: the 2024 campaign)"""
+        store, customer_ids = normalize_transactions(transactions_df)
         
-        # Campaign dates
-        self.campaign_start = datetime(2024, 7, 1)
-        self.campaign_end = datetime(2024, 9, 30)
-        self.pre_campaign_start = datetime(2024, 1, 1)
-        self.pre_campaign_end = datetime(2024, 6, 30)
-        self.post_campaign_start = datetime(2024, 10, 1)
-        self.post_campaign_end = datetime(2024, 12, 31)
+        # One pass over the store materializes everything the endpoints need
+        self._attach([store], customer_ids, customers_df, self._new_cube(store, len(customer_ids), campaigns))
+    
+    def _attach(self, store_chunks, customer_ids, customers_df, cube):
+        # Batches added by ingest() stay separate until the full store is needed
+        self._store_chunks = store_chunks
+        self.customer_ids = customer_ids
+        self._customer_lookup = pd.Index(customer_ids)
+        
+        # Customer attributes as categoricals, aligned to the transaction customer codes
+        self.customers = self._customer_frame(customers_df)
+        self.cube = cube
+        self._index = None
+        self._customer_rows = None
+    
+    @property
+    def campaigns(self):
+        return self.cube.campaigns
+    
+    @staticmethod
+    def _new_cube(store, n_customers, campaigns=None, lazy=False):
+        return AggregateCube(store, n_customers, campaigns if campaigns is not None else CampaignRegistry(), lazy)
+    
+    @classmethod
+    def from_store(cls, store, customer_ids, customers_df, campaigns=None):
+        """Build the engine around an already normalized store (e.g. one read from store_cache)"""
+        engine = cls.__new__(cls)
+        engine._attach([store], customer_ids, customers_df, cls._new_cube(store, len(customer_ids), campaigns))
+        return engine
+    
+    @classmethod
+    def from_path(cls, transactions_path, customers_df, cache=True, campaigns=None):
+        """Build the engine from a data file or directory, through the binary store cache unless cache=False"""
+        build = lambda: normalize_transactions(read_transactions(transactions_path))
+        store, customer_ids = load_store(transactions_path, build) if cache else build()
+        return cls.from_store(store, customer_ids, customers_df, campaigns)
+    
+    @classmethod
+    def from_files(cls, transactions_path, customers_df, n_workers=1, chunk_size=500000, keep_store=True,
+                   campaigns=None):
+        """Build the engine from a transactions CSV or partitioned directory, in parallel across processes
+
+        The data is split into n_workers parts (CSV byte ranges or month
+        partitions). Each worker reads and aggregates its part into a partial
+        cube, and the parent merges them, so results match a serial build.
+        """
+        parts = transaction_parts(transactions_path, n_workers)
+        campaigns = campaigns if campaigns is not None else CampaignRegistry()
+        if n_workers > 1 and len(parts) > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                partials = list(pool.map(_build_partial, parts, repeat(chunk_size), repeat(keep_store), repeat(campaigns)))
+        else:
+            partials = [_build_partial(part, chunk_size, keep_store, campaigns) for part in parts]
+        return cls.from_partials(partials, customers_df, campaigns)
+    
+    @classmethod
+    def from_partials(cls, partials, customers_df, campaigns=None):
+        """Merge (store or None, customer ids, cube) partials, in row order, into one engine"""
+        partials = list(partials)
+        customer_ids = pd.Index(np.concatenate([ids for _, ids, _ in partials] or [np.array([], dtype=object)]))
+        customer_ids = np.asarray(customer_ids.unique().sort_values(), dtype=object)
+        lookup = pd.Index(customer_ids)
+        
+        empty_store = normalize_transactions(pd.DataFrame(columns=TRANSACTION_COLUMNS))[0]
+        cube = cls._new_cube(empty_store, len(customer_ids), campaigns)
+        stores = []
+        for store, ids, partial in partials:
+            positions = lookup.get_indexer(ids)
+            cube.merge(partial, positions)
+            if store is not None:
+                stores.append(store.assign(customer_code=positions[store['customer_code'].to_numpy()].astype(np.int32)))
+        
+        engine = cls.__new__(cls)
+        keep_store = bool(partials) and partials[0][0] is not None
+        engine._attach(([concat_stores(stores)] if stores else [empty_store]) if keep_store else None,
+                       customer_ids, customers_df, cube)
+        return engine
+    
+    @classmethod
+    def from_chunks(cls, chunks, customers_df, keep_store=False, campaigns=None):
+        """Build the engine by streaming raw transaction chunks through the cube
+
+        Every metric is answered from the cube's mergeable partial states
+        (counts, sums, sums of squares, the amount value-count table and
+        customer presence bits), so results match a full in-memory build.
+        Unless keep_store is set no rows are retained, and peak memory is
+        one chunk plus the cube.
+        """
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        engine = cls(first if first is not None else pd.DataFrame(columns=TRANSACTION_COLUMNS), customers_df, campaigns)
+        if not keep_store:
+            engine._store_chunks = None
+        for chunk in chunks:
+            engine._append(chunk, copy_cube=False)
+        return engine
+    
+    @property
+    def transactions(self):
+        """The columnar transaction store, consolidating ingested batches on first access"""
+        if self._store_chunks is None:
+            raise RuntimeError("Engine was built by streaming and keeps no transaction store")
+        if len(self._store_chunks) > 1:
+            self._store_chunks = [concat_stores(self._store_chunks)]
+        return self._store_chunks[0]
+    
+    @property
+    def index(self):
+        """Secondary indexes over the transaction store, built on first use"""
+        if self._index is None:
+            self._index = StoreIndex(self.transactions, len(self.customer_ids))
+        return self._index
+    
+    @property
+    def customer_rows(self):
+        """Row of the customer frame for every customer code (-1 without a record), built on first use"""
+        if self._customer_rows is None:
+            codes = self.customers['customer_code'].to_numpy()
+            rows = np.full(len(self.customer_ids), -1, dtype=np.int64)
+            rows[codes[codes >= 0]] = np.flatnonzero(codes >= 0)
+            self._customer_rows = rows
+        return self._customer_rows
+    
+    def filtered(self, start_date=None, end_date=None, region=None, segment=None, category=None, customer_id=None):
+        """Engine over the transactions matching the filters, aggregating only the rows the index selects
+
+        Dates are inclusive YYYY-MM-DD bounds; region, segment, category and
+        customer_id are lists of accepted values. Without filters the engine
+        itself is returned.
+        """
+        if self._store_chunks is None:
+            raise ValueError("Filters need the transaction store, which a streaming build does not keep")
+        values = {'region': region, 'segment': segment, 'category': category}
+        if start_date is None and end_date is None and customer_id is None and all(v is None for v in values.values()):
+            return self
+        
+        store = self.transactions
+        value_codes = {}
+        for name, accepted in values.items():
+            if accepted is not None:
+                codes = store[FILTER_COLUMNS[name]].cat.categories.get_indexer(pd.Index(accepted))
+                value_codes[FILTER_COLUMNS[name]] = codes[codes >= 0]
+        customer_codes = None
+        if customer_id is not None:
+            customer_codes = self._customer_lookup.get_indexer(pd.Index(customer_id))
+            customer_codes = customer_codes[customer_codes >= 0]
+        rows = self.index.select(start_date, end_date, customer_codes, value_codes)
+        
+        # Filters on cube axes select whole cells, which the filtered cube can take from this one
+        selections = None
+        months = _whole_months(start_date, end_date, self.cube.month_codes)
+        if customer_id is None and months is not None:
+            selections = {name: accepted for name, accepted in values.items() if accepted is not None}
+            if start_date is not None or end_date is not None:
+                selections['month'] = months
+        return self._subset(rows, selections)
+    
+    def run_filtered(self, filters, method_name, *args):
+        """Call method_name on the engine filtered by the filters dict (see filtered())"""
+        return getattr(self.filtered(**filters), method_name)(*args)
+    
+    def _subset(self, rows, selections=None):
+        """Engine over the given store rows, with the customer space narrowed to the customers in them
+
+        The cube is lazy, so a panel aggregates only the parts it reads;
+        selections (see AggregateCube.slice_cells) lets it slice its cells
+        from this engine's cube.
+        """
+        store = self.transactions.take(rows)
+        codes, customer_codes = np.unique(store['customer_code'].to_numpy(), return_inverse=True)
+        store['customer_code'] = customer_codes.astype(np.int32)
+        
+        # Re-code the customer frame into the narrowed customer space; the extra slot keeps code -1 at -1
+        positions = np.full(len(self.customer_ids) + 1, -1, dtype=np.int32)
+        positions[codes] = np.arange(len(codes), dtype=np.int32)
+        customers = self.customers[positions[self.customers['customer_code'].to_numpy()] >= 0]
+        
+        engine = self.__class__.__new__(self.__class__)
+        engine._store_chunks = [store]
+        engine.customer_ids = self.customer_ids[codes]
+        engine._customer_lookup = pd.Index(engine.customer_ids)
+        engine.customers = customers.assign(customer_code=positions[customers['customer_code'].to_numpy()])
+        engine.cube = self._new_cube(store, len(codes), self.campaigns, lazy=True)
+        if selections is not None:
+            engine.cube.slice_cells(self.cube, selections)
+        engine._index = None
+        engine._customer_rows = None
+        return engine
+    
+    def _customer_frame(self, customers_df):
+        return customers_df.assign(
+            customer_code=self._customer_lookup.get_indexer(customers_df['customer_id']).astype(np.int32),
+            **{column: _categorical(customers_df[column])
+               for column in ['region', 'customer_segment'] if column in customers_df.columns}
+        )
+    
+    def ingest(self, batch_df, customers_df=None):
+        """Append a batch of raw transactions and update the aggregates incrementally
+
+        Date features are derived for the batch only and the cube is updated
+        from the batch rows, so the cost does not grow with the history.
+        Arrays of the previous state are never modified in place: a shallow
+        copy of the engine taken before ingest keeps serving the old data.
+        customers_df optionally adds records for customers new in the batch.
+        Returns the number of rows ingested.
+        """
+        return self._append(batch_df, customers_df)
+    
+    def _append(self, batch_df, customers_df=None, copy_cube=True):
+        batch, batch_customer_ids = normalize_transactions(batch_df)
+        
+        # Map batch-local customer codes into the engine's customer space, appending unseen customers
+        codes = self._customer_lookup.get_indexer(batch_customer_ids)
+        unseen = codes < 0
+        codes[unseen] = len(self.customer_ids) + np.arange(np.count_nonzero(unseen))
+        batch['customer_code'] = codes[batch['customer_code'].to_numpy()].astype(np.int32)
+        if unseen.any():
+            self.customer_ids = np.concatenate([self.customer_ids, batch_customer_ids[unseen]])
+            self._customer_lookup = pd.Index(self.customer_ids)
+        
+        cube = copy.deepcopy(self.cube) if copy_cube else self.cube
+        cube.add(batch, len(self.customer_ids))
+        
+        if customers_df is not None and len(customers_df):
+            self.customers = pd.concat([self.customers, self._customer_frame(customers_df)], ignore_index=True)
+        if self._store_chunks is not None:
+            self._store_chunks = self._store_chunks + [batch]
+        self.cube = cube
+        self._index = None
+        self._customer_rows = None
+        return len(batch)
     
     def get_overview_metrics(self):
         """Calculate key overview metrics"""
-        total_transactions = len(self.transactions)
-        total_spend = self.transactions['amount'].sum()
-        avg_transaction = self.transactions['amount'].mean()
-        unique_customers = self.transactions['customer_id'].nunique()
-        
-        # Campaign metrics
-        campaign_transactions = self.transactions[
-            (self.transactions['transaction_date'] >= self.campaign_start) &
-            (self.transactions['transaction_date'] <= self.campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]
-        
-        campaign_revenue = campaign_transactions['amount'].sum()
-        
-        # Calculate incremental revenue
-        pre_campaign = self.transactions[
-            (self.transactions['transaction_date'] >= self.pre_campaign_start) &
-            (self.transactions['transaction_date'] <= self.pre_campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]['amount'].sum()
-        
-        expected_baseline = (pre_campaign / 6) * 3  # 6 months pre, 3 months campaign
+        count, sum_cents, _ = self.cube.totals()
+        total_transactions = int(count)
+        total_spend = sum_cents / 100
+        avg_transaction = total_spend / total_transactions if total_transactions else np.nan
+        unique_customers = np.count_nonzero(self.cube.customers.count)
+        
+        # Campaign metrics, summed over the registered campaigns
+        campaign_revenue = expected_baseline = 0
+        for c, campaign in enumerate(self.campaigns):
+            campaign_revenue += self._campaign_totals(c, [CAMPAIGN])[1] / 100
+            
+            # Baseline spend scaled to the campaign's length, e.g. 6 months pre, 3 months campaign
+            pre_campaign = self._campaign_totals(c, [BASELINE])[1] / 100
+            expected_baseline += (pre_campaign / campaign.baseline_months) * campaign.months
         incremental_revenue = campaign_revenue - expected_baseline
         roi_percentage = (incremental_revenue / expected_baseline) * 100 if expected_baseline > 0 else 0
         
@@ -61,191 +396,356 @@ class CreditCardAnalytics:
             'roi_percentage': round(float(roi_percentage), 2)
         }
     
-    def get_spend_by_category(self):
+    def get_spend_by_category(self, orient='records'):
         """Analyze spend by category"""
-        category_analysis = self.transactions.groupby('category').agg({
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean']
-        }).reset_index()
-        
-        category_analysis.columns = ['category', 'transaction_count', 'total_spend', 'avg_transaction']
-        
-        # Add percentage
-        total_spend = category_analysis['total_spend'].sum()
-        category_analysis['spend_percentage'] = (category_analysis['total_spend'] / total_spend * 100).round(2)
+        count, sum_cents, _ = self.cube.totals(keep=['category'])
         
         # Sort by total spend
-        category_analysis = category_analysis.sort_values('total_spend', ascending=False)
-        
-        return category_analysis.to_dict('records')
+        index = np.nonzero(count)[0]
+        index = index[np.argsort(-sum_cents[index], kind='stable')]
+        total_spend = sum_cents[index] / 100
+        
+        return table_output({
+            'category': self.cube.categories[index].tolist(),
+            'transaction_count': count[index],
+            'total_spend': total_spend,
+            'avg_transaction': sum_cents[index] / count[index] / 100,
+            'spend_percentage': np.round(total_spend / total_spend.sum() * 100, 2)
+        }, orient)
     
-    def get_spend_by_region(self):
+    def get_spend_by_region(self, orient='records'):
         """Analyze spend by geographic region"""
-        region_analysis = self.transactions.groupby('region').agg({
-            'customer_id': 'nunique',
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean']
-        }).reset_index()
-        
-        region_analysis.columns = ['region', 'unique_customers', 'transaction_count', 'total_spend', 'avg_transaction']
-        region_analysis = region_analysis.sort_values('total_spend', ascending=False)
-        
-        return region_analysis.to_dict('records')
+        count, sum_cents, _ = self.cube.totals(keep=['region'])
+        unique_customers = self.cube.customers.region_customers()
+        
+        index = np.nonzero(count)[0]
+        index = index[np.argsort(-sum_cents[index], kind='stable')]
+        
+        return table_output({
+            'region': self.cube.regions[index].tolist(),
+            'unique_customers': unique_customers[index],
+            'transaction_count': count[index],
+            'total_spend': sum_cents[index] / 100,
+            'avg_transaction': sum_cents[index] / count[index] / 100
+        }, orient)
     
-    def get_monthly_trends(self):
+    def get_monthly_trends(self, orient='records'):
         """Analyze monthly spend trends"""
-        monthly = self.transactions.groupby(['year_month', 'category']).agg({
-            'transaction_id': 'count',
-            'amount': 'sum'
-        }).reset_index()
-        
-        monthly.columns = ['month', 'category', 'transaction_count', 'total_spend']
-        
-        return monthly.to_dict('records')
-    
-    def get_campaign_effectiveness(self):
-        """Analyze campaign effectiveness (Pre vs During vs Post)"""
-        # Filter for campaign-relevant categories
-        relevant_transactions = self.transactions[
-            self.transactions['category'].isin(['Travel', 'Dining'])
-        ].copy()
-        
-        # Assign campaign period
-        def assign_period(date):
-            if date < self.campaign_start:
-                return 'Pre-Campaign'
-            elif date <= self.campaign_end:
-                return 'During-Campaign'
-            else:
-                return 'Post-Campaign'
-        
-        relevant_transactions['campaign_period'] = relevant_transactions['transaction_date'].apply(assign_period)
-        
-        # Analyze by period and category
-        campaign_analysis = relevant_transactions.groupby(['campaign_period', 'category']).agg({
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean'],
-            'customer_id': 'nunique'
-        }).reset_index()
-        
-        campaign_analysis.columns = [
-            'campaign_period', 'category', 'transaction_count', 
-            'total_spend', 'avg_transaction', 'unique_customers'
-        ]
-        
-        # Calculate uplift for during-campaign period
-        results = []
-        for category in ['Travel', 'Dining']:
-            cat_data = campaign_analysis[campaign_analysis['category'] == category]
-            
-            pre = cat_data[cat_data['campaign_period'] == 'Pre-Campaign']
-            during = cat_data[cat_data['campaign_period'] == 'During-Campaign']
-            post = cat_data[cat_data['campaign_period'] == 'Post-Campaign']
+        count, sum_cents, _ = self.cube.totals(keep=['month', 'category'])
+        month_index, category_index = np.nonzero(count)
+        
+        return table_output({
+            'month': month_labels(self.cube.month_codes[month_index]).tolist(),
+            'category': self.cube.categories[category_index].tolist(),
+            'transaction_count': count[month_index, category_index],
+            'total_spend': sum_cents[month_index, category_index] / 100
+        }, orient)
+    
+    def get_trend_windows(self, granularity='month', window=3, lag=1, orient='records'):
+        """Spend per category and period with a moving average, growth and running total
+
+        The category_trends_window SQL generalized: granularity is day, week
+        or month, moving_avg_spend averages the last window periods (fewer at
+        the start) and growth_percentage compares each period with the one
+        lag periods earlier (NaN without one). Served from the cube's time
+        series, so any window costs no rescan of the transactions.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        if window < 1 or lag < 1:
+            raise ValueError("window and lag must be at least 1")
+        starts, count, sum_cents, prefix = self.cube.series.resample(granularity)
+        categories = np.flatnonzero(count.sum(axis=1))
+        category_index = np.repeat(categories, len(starts))
+        period_index = np.tile(np.arange(len(starts)), len(categories))
+        
+        return table_output({
+            'period': np.datetime_as_string(starts[period_index]).tolist(),
+            'category': self.cube.categories[category_index].tolist(),
+            'transaction_count': count[categories].ravel(),
+            'total_spend': sum_cents[categories].ravel() / 100,
+            'moving_avg_spend': (rolling_mean(prefix[categories], window) / 100).round(2).ravel(),
+            'growth_percentage': growth_percentage(sum_cents[categories], lag).round(2).ravel(),
+            'cumulative_spend': prefix[categories, 1:].ravel() / 100,
+        }, orient)
+    
+    def _campaign_totals(self, campaign_index, periods, keep=(), categories=None):
+        """Cube totals over a campaign's categories (or the given ones) in the windows of the given periods"""
+        campaign = self.campaigns.campaigns[campaign_index]
+        return self.cube.totals(keep=keep, categories=campaign.categories if categories is None else categories,
+                                windows=self.campaigns.period_windows(campaign_index, periods))
+    
+    def get_campaign_effectiveness(self, orient='records'):
+        """Analyze campaign effectiveness (Pre vs During vs Post) for every registered campaign"""
+        columns = {name: [] for name in [
+            'campaign_id', 'campaign_period', 'category', 'transaction_count', 'total_spend',
+            'avg_transaction', 'unique_customers', 'uplift_percentage'
+        ]}
+        labels = list(CAMPAIGN_PERIOD_GROUPS)
+        during = labels.index('During-Campaign')
+        for c, campaign in enumerate(self.campaigns):
+            positions = self.cube.categories.get_indexer(pd.Index(campaign.categories))
+            categories = np.asarray(campaign.categories, dtype=object)[positions >= 0]
             
-            pre_avg_monthly = pre['total_spend'].values[0] / 6 if len(pre) > 0 else 0
-            during_total = during['total_spend'].values[0] if len(during) > 0 else 0
-            during_expected = pre_avg_monthly * 3  # 3 months campaign
+            # (category, dashboard period) totals for all the campaign's categories at once: window totals
+            # summed into periods by the one-hot window -> period table
+            count, sum_cents, _ = self.cube.totals(keep=['category', 'window'], categories=categories)
+            groups = self.campaigns.period_groups(c)
+            count, sum_cents = count @ groups, sum_cents @ groups
             
-            uplift = ((during_total - during_expected) / during_expected * 100) if during_expected > 0 else 0
+            # Expected spend from the baseline windows only: the Pre-Campaign period also covers the
+            # windows before the baseline and between it and the start
+            total_spend = sum_cents / 100
+            baseline_cents = self._campaign_totals(c, [BASELINE], keep=['category'], categories=categories)[1]
+            during_expected = baseline_cents / 100 / campaign.baseline_months * campaign.months
+            with np.errstate(divide='ignore', invalid='ignore'):
+                uplift = np.where(during_expected > 0,
+                                  (total_spend[:, during] - during_expected) / during_expected * 100, 0.0)
             
-            for _, row in cat_data.iterrows():
-                record = row.to_dict()
-                if row['campaign_period'] == 'During-Campaign':
-                    record['uplift_percentage'] = round(float(uplift), 2)
-                else:
-                    record['uplift_percentage'] = 0.0
-                results.append(record)
-        
-        return results
+            for k, g in zip(*np.nonzero(count > 0)):
+                windows = np.flatnonzero(groups[:, g])
+                columns['campaign_id'].append(campaign.campaign_id)
+                columns['campaign_period'].append(labels[g])
+                columns['category'].append(categories[k])
+                columns['transaction_count'].append(int(count[k, g]))
+                columns['total_spend'].append(float(total_spend[k, g]))
+                columns['avg_transaction'].append(float(total_spend[k, g] / count[k, g]))
+                columns['unique_customers'].append(self.cube.distinct_customers([categories[k]], windows))
+                columns['uplift_percentage'].append(round(float(uplift[k]), 2) if g == during else 0.0)
+        
+        return table_output(columns, orient)
     
-    def get_customer_segmentation(self):
+    def get_customer_segmentation(self, orient='records'):
         """Analyze customer segments"""
-        customer_metrics = self.transactions.groupby(['customer_id', 'customer_segment']).agg({
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean'],
-            'category': 'nunique'
-        }).reset_index()
-        
-        customer_metrics.columns = [
-            'customer_id', 'customer_segment', 'transaction_count',
-            'total_spend', 'avg_transaction', 'categories_used'
-        ]
-        
-        # Aggregate by segment
-        segment_analysis = customer_metrics.groupby('customer_segment').agg({
-            'customer_id': 'count',
-            'total_spend': 'mean',
-            'transaction_count': 'mean',
-            'avg_transaction': 'mean'
-        }).reset_index()
-        
-        segment_analysis.columns = [
-            'customer_segment', 'customer_count', 'avg_customer_spend',
-            'avg_transactions_per_customer', 'avg_transaction_size'
-        ]
-        
-        segment_analysis = segment_analysis.sort_values('avg_customer_spend', ascending=False)
-        
-        return segment_analysis.to_dict('records')
-    
-    def get_recommended_segments(self):
-        """Recommend customer segments for future campaigns"""
+        features = self.cube.customers
+        
+        # Aggregate the customer x segment features: a customer seen in several segments counts in each
+        count = features.segment_count
+        present = count > 0
+        customers = present.sum(axis=0)
+        avg_customer_spend = features.segment_spend_cents.sum(axis=0) / 100
+        avg_transactions = count.sum(axis=0)
+        avg_transaction_size = np.divide(features.segment_spend_cents / 100, count, out=np.zeros(count.shape), where=present).sum(axis=0)
+        
+        index = np.nonzero(customers)[0]
+        index = index[np.argsort(-(avg_customer_spend[index] / customers[index]), kind='stable')]
+        
+        return table_output({
+            'customer_segment': self.cube.segments[index].tolist(),
+            'customer_count': customers[index],
+            'avg_customer_spend': avg_customer_spend[index] / customers[index],
+            'avg_transactions_per_customer': avg_transactions[index] / customers[index],
+            'avg_transaction_size': avg_transaction_size[index] / customers[index]
+        }, orient)
+    
+    def get_recommended_segments(self, orient='records'):
+        """Recommend customer segments for future campaigns, pooling the response to every registered campaign"""
         # Calculate campaign response by segment
-        campaign_txns = self.transactions[
-            (self.transactions['transaction_date'] >= self.campaign_start) &
-            (self.transactions['transaction_date'] <= self.campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]
-        
-        pre_campaign_txns = self.transactions[
-            (self.transactions['transaction_date'] >= self.pre_campaign_start) &
-            (self.transactions['transaction_date'] <= self.pre_campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]
+        n_segments = len(self.cube.segments)
+        campaign_count, campaign_cents = np.zeros(n_segments, dtype=np.int64), np.zeros(n_segments, dtype=np.int64)
+        pre_count, expected = np.zeros(n_segments, dtype=np.int64), np.zeros(n_segments)
+        for c, campaign in enumerate(self.campaigns):
+            count, cents, _ = self._campaign_totals(c, [CAMPAIGN], keep=['segment'])
+            campaign_count, campaign_cents = campaign_count + count, campaign_cents + cents
+            count, cents, _ = self._campaign_totals(c, [BASELINE], keep=['segment'])
+            pre_count = pre_count + count
+            expected = expected + cents / 100 / campaign.baseline_months * campaign.months
         
         # Calculate uplift by segment
-        campaign_by_segment = campaign_txns.groupby('customer_segment')['amount'].sum()
-        pre_by_segment = pre_campaign_txns.groupby('customer_segment')['amount'].sum() / 6 * 3
-        
-        uplift_by_segment = ((campaign_by_segment - pre_by_segment) / pre_by_segment * 100).round(2)
-        
-        recommendations = []
-        for segment in uplift_by_segment.index:
-            recommendations.append({
-                'segment': segment,
-                'uplift_percentage': float(uplift_by_segment[segment]),
-                'recommendation': 'High Priority' if uplift_by_segment[segment] > 20 else 
-                                 'Medium Priority' if uplift_by_segment[segment] > 10 else 'Low Priority'
-            })
-        
-        return sorted(recommendations, key=lambda x: x['uplift_percentage'], reverse=True)
+        index = np.nonzero((campaign_count > 0) & (pre_count > 0))[0]
+        campaign_by_segment = campaign_cents[index] / 100
+        pre_by_segment = expected[index]
+        uplift = np.round((campaign_by_segment - pre_by_segment) / pre_by_segment * 100, 2)
+        
+        order = np.argsort(-uplift, kind='stable')
+        uplift = uplift[order]
+        
+        return table_output({
+            'segment': self.cube.segments[index[order]].tolist(),
+            'uplift_percentage': uplift,
+            'recommendation': np.select([uplift > 20, uplift > 10], ['High Priority', 'Medium Priority'], 'Low Priority').tolist()
+        }, orient)
+    
+    def get_campaign_response(self, by='segment', threshold=RESPONSE_THRESHOLD, orient='records'):
+        """Per-customer campaign response rates of every campaign, by customer segment or region
+
+        The campaign_response_rate SQL computed from the customer feature
+        table: customers with baseline spend in a campaign's categories
+        responded when their campaign spend exceeds threshold x the expected
+        spend. by='all' gives the SQL's one row per campaign.
+        """
+        if by not in RESPONSE_GROUPINGS:
+            raise ValueError(f"by must be one of: {', '.join(RESPONSE_GROUPINGS)}")
+        if not threshold > 0:
+            raise ValueError("threshold must be positive")
+        features = self.cube.customers
+        if by == 'all':
+            eligible, responded = features.response_counts(threshold)
+        else:
+            labels = self.cube.segments if by == 'segment' else self.cube.regions
+            eligible, responded = features.response_counts(threshold, getattr(features, by).astype(np.int64), len(labels))
+        campaign_index, group_index = np.nonzero(eligible)
+        total, responders = eligible[campaign_index, group_index], responded[campaign_index, group_index]
+        
+        columns = {'campaign_id': np.array([c.campaign_id for c in self.campaigns], dtype=object)[campaign_index].tolist()}
+        if by != 'all':
+            columns[by] = labels[group_index].tolist()
+        columns.update({
+            'total_customers': total,
+            'responded_customers': responders,
+            'response_rate_percentage': np.round(100.0 * responders / total, 2),
+        })
+        return table_output(columns, orient)
+    
+    def get_top_customers(self, n=20, segment=None, region=None, orient='records'):
+        """Top n customers by total spend, as in the top_customers_by_spend SQL
+
+        segment and region are optional lists of accepted values. The
+        customers are picked by partial selection over the feature table's
+        per-customer spend rather than by sorting every customer, and their
+        name, segment and region come from customer_rows instead of a join
+        (null for customers without a record).
+        """
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        features = self.cube.customers
+        if segment is None and region is None:
+            top = features.top_spenders(n)
+            top = top[features.count[top] > 0]
+        else:
+            # One compare per accepted code (faster than a lookup gather); customers without transactions have code -1
+            candidates = True
+            for name, accepted, labels in [('segment', segment, self.cube.segments), ('region', region, self.cube.regions)]:
+                if accepted is not None:
+                    codes = getattr(features, name)
+                    matches = np.zeros(len(codes), dtype=bool)
+                    for code in np.unique(labels.get_indexer(pd.Index(accepted))):
+                        if code >= 0:
+                            matches |= codes == code
+                    candidates = candidates & matches
+            top = features.top_spenders(n, np.flatnonzero(candidates))
+        
+        rows = self.customer_rows[top]
+        records = self.customers.iloc[np.maximum(rows, 0)]
+        attribute = lambda column: np.where(rows >= 0, records[column].astype(object).to_numpy(), None).tolist()
+        spend = features.spend_cents[top] / 100
+        return table_output({
+            'customer_id': self.customer_ids[top].tolist(),
+            'name': attribute('name'),
+            'customer_segment': attribute('customer_segment'),
+            'region': attribute('region'),
+            'transaction_count': features.count[top],
+            'total_spend': spend,
+            'avg_transaction': np.round(spend / features.count[top], 2),
+        }, orient)
+    
+    def _distribution_labels(self, by):
+        """Record fields naming every group of a DISTRIBUTION_GROUPINGS entry"""
+        if by == 'all':
+            return [{'group': 'all'}]
+        if by == 'period':
+            return [{'campaign_id': campaign.campaign_id, 'campaign_period': label}
+                    for campaign in self.campaigns for label in CAMPAIGN_PERIOD_GROUPS]
+        labels = {'category': self.cube.categories, 'region': self.cube.regions, 'segment': self.cube.segments}[by]
+        return [{by: label} for label in labels]
     
-    def get_statistical_summary(self):
-        """Generate statistical summary"""
+    def get_amount_distribution(self, by='all', quantiles=DEFAULT_QUANTILES, bins=20, scale='linear', edges=None):
+        """Exact amount percentiles and histogram of every group, from the cube's sorted value-count tables
+
+        by is one of DISTRIBUTION_GROUPINGS ('period': one group per campaign
+        and dashboard period). The histogram uses the given edges (dollars,
+        ascending) or bins equal-width ('linear') or equal-ratio ('log') bins
+        spanning all amounts; every group shares the same bins, the last of
+        which is closed.
+        """
+        if by not in DISTRIBUTION_GROUPINGS:
+            raise ValueError(f"by must be one of: {', '.join(DISTRIBUTION_GROUPINGS)}")
+        if scale not in HISTOGRAM_SCALES:
+            raise ValueError(f"scale must be one of: {', '.join(HISTOGRAM_SCALES)}")
+        quantiles = [float(q) for q in quantiles]
+        if not all(0 <= q <= 1 for q in quantiles):
+            raise ValueError("quantiles must be between 0 and 1")
+        
+        lowest, highest = self.cube.amounts['all'].extremes()
+        if edges is not None:
+            # Rounded so an edge equal to an amount in dollars stays equal to it in cents
+            edge_cents = np.round(np.asarray(edges, dtype=np.float64) * 100, 6)
+            if len(edge_cents) < 2 or (np.diff(edge_cents) <= 0).any():
+                raise ValueError("edges must be at least two increasing values")
+        elif np.isnan(lowest[0]):
+            edge_cents = np.zeros(0)
+        elif scale == 'log':
+            first = max(lowest[0], 1)
+            edge_cents = np.geomspace(first, max(highest[0], first), bins + 1)
+        else:
+            edge_cents = np.linspace(lowest[0], highest[0], bins + 1)
+        
+        table = self.cube.amounts[by]
+        sizes = table.sizes()
+        values = table.quantiles(quantiles) / 100
+        low, high = table.extremes()
+        histogram = table.histogram(edge_cents) if len(edge_cents) else np.zeros((table.n_groups, 0), dtype=np.int64)
+        labels = self._distribution_labels(by)
+        return {
+            'by': by,
+            'quantiles': quantiles,
+            'bin_edges': (edge_cents / 100).tolist(),
+            'groups': [{
+                **labels[g],
+                'count': int(sizes[g]),
+                'min': float(low[g] / 100),
+                'max': float(high[g] / 100),
+                'quantile_values': values[g].tolist(),
+                'histogram': histogram[g].tolist(),
+            } for g in np.flatnonzero(sizes)],
+        }
+    
+    def get_statistical_summary(self, approx=False):
+        """Generate statistical summary (approx=True estimates the median with the amount quantile sketch)"""
+        count, sum_cents, sum_squares = self.cube.totals()
+        mean = sum_cents / 100 / count if count else np.nan
+        variance = (sum_squares - count * mean * mean) / (count - 1) if count > 1 else np.nan
+        
         # Overall statistics
+        lowest, highest = self.cube.amounts['all'].extremes()
         stats = {
-            'mean_transaction': float(self.transactions['amount'].mean()),
-            'median_transaction': float(self.transactions['amount'].median()),
-            'std_transaction': float(self.transactions['amount'].std()),
-            'min_transaction': float(self.transactions['amount'].min()),
-            'max_transaction': float(self.transactions['amount'].max()),
+            'mean_transaction': float(mean),
+            'median_transaction': float((np.round(self.cube.amount_sketch.quantile(0.5)) if approx
+                                         else self.cube.median_cents()) / 100),
+            'std_transaction': float(np.sqrt(max(variance, 0))),
+            'min_transaction': float(lowest[0] / 100),
+            'max_transaction': float(highest[0] / 100),
         }
         
-        # Campaign period statistics
-        campaign_txns = self.transactions[
-            (self.transactions['transaction_date'] >= self.campaign_start) &
-            (self.transactions['transaction_date'] <= self.campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]
-        
-        pre_campaign_txns = self.transactions[
-            (self.transactions['transaction_date'] >= self.pre_campaign_start) &
-            (self.transactions['transaction_date'] <= self.pre_campaign_end) &
-            (self.transactions['category'].isin(['Travel', 'Dining']))
-        ]
-        
-        stats['campaign_mean'] = float(campaign_txns['amount'].mean()) if len(campaign_txns) > 0 else 0
-        stats['pre_campaign_mean'] = float(pre_campaign_txns['amount'].mean()) if len(pre_campaign_txns) > 0 else 0
+        # Campaign period statistics, pooled over the registered campaigns
+        campaign_count = campaign_cents = pre_count = pre_cents = 0
+        for c in range(len(self.campaigns)):
+            count, cents, _ = self._campaign_totals(c, [CAMPAIGN])
+            campaign_count, campaign_cents = campaign_count + count, campaign_cents + cents
+            count, cents, _ = self._campaign_totals(c, [BASELINE])
+            pre_count, pre_cents = pre_count + count, pre_cents + cents
+        
+        stats['campaign_mean'] = float(campaign_cents / 100 / campaign_count) if campaign_count > 0 else 0
+        stats['pre_campaign_mean'] = float(pre_cents / 100 / pre_count) if pre_count > 0 else 0
         stats['mean_uplift'] = float((stats['campaign_mean'] - stats['pre_campaign_mean']) / stats['pre_campaign_mean'] * 100) if stats['pre_campaign_mean'] > 0 else 0
         
         return stats
+    
+    def _column_array(self, column):
+        values = self.transactions[column].array
+        return values.codes if isinstance(values, pd.Categorical) else values._ndarray
+    
+    def memory_usage(self):
+        """Bytes held by the columnar transaction store, per column and per row"""
+        if self._store_chunks is None:
+            return {'rows': int(self.cube.count.sum()), 'columns': {}, 'total_bytes': 0, 'mapped_bytes': 0, 'bytes_per_row': 0.0}
+        column_bytes = self.transactions.memory_usage(index=False, deep=True)
+        total_bytes = int(column_bytes.sum())
+        mapped = [column for column in self.transactions.columns if is_mapped(self._column_array(column))]
+        return {
+            'rows': len(self.transactions),
+            'columns': {column: int(n_bytes) for column, n_bytes in column_bytes.items()},
+            'total_bytes': total_bytes,
+            'mapped_bytes': int(column_bytes[mapped].sum()),
+            'bytes_per_row': round(total_bytes / len(self.transactions), 2) if len(self.transactions) else 0.0
+        }
@@ -0,0 +1,179 @@
+"""Executor layer that keeps CPU-bound analytics off the asyncio event loop
+
+Engine calls run on a thread pool by default (NumPy releases the GIL for
+most of the aggregation work). Endpoints listed in process_endpoints run
+in a process pool instead, where every worker loads its own engine from
+the data files. Each endpoint has a concurrency limit; requests beyond it
+wait in a queue whose depth is tracked. Requests that exceed the timeout
+(queue wait included) raise AnalyticsTimeout; the pool job itself cannot be
+interrupted, so it keeps its slot, and counts as running, until it finishes.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+
+class AnalyticsTimeout(Exception):
+    pass
+
+
+class EndpointStats:
+    def __init__(self, limit):
+        self.limit = limit
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def as_dict(self):
+        done = self.completed + self.errors
+        return {
+            'limit': self.limit,
+            'waiting': self.waiting,
+            'running': self.running,
+            'max_waiting': self.max_waiting,
+            'completed': self.completed,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self.total_wait_seconds / done * 1000, 3) if done else 0.0,
+            'avg_run_ms': round(self.total_run_seconds / done * 1000, 3) if done else 0.0
+        }
+
+
+# Engine owned by each process-pool worker
+_worker_engine = None
+
+
+def _load_worker_engine(transactions_path, customers_path, chunk_size=None, campaigns=None):
+    """Process-pool initializer: build this worker's engine from the data files (streamed when chunk_size is set)"""
+    global _worker_engine
+    from analytics_engine import CreditCardAnalytics
+    customers = pd.read_csv(customers_path)
+    if chunk_size:
+        _worker_engine = CreditCardAnalytics.from_files(transactions_path, customers, chunk_size=chunk_size,
+                                                        keep_store=False, campaigns=campaigns)
+    else:
+        _worker_engine = CreditCardAnalytics.from_path(transactions_path, customers, campaigns=campaigns)
+
+
+def _call_worker_engine(method_name, args):
+    return getattr(_worker_engine, method_name)(*args)
+
+
+class AnalyticsExecutor:
+    def __init__(self, thread_workers=8, process_workers=0, timeout_seconds=30.0,
+                 default_limit=4, endpoint_limits=None, process_endpoints=()):
+        self.thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix='analytics')
+        self.process_workers = process_workers
+        self.process_pool = None
+        self.timeout_seconds = timeout_seconds
+        self.default_limit = default_limit
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.process_endpoints = set(process_endpoints)
+        self._semaphores = {}
+        self._stats = {}
+
+    def start_process_pool(self, transactions_path, customers_path, chunk_size=None, campaigns=None):
+        """(Re)start the process pool so its workers load the current data files and campaigns"""
+        if not self.process_workers:
+            return
+        previous = self.process_pool
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            initializer=_load_worker_engine,
+            initargs=(str(transactions_path), str(customers_path), chunk_size, campaigns)
+        )
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def _endpoint(self, endpoint):
+        if endpoint not in self._semaphores:
+            limit = self.endpoint_limits.get(endpoint, self.default_limit)
+            self._semaphores[endpoint] = asyncio.Semaphore(limit)
+            self._stats[endpoint] = EndpointStats(limit)
+        return self._semaphores[endpoint], self._stats[endpoint]
+
+    async def run(self, endpoint, fn, *args):
+        """Run fn(*args) on the thread pool under endpoint's concurrency limit and the timeout"""
+        loop = asyncio.get_running_loop()
+        return await self._submit(endpoint, lambda: loop.run_in_executor(self.thread_pool, fn, *args))
+
+    async def run_engine(self, endpoint, engine, method_name, *args, local=False):
+        """Call engine.method_name(*args) on the pool configured for endpoint
+
+        local=True keeps the call on the thread pool, for an engine the process
+        workers have not loaded (e.g. one being warmed before a swap).
+        """
+        loop = asyncio.get_running_loop()
+        if endpoint in self.process_endpoints and self.process_pool is not None and not local:
+            submit = lambda: loop.run_in_executor(self.process_pool, _call_worker_engine, method_name, args)
+        else:
+            submit = lambda: loop.run_in_executor(self.thread_pool, getattr(engine, method_name), *args)
+        return await self._submit(endpoint, submit)
+
+    async def _submit(self, endpoint, submit):
+        semaphore, stats = self._endpoint(endpoint)
+        queued_at = time.perf_counter()
+        stats.waiting += 1
+        stats.max_waiting = max(stats.max_waiting, stats.waiting)
+        acquired = False
+
+        async def acquire_and_run():
+            nonlocal acquired
+            await semaphore.acquire()
+            acquired = True
+            stats.waiting -= 1
+            started_at = time.perf_counter()
+            stats.total_wait_seconds += started_at - queued_at
+            stats.running += 1
+
+            def finished(_):
+                # The pool job, not the request, holds the permit: a timed-out job keeps counting as
+                # running, and its permit stays taken, until it actually finishes
+                stats.running -= 1
+                stats.total_run_seconds += time.perf_counter() - started_at
+                semaphore.release()
+
+            try:
+                future = submit()
+            except BaseException:
+                finished(None)
+                raise
+            future.add_done_callback(finished)
+            # Shielded so a timeout abandons the wait, not the job
+            return await asyncio.shield(future)
+
+        try:
+            result = await asyncio.wait_for(acquire_and_run(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise AnalyticsTimeout(f"{endpoint} did not finish within {self.timeout_seconds:g}s")
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            if not acquired:
+                stats.waiting -= 1
+        stats.completed += 1
+        return result
+
+    def stats(self):
+        return {
+            'thread_workers': self.thread_pool._max_workers,
+            'thread_queue_depth': self.thread_pool._work_queue.qsize(),
+            'process_workers': self.process_workers if self.process_pool is not None else 0,
+            'timeout_seconds': self.timeout_seconds,
+            'endpoints': {endpoint: stats.as_dict() for endpoint, stats in sorted(self._stats.items())}
+        }
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False)
@@ -0,0 +1,582 @@
+"""Performance benchmarks for the analytics backend
+
+Run from the backend directory, e.g.:
+
+    python benchmarks.py generator --customers 2000
+    python benchmarks.py parallel-generation --customers 50000 --workers 1 4 8
+    python benchmarks.py memory --customers 20000
+    python benchmarks.py serialization --customers 5000
+    python benchmarks.py parallel-build --customers 80000 --workers 1 4 16 64
+    python benchmarks.py shared-memory --customers 20000 --workers 8
+    python benchmarks.py filters --customers 20000
+    python benchmarks.py campaigns --customers 5000 --campaigns 1 8 32
+    python benchmarks.py period-binning --rows 10000000
+    python benchmarks.py customer-features --customers 20000
+    python benchmarks.py approx --customers 20000
+    python benchmarks.py distribution --customers 20000
+    python benchmarks.py trend-windows --customers 20000
+    python benchmarks.py campaign-response --customers 10000000
+    python benchmarks.py top-customers --customers 10000000
+"""
+
+import argparse
+import io
+import multiprocessing
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from analytics_engine import CreditCardAnalytics
+from campaigns import DEFAULT_CAMPAIGNS, Campaign, CampaignRegistry
+from customer_features import CustomerFeatures
+from data_generator import CreditCardDataGenerator
+from dataset_io import CsvSink, read_transactions, write_dataset
+from serializers import render_arrow, render_json
+from store_cache import process_memory
+
+
+def _timed(fn, *args, **kwargs):
+    """Run fn once and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _generate_transactions_rowwise(generator, customers_df, start_date, end_date):
+    """Reference per-row implementation the vectorized generator replaced"""
+    transactions = []
+    transaction_id = 1
+
+    for _, customer in customers_df.iterrows():
+        current_date = start_date
+        transactions_per_month = random.randint(4, 15)
+
+        while current_date <= end_date:
+            n_transactions = random.randint(transactions_per_month - 2, transactions_per_month + 3)
+
+            for _ in range(n_transactions):
+                if current_date.month == 12:
+                    next_month = datetime(current_date.year + 1, 1, 1)
+                else:
+                    next_month = datetime(current_date.year, current_date.month + 1, 1)
+
+                days_in_month = (next_month - current_date).days
+                transaction_date = current_date + timedelta(days=random.randint(0, days_in_month - 1))
+
+                if transaction_date > end_date:
+                    break
+
+                category = random.choices(
+                    list(generator.categories.keys()),
+                    weights=[cat['weight'] for cat in generator.categories.values()]
+                )[0]
+                base_amount = generator.categories[category]['base_amount']
+                std_amount = generator.categories[category]['std']
+
+                campaign = generator.campaigns.campaigns[0]
+                campaign_boost = 1.0
+                in_campaign = False
+                if campaign.start <= transaction_date.date() <= campaign.end:
+                    in_campaign = True
+                    if random.random() < 0.40:
+                        if category in ['Travel', 'Dining']:
+                            campaign_boost = random.uniform(1.25, 1.60)
+
+                amount = abs(np.random.normal(base_amount * campaign_boost, std_amount))
+                amount = round(max(5, amount), 2)
+
+                transactions.append({
+                    'transaction_id': f'TXN{str(transaction_id).zfill(8)}',
+                    'customer_id': customer['customer_id'],
+                    'transaction_date': transaction_date.strftime('%Y-%m-%d'),
+                    'category': category,
+                    'amount': amount,
+                    'merchant_name': random.choice(generator.merchants.get(category, ['Generic Merchant'])),
+                    'region': customer['region'],
+                    'customer_segment': customer['customer_segment'],
+                    'in_campaign_period': in_campaign
+                })
+                transaction_id += 1
+
+            if current_date.month == 12:
+                current_date = datetime(current_date.year + 1, 1, 1)
+            else:
+                current_date = datetime(current_date.year, current_date.month + 1, 1)
+
+    return pd.DataFrame(transactions)
+
+
+def _synthetic_customers(n_customers, seed=42):
+    """Cheap customer frame (no Faker) for generator benchmarks"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'customer_id': [f'CUST{str(i + 1).zfill(6)}' for i in range(n_customers)],
+        'region': rng.choice(['Northeast', 'Southeast', 'Midwest', 'West', 'Southwest'], n_customers),
+        'customer_segment': rng.choice(['Bronze', 'Silver', 'Gold', 'Platinum'], n_customers)
+    })
+
+
+def benchmark_generator(n_customers=2000, rowwise=True):
+    """Transactions/sec of the vectorized generator vs the per-row loop"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    start_date, end_date = datetime(2024, 1, 1), datetime(2024, 12, 31)
+
+    print(f"Generating one year of transactions for {n_customers:,} customers")
+    vectorized, elapsed = _timed(generator.generate_transactions, customers, start_date, end_date)
+    vectorized_rate = len(vectorized) / elapsed
+    print(f"  vectorized: {len(vectorized):>10,} rows in {elapsed:8.2f}s  ({vectorized_rate:,.0f} rows/s)")
+
+    if rowwise:
+        legacy, elapsed = _timed(_generate_transactions_rowwise, generator, customers, start_date, end_date)
+        legacy_rate = len(legacy) / elapsed
+        print(f"  row-wise:   {len(legacy):>10,} rows in {elapsed:8.2f}s  ({legacy_rate:,.0f} rows/s)")
+        print(f"  speedup:    {vectorized_rate / legacy_rate:.1f}x")
+
+    # Statistical shape should match the original generator
+    campaign = vectorized[vectorized['in_campaign_period'] & vectorized['category'].isin(['Travel', 'Dining'])]
+    baseline = vectorized[~vectorized['in_campaign_period'] & vectorized['category'].isin(['Travel', 'Dining'])]
+    print("  category share:", vectorized['category'].value_counts(normalize=True).round(3).to_dict())
+    print(f"  min amount: {vectorized['amount'].min():.2f}")
+    print(f"  Travel/Dining campaign mean uplift: {(campaign['amount'].mean() / baseline['amount'].mean() - 1) * 100:.1f}%")
+
+
+def benchmark_parallel_generation(n_customers=50000, worker_counts=(1, 2, 4, 8)):
+    """Wall time of sharded dataset generation across worker counts, checking outputs are identical"""
+    generator = CreditCardDataGenerator(seed=42)
+    reference = None
+
+    print(f"Generating customers and one year of transactions for {n_customers:,} customers")
+    for n_workers in worker_counts:
+        chunks, elapsed = _timed(lambda: list(generator.generate_dataset(n_customers, n_workers=n_workers)))
+        transactions = pd.concat(chunks, ignore_index=True)
+        identical = reference is None or transactions.equals(reference)
+        reference = transactions if reference is None else reference
+        print(f"  {n_workers:>3} worker(s): {len(transactions):>12,} rows in {elapsed:8.2f}s"
+              f"  ({len(transactions) / elapsed:,.0f} rows/s)  identical={identical}")
+
+
+def benchmark_memory(n_customers=2000):
+    """Bytes per row of raw CSV-loaded transactions vs the engine's columnar store"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    generated = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    raw = pd.read_csv(io.StringIO(generated.to_csv(index=False)))
+    del generated
+
+    raw_bytes = raw.memory_usage(index=False, deep=True)
+    engine = CreditCardAnalytics(raw, customers)
+    report = engine.memory_usage()
+
+    print(f"Memory for {len(raw):,} transactions")
+    print(f"  {'column':<20}{'raw bytes/row':>15}{'store bytes/row':>17}")
+    for column in sorted(set(raw_bytes.index) | set(report['columns'])):
+        before = raw_bytes.get(column, 0) / len(raw)
+        after = report['columns'].get(column, 0) / len(raw)
+        print(f"  {column:<20}{before:>15.2f}{after:>17.2f}")
+    print(f"  {'total':<20}{raw_bytes.sum() / len(raw):>15.2f}{report['bytes_per_row']:>17.2f}")
+
+
+def benchmark_serialization(n_customers=2000, repeat=20):
+    """Encoded bytes/sec per table endpoint: the old jsonable_encoder path vs orjson records, orjson columns and Arrow"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    # Several years of data so monthly trends is a sizeable table
+    transactions = generator.generate_transactions(customers, datetime(2020, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+
+    encoders = {
+        'jsonable_encoder': lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+        'orjson records': render_json,
+        'orjson columns': render_json,
+        'arrow': render_arrow,
+    }
+    methods = ['get_spend_by_category', 'get_monthly_trends', 'get_campaign_effectiveness', 'get_customer_segmentation']
+
+    print(f"Serializing table endpoints for {len(transactions):,} transactions ({repeat} runs each)")
+    print(f"  {'endpoint':<28}{'encoder':<18}{'bytes':>10}{'ms':>10}{'MB/s':>10}")
+    for method_name in methods:
+        records = {'data': getattr(engine, method_name)()}
+        columns = {'data': getattr(engine, method_name)(orient='columns')}
+        for name, encode in encoders.items():
+            payload = records if name in ('jsonable_encoder', 'orjson records') else columns
+            body, elapsed = _timed(lambda: [encode(payload) for _ in range(repeat)])
+            elapsed /= repeat
+            print(f"  {method_name[4:]:<28}{name:<18}{len(body[0]):>10,}{elapsed * 1000:>10.3f}"
+                  f"{len(body[0]) / elapsed / 1e6:>10.1f}")
+
+
+def benchmark_parallel_build(n_customers=2000, worker_counts=(1, 2, 4, 8)):
+    """Engine build time from a CSV across worker counts (about 120 rows per customer per year)"""
+    generator = CreditCardDataGenerator(seed=42)
+    with tempfile.TemporaryDirectory() as directory:
+        path = f'{directory}/transactions.csv'
+        n_rows = write_dataset(generator.generate_dataset(n_customers), CsvSink(path))
+        customers = _synthetic_customers(n_customers)
+
+        print(f"Building the engine from {n_rows:,} transactions")
+        baseline = reference = None
+        for n_workers in worker_counts:
+            engine, elapsed = _timed(CreditCardAnalytics.from_files, path, customers, n_workers=n_workers, keep_store=False)
+            overview = engine.get_overview_metrics()
+            identical = reference is None or overview == reference
+            reference = overview if reference is None else reference
+            baseline = elapsed if baseline is None else baseline
+            print(f"  {n_workers:>3} worker(s): {elapsed:8.2f}s  ({n_rows / elapsed:,.0f} rows/s)"
+                  f"  speedup {baseline / elapsed:5.2f}x  identical={identical}")
+
+
+def _load_engine_worker(path, customers, mapped, barrier, results):
+    before = process_memory()
+    if mapped:
+        engine = CreditCardAnalytics.from_path(path, customers)
+    else:
+        engine = CreditCardAnalytics(read_transactions(path), customers)
+    # Measure while every worker holds its engine, so shared pages are split between them
+    barrier.wait()
+    results.put((before, process_memory(), engine.memory_usage()['mapped_bytes']))
+    barrier.wait()
+
+
+def benchmark_shared_memory(n_customers=2000, n_workers=4):
+    """Per-worker memory when N processes each load the engine: private store copies vs the mapped store cache"""
+    generator = CreditCardDataGenerator(seed=42)
+    with tempfile.TemporaryDirectory() as directory:
+        path = f'{directory}/transactions.csv'
+        n_rows = write_dataset(generator.generate_dataset(n_customers), CsvSink(path))
+        customers = _synthetic_customers(n_customers)
+        CreditCardAnalytics.from_path(path, customers)  # write the cache once
+
+        print(f"{n_workers} workers loading {n_rows:,} transactions (MB per worker, averaged)")
+        print(f"  {'store':<10}{'rss before':>12}{'rss after':>12}{'pss after':>12}{'uss after':>12}{'mapped':>10}")
+        for mapped in [False, True]:
+            barrier, results = multiprocessing.Barrier(n_workers), multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_load_engine_worker, args=(path, customers, mapped, barrier, results))
+                       for _ in range(n_workers)]
+            for worker in workers:
+                worker.start()
+            samples = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            mean = lambda key, i: np.mean([sample[i].get(key, 0) for sample in samples]) / 2 ** 20
+            print(f"  {'mapped' if mapped else 'private':<10}{mean('rss', 0):>12.1f}{mean('rss', 1):>12.1f}"
+                  f"{mean('pss', 1):>12.1f}{mean('uss', 1):>12.1f}{samples[0][2] / 2 ** 20:>10.1f}")
+
+
+def benchmark_filters(n_customers=2000, repeat=5):
+    """Filtered spend-by-category latency: index-selected rows vs boolean-masking every row"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+    _, index_seconds = _timed(lambda: engine.index)
+    customer_ids = transactions['customer_id'].drop_duplicates().tolist()
+    dates = pd.to_datetime(transactions['transaction_date'])
+
+    cases = {
+        'one customer': {'customer_id': customer_ids[:1]},
+        'ten customers, Travel': {'customer_id': customer_ids[:10], 'category': ['Travel']},
+        'one week': {'start_date': '2024-07-01', 'end_date': '2024-07-07'},
+        'one week, one region': {'start_date': '2024-07-01', 'end_date': '2024-07-07', 'region': ['West']},
+        'region and segment': {'region': ['West'], 'segment': ['Platinum']},
+        'one month, Dining': {'start_date': '2024-03-01', 'end_date': '2024-03-31', 'category': ['Dining']},
+    }
+    columns = {'region': 'region', 'segment': 'customer_segment', 'category': 'category', 'customer_id': 'customer_id'}
+
+    print(f"Filtered queries over {len(transactions):,} transactions (index built in {index_seconds:.2f}s, "
+          f"{engine.index.nbytes() / 2 ** 20:.1f} MB)")
+    print(f"  {'filter':<26}{'rows':>10}{'indexed ms':>12}{'masked ms':>12}")
+    for name, filters in cases.items():
+        mask = np.ones(len(transactions), dtype=bool)
+        for key, value in filters.items():
+            if key == 'start_date':
+                mask &= (dates >= value).to_numpy()
+            elif key == 'end_date':
+                mask &= (dates <= value).to_numpy()
+            else:
+                mask &= transactions[columns[key]].isin(value).to_numpy()
+
+        indexed = min(_timed(engine.run_filtered, filters, 'get_spend_by_category')[1] for _ in range(repeat))
+        masked = min(_timed(lambda: CreditCardAnalytics(transactions[mask], customers).get_spend_by_category())[1]
+                     for _ in range(repeat))
+        print(f"  {name:<26}{int(mask.sum()):>10,}{indexed * 1000:>12.1f}{masked * 1000:>12.1f}")
+
+
+def _random_campaigns(n_campaigns, categories, seed=42):
+    """n overlapping campaigns within 2024, each with a baseline window before it"""
+    rng = np.random.default_rng(seed)
+    campaigns = []
+    for i in range(n_campaigns):
+        start = np.datetime64('2024-03-01') + int(rng.integers(0, 240))
+        end = start + int(rng.integers(14, 90))
+        baseline_end = start - 1 - int(rng.integers(0, 15))
+        baseline_start = max(np.datetime64('2024-01-01'), baseline_end - int(rng.integers(30, 120)))
+        picked = rng.choice(categories, size=int(rng.integers(1, 4)), replace=False).tolist()
+        campaigns.append(Campaign(f'campaign-{i}', str(start), str(min(end, np.datetime64('2024-12-31'))), picked,
+                                  str(baseline_start), str(baseline_end)))
+    return CampaignRegistry(campaigns)
+
+
+def benchmark_campaigns(n_customers=2000, campaign_counts=(1, 8, 32)):
+    """Build and campaign-endpoint time with N campaigns in one registry vs one engine per campaign"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    methods = ['get_overview_metrics', 'get_campaign_effectiveness', 'get_recommended_segments']
+
+    def evaluate(registries):
+        for registry in registries:
+            engine = CreditCardAnalytics(transactions, customers, registry)
+            for method_name in methods:
+                getattr(engine, method_name)()
+
+    print(f"Evaluating campaigns over {len(transactions):,} transactions")
+    print(f"  {'campaigns':>10}{'windows':>10}{'registry s':>12}{'per-campaign s':>16}")
+    for n_campaigns in campaign_counts:
+        registry = _random_campaigns(n_campaigns, list(generator.categories))
+        _, together = _timed(evaluate, [registry])
+        _, separately = _timed(evaluate, [CampaignRegistry([campaign]) for campaign in registry])
+        print(f"  {n_campaigns:>10}{registry.n_windows:>10}{together:>12.2f}{separately:>16.2f}")
+
+
+def benchmark_period_binning(n_rows=10_000_000, rowwise=True):
+    """Campaign period labels and uplift of every category: per-row apply and per-category filters vs binning and one groupby"""
+    campaign = DEFAULT_CAMPAIGNS[0]
+    rng = np.random.default_rng(42)
+    categories = ['Travel', 'Dining', 'Groceries', 'Gas', 'Shopping', 'Entertainment', 'Healthcare', 'Utilities']
+    frame = pd.DataFrame({
+        'transaction_date': np.datetime64('2024-01-01') + rng.integers(0, 366, n_rows).astype('timedelta64[D]'),
+        # Strings, as read_csv loads them in the notebook
+        'category': np.array(categories, dtype=object)[rng.integers(0, len(categories), n_rows)],
+        'amount': rng.gamma(2.0, 60.0, n_rows).round(2),
+    })
+    campaign_start, campaign_end = pd.Timestamp(campaign.start), pd.Timestamp(campaign.end)
+
+    def classify_period(date):
+        if date < campaign_start:
+            return 'Pre-Campaign'
+        elif date <= campaign_end:
+            return 'During-Campaign'
+        return 'Post-Campaign'
+
+    def uplift_per_category(periods):
+        uplift = {}
+        for category in categories:
+            in_category = frame['category'] == category
+            pre = frame.loc[in_category & (periods == 'Pre-Campaign'), 'amount'].sum()
+            during = frame.loc[in_category & (periods == 'During-Campaign'), 'amount'].sum()
+            expected = pre / campaign.baseline_months * campaign.months
+            uplift[category] = (during - expected) / expected * 100
+        return pd.Series(uplift)
+
+    def uplift_grouped(periods):
+        spend = (frame['amount'].groupby([frame['category'], periods], observed=False).sum()
+                 .unstack().reindex(categories))
+        expected = spend['Pre-Campaign'] / campaign.baseline_months * campaign.months
+        return (spend['During-Campaign'] - expected) / expected * 100
+
+    print(f"Campaign period binning over {n_rows:,} rows")
+    periods, binned = _timed(campaign.dashboard_periods, frame['transaction_date'])
+    periods = pd.Series(periods, index=frame.index)
+    if rowwise:
+        labels, applied = _timed(frame['transaction_date'].apply, classify_period)
+        assert (labels == periods.astype(object)).all()
+        print(f"  {'period labels':<18}apply {applied:8.2f}s   binned {binned:8.3f}s   {applied / binned:6.0f}x")
+    else:
+        print(f"  {'period labels':<18}binned {binned:8.3f}s")
+    # The loop runs on the string labels apply() produced, the grouped pass on the binned codes
+    looped_uplift, looped = _timed(uplift_per_category, periods.astype(object))
+    grouped_uplift, grouped = _timed(uplift_grouped, periods)
+    assert np.allclose(looped_uplift.to_numpy(), grouped_uplift.to_numpy())
+    print(f"  {'uplift':<18}loop  {looped:8.2f}s   grouped {grouped:7.3f}s   {looped / grouped:6.1f}x")
+
+
+def benchmark_customer_features(n_customers=2000, repeat=5):
+    """Customer segmentation from the feature table vs regrouping the transactions by customer"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+    features = engine.cube.customers
+
+    def regrouped():
+        metrics = transactions.groupby(['customer_id', 'customer_segment']).agg(
+            transaction_count=('amount', 'size'), total_spend=('amount', 'sum'), avg_transaction=('amount', 'mean'),
+            categories_used=('category', 'nunique'),
+        ).reset_index()
+        return metrics.groupby('customer_segment').agg(
+            customer_count=('customer_id', 'count'), avg_customer_spend=('total_spend', 'mean'),
+            avg_transactions_per_customer=('transaction_count', 'mean'), avg_transaction_size=('avg_transaction', 'mean'),
+        )
+
+    batch = generator.generate_transactions(customers[:n_customers // 10], datetime(2025, 1, 1), datetime(2025, 1, 31))
+    _, ingest_seconds = _timed(engine.ingest, batch)
+    grouped = min(_timed(regrouped)[1] for _ in range(repeat))
+    from_features = min(_timed(engine.get_customer_segmentation)[1] for _ in range(repeat))
+    print(f"Customer features for {len(features):,} customers over {len(transactions):,} transactions "
+          f"({features.nbytes() / 2 ** 20:.1f} MB)")
+    print(f"  segmentation: regrouped {grouped * 1000:.1f} ms, from features {from_features * 1000:.2f} ms")
+    print(f"  ingest of {len(batch):,} rows (cube and features): {ingest_seconds * 1000:.1f} ms")
+
+
+def benchmark_approx(n_customers=2000, repeat=5):
+    """Exact vs ?approx=true latency of the statistical summary, and the error of the sketch median"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+
+    exact_seconds = min(_timed(engine.get_statistical_summary)[1] for _ in range(repeat))
+    approx_seconds = min(_timed(engine.get_statistical_summary, approx=True)[1] for _ in range(repeat))
+    exact = engine.get_statistical_summary()['median_transaction']
+    approx = engine.get_statistical_summary(approx=True)['median_transaction']
+    print(f"Approximate mode over {len(transactions):,} transactions and {n_customers:,} customers")
+    print(f"  statistical summary: exact {exact_seconds * 1000:.2f} ms, approx {approx_seconds * 1000:.2f} ms, "
+          f"median error {abs(approx - exact) / exact:.2%}")
+
+
+def benchmark_distribution(n_customers=2000, repeat=5):
+    """Per-category percentiles and histograms: pandas groupby quantile + np.histogram vs the sorted value-count tables"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+    quantiles = [0.01, 0.25, 0.5, 0.75, 0.9, 0.99]
+    amounts = transactions['amount'].round(2)
+    edges = np.linspace(amounts.min(), amounts.max(), 21).round(2)
+
+    def grouped():
+        values = amounts.groupby(transactions['category']).quantile(quantiles).unstack()
+        histograms = {category: np.histogram(group, bins=edges)[0] for category, group in amounts.groupby(transactions['category'])}
+        return values, histograms
+
+    (values, histograms), _ = _timed(grouped)
+    pandas_seconds = min(_timed(grouped)[1] for _ in range(repeat))
+    table_seconds = min(_timed(engine.get_amount_distribution, 'category', quantiles)[1] for _ in range(repeat))
+    result = engine.get_amount_distribution('category', quantiles, edges=edges)
+    exact = all(np.allclose(group['quantile_values'], values.loc[group['category']].to_numpy())
+                and (np.asarray(group['histogram']) == histograms[group['category']]).all() for group in result['groups'])
+    table_bytes = sum(table.nbytes() for table in engine.cube.amounts.values())
+    print(f"Amount distribution by category over {len(transactions):,} transactions "
+          f"(value-count tables {table_bytes / 2 ** 20:.1f} MB)")
+    print(f"  groupby quantile + histogram {pandas_seconds * 1000:.1f} ms, "
+          f"sorted tables {table_seconds * 1000:.2f} ms, identical: {exact}")
+
+
+def benchmark_trend_windows(n_customers=2000, repeat=5):
+    """Moving average and growth per category: pandas groupby + rolling over the rows vs the cube's time series"""
+    generator = CreditCardDataGenerator(seed=42)
+    customers = _synthetic_customers(n_customers)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    engine = CreditCardAnalytics(transactions, customers)
+    dated = transactions.assign(transaction_date=pd.to_datetime(transactions['transaction_date']))
+    frequencies = {'day': 'D', 'week': 'W-SUN', 'month': 'MS'}
+
+    def rescanned(granularity, window):
+        grouper = pd.Grouper(key='transaction_date', freq=frequencies[granularity])
+        spend = dated.groupby(['category', grouper])['amount'].sum()
+        by_category = spend.groupby(level='category')
+        return pd.DataFrame({'total_spend': spend,
+                             'moving_avg_spend': by_category.transform(lambda s: s.rolling(window, min_periods=1).mean()),
+                             'growth_percentage': by_category.pct_change() * 100,
+                             'cumulative_spend': by_category.cumsum()})
+
+    print(f"Trend windows over {len(transactions):,} transactions "
+          f"(time series {engine.cube.series.nbytes() / 2 ** 10:.0f} KB)")
+    print(f"  {'granularity':<13}{'window':>7}{'rescan ms':>11}{'series ms':>11}")
+    for granularity, window in [('month', 3), ('week', 4), ('week', 13), ('day', 7), ('day', 30)]:
+        rescan_seconds = min(_timed(rescanned, granularity, window)[1] for _ in range(repeat))
+        series_seconds = min(_timed(engine.get_trend_windows, granularity, window, 1, 'columns')[1] for _ in range(repeat))
+        print(f"  {granularity:<13}{window:>7}{rescan_seconds * 1000:>11.1f}{series_seconds * 1000:>11.2f}")
+
+
+def benchmark_campaign_response(n_customers=2000, repeat=5):
+    """Per-customer campaign response counts from a feature table of n_customers synthetic customers"""
+    rng = np.random.default_rng(42)
+    campaigns = CampaignRegistry()
+    features = CustomerFeatures(n_customers, 7, campaigns)
+    features.count[:] = rng.integers(0, 200, n_customers)
+    features.region[:] = rng.integers(0, 5, n_customers)
+    features.segment[:] = rng.integers(0, 4, n_customers)
+    baseline = rng.gamma(2.0, 50_000, (n_customers, len(campaigns))).astype(np.int64) * (rng.random((n_customers, 1)) < 0.9)
+    features.campaign_spend_cents[:, :, 0] = baseline
+    features.campaign_spend_cents[:, :, 1] = (baseline / 2 * rng.lognormal(0.1, 0.4, baseline.shape)).astype(np.int64)
+
+    print(f"Campaign response over {n_customers:,} customers x {len(campaigns)} campaign(s) "
+          f"(feature table {features.nbytes() / 2 ** 20:.0f} MB)")
+    for label, groups, n_groups in [('all', None, 1), ('segment', features.segment.astype(np.int64), 4),
+                                    ('region', features.region.astype(np.int64), 5)]:
+        for threshold in (1.2, 1.5):
+            (eligible, responded), _ = _timed(features.response_counts, threshold, groups, n_groups)
+            seconds = min(_timed(features.response_counts, threshold, groups, n_groups)[1] for _ in range(repeat))
+            print(f"  by {label:<8} threshold {threshold}: {seconds * 1000:7.1f} ms "
+                  f"({responded.sum() / eligible.sum():.1%} of {eligible.sum():,} responded)")
+
+
+def benchmark_top_customers(n_customers=2000, n=20, repeat=5):
+    """Top-n customers by spend: full argsort vs partial selection over a synthetic n_customers feature table"""
+    rng = np.random.default_rng(42)
+    features = CustomerFeatures(n_customers, 7, CampaignRegistry())
+    features.count[:] = rng.integers(0, 200, n_customers)
+    features.spend_cents[:] = features.count * rng.integers(500, 50_000, n_customers)
+    features.segment[:] = rng.integers(0, 4, n_customers)
+    features.region[:] = rng.integers(0, 5, n_customers)
+
+    def gold_in_west():
+        # As get_top_customers: attribute codes compared, then selection among the candidates
+        candidates = (features.segment == 1) & (features.region == 4)
+        return features.top_spenders(n, np.flatnonzero(candidates))
+
+    full_sort = min(_timed(lambda: np.argsort(-features.spend_cents, kind='stable')[:n])[1] for _ in range(repeat))
+    selected = min(_timed(features.top_spenders, n)[1] for _ in range(repeat))
+    filtered = min(_timed(gold_in_west)[1] for _ in range(repeat))
+    exact = (features.top_spenders(n) == np.argsort(-features.spend_cents, kind='stable')[:n]).all()
+    print(f"Top {n} of {n_customers:,} customers by spend")
+    print(f"  full argsort {full_sort * 1000:.1f} ms, partial selection {selected * 1000:.1f} ms "
+          f"(same customers: {exact}), one segment and region {filtered * 1000:.1f} ms")
+
+
+# Benchmark name -> (function, adapter from the parsed command line to its positional arguments)
+_CUSTOMERS = lambda args: (args.customers,)
+_CUSTOMERS_WORKERS = lambda args: (args.customers, args.workers)
+
+BENCHMARKS = {
+    'generator': (benchmark_generator, lambda args: (args.customers, not args.skip_rowwise)),
+    'parallel-generation': (benchmark_parallel_generation, _CUSTOMERS_WORKERS),
+    'memory': (benchmark_memory, _CUSTOMERS),
+    'serialization': (benchmark_serialization, _CUSTOMERS),
+    'parallel-build': (benchmark_parallel_build, _CUSTOMERS_WORKERS),
+    'shared-memory': (benchmark_shared_memory, lambda args: (args.customers, args.workers[0])),
+    'filters': (benchmark_filters, _CUSTOMERS),
+    'campaigns': (benchmark_campaigns, lambda args: (args.customers, args.campaigns)),
+    'period-binning': (benchmark_period_binning, lambda args: (args.rows, not args.skip_rowwise)),
+    'customer-features': (benchmark_customer_features, _CUSTOMERS),
+    'approx': (benchmark_approx, _CUSTOMERS),
+    'distribution': (benchmark_distribution, _CUSTOMERS),
+    'trend-windows': (benchmark_trend_windows, _CUSTOMERS),
+    'campaign-response': (benchmark_campaign_response, _CUSTOMERS),
+    'top-customers': (benchmark_top_customers, _CUSTOMERS),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=10_000_000, help='Rows for the period-binning benchmark')
+    parser.add_argument('--skip-rowwise', action='store_true', help='Only time the vectorized path')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--campaigns', type=int, nargs='+', default=[1, 8, 32],
+                        help='Registry sizes for the campaigns benchmark')
+    args = parser.parse_args()
+
+    benchmark, adapter = BENCHMARKS[args.benchmark]
+    benchmark(*adapter(args))
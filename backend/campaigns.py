@@ -0,0 +1,210 @@
+"""Campaign registry
+
+A campaign has an id, a date window, the categories it rewards and a
+baseline window its spend is compared against: the expected campaign spend
+is the baseline spend scaled by campaign months / baseline months (partial
+months count by their share of days).
+
+The window boundaries of all registered campaigns split the calendar into
+elementary windows, inside each of which every campaign is in one fixed
+period (before its baseline, baseline, between, campaign, after). Tagging a
+transaction with its window is one binary search over the sorted
+boundaries however many campaigns overlap, and any campaign's period
+totals are sums over the windows mapped to that period. The aggregate cube
+keeps the window as an axis, so N campaigns cost one scan of the data.
+
+Campaigns can be loaded from a JSON list of objects with the Campaign
+fields (dates as YYYY-MM-DD), e.g. with the server's CAMPAIGNS_PATH.
+
+bin_dates() is the shared date binning: one searchsorted over sorted
+boundaries gives every date its bin as a categorical code, with no Python
+call per row. Campaign.dashboard_periods() uses it for the Pre / During /
+Post labels the dashboard and the analysis notebook report.
+"""
+
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Period codes of a campaign, in date order
+BEFORE_BASELINE, BASELINE, BETWEEN, CAMPAIGN, AFTER = range(5)
+PERIODS = ['before-baseline', 'baseline', 'between', 'campaign', 'after']
+
+# Dashboard campaign periods as groups of period codes, in the order the dashboard lists them
+CAMPAIGN_PERIOD_GROUPS = {
+    'During-Campaign': [CAMPAIGN],
+    'Post-Campaign': [AFTER],
+    'Pre-Campaign': [BEFORE_BASELINE, BASELINE, BETWEEN],
+}
+
+# Dashboard period labels in date order
+DASHBOARD_PERIODS = ['Pre-Campaign', 'During-Campaign', 'Post-Campaign']
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def _months(start, end):
+    """Length of the inclusive window start..end in calendar months, partial months counted by their share of days
+
+    Whole-month windows give whole numbers, e.g. 6.0 for January-June.
+    """
+    first = np.datetime64(start, 'D')
+    stop = np.datetime64(end, 'D') + np.timedelta64(1, 'D')
+    month_starts = np.arange(first.astype('datetime64[M]'), (stop - np.timedelta64(1, 'D')).astype('datetime64[M]') + 2)
+    day_starts = month_starts.astype('datetime64[D]')
+    covered = np.minimum(day_starts[1:], stop) - np.maximum(day_starts[:-1], first)
+    return float(np.sum(covered.astype(np.int64) / np.diff(day_starts).astype(np.int64)))
+
+
+def bin_codes(dates, boundaries):
+    """Bin of every date: i for dates in [boundaries[i - 1], boundaries[i]), 0 before the first boundary
+
+    boundaries must be sorted. Dates and boundaries are compared at second
+    resolution.
+    """
+    boundaries = np.asarray(boundaries, dtype='datetime64[s]')
+    codes = np.searchsorted(boundaries, np.asarray(dates, dtype='datetime64[s]'), side='right')
+    return codes.astype(np.int8 if len(boundaries) < 127 else np.int16)
+
+
+def bin_dates(dates, boundaries, labels):
+    """Categorical of labels (one more than boundaries) binning dates as in bin_codes()"""
+    if len(labels) != len(boundaries) + 1:
+        raise ValueError("bin_dates needs one more label than boundaries")
+    return pd.Categorical.from_codes(bin_codes(dates, boundaries), categories=labels)
+
+
+class Campaign:
+    def __init__(self, campaign_id, start, end, categories, baseline_start, baseline_end, name=None):
+        self.campaign_id = str(campaign_id)
+        self.name = name or self.campaign_id
+        self.start, self.end = _date(start), _date(end)
+        self.baseline_start, self.baseline_end = _date(baseline_start), _date(baseline_end)
+        self.categories = list(categories)
+        if not self.baseline_start <= self.baseline_end < self.start <= self.end:
+            raise ValueError(f"Campaign {self.campaign_id}: the baseline window must end before the campaign starts")
+        if not self.categories:
+            raise ValueError(f"Campaign {self.campaign_id} has no categories")
+
+    @property
+    def months(self):
+        return _months(self.start, self.end)
+
+    @property
+    def baseline_months(self):
+        return _months(self.baseline_start, self.baseline_end)
+
+    def boundaries(self):
+        """First day of the baseline, after the baseline, of the campaign and after the campaign"""
+        one_day = np.timedelta64(1, 'D')
+        return np.array([np.datetime64(self.baseline_start, 'D'), np.datetime64(self.baseline_end, 'D') + one_day,
+                         np.datetime64(self.start, 'D'), np.datetime64(self.end, 'D') + one_day])
+
+    def dashboard_periods(self, dates):
+        """Pre-Campaign / During-Campaign / Post-Campaign label of every date, as a categorical"""
+        return bin_dates(dates, self.boundaries()[2:], DASHBOARD_PERIODS)
+
+    def as_dict(self):
+        return {
+            'campaign_id': self.campaign_id,
+            'name': self.name,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'categories': self.categories,
+            'baseline_start': self.baseline_start.isoformat(),
+            'baseline_end': self.baseline_end.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record['campaign_id'], record['start'], record['end'], record['categories'],
+                   record['baseline_start'], record['baseline_end'], record.get('name'))
+
+
+# The dashboard's original campaign: Premium Dining & Travel Rewards, July-Sept 2024 against H1 2024
+DEFAULT_CAMPAIGNS = [
+    Campaign('dining-travel-2024', '2024-07-01', '2024-09-30', ['Travel', 'Dining'], '2024-01-01', '2024-06-30',
+             name='Premium Dining & Travel Rewards'),
+]
+
+
+class CampaignRegistry:
+    def __init__(self, campaigns=None):
+        self.campaigns = list(DEFAULT_CAMPAIGNS if campaigns is None else campaigns)
+        ids = [campaign.campaign_id for campaign in self.campaigns]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Campaign ids must be unique")
+
+        # Window w covers [boundaries[w - 1], boundaries[w]); window 0 is everything before the first boundary
+        self.boundaries = np.unique(np.concatenate(
+            [campaign.boundaries() for campaign in self.campaigns] or [np.array([], dtype='datetime64[D]')]
+        ))
+        self.window_periods = np.zeros((len(self.campaigns), self.n_windows), dtype=np.int8)
+        for c, campaign in enumerate(self.campaigns):
+            self.window_periods[c, 1:] = np.searchsorted(campaign.boundaries(), self.boundaries, side='right')
+
+    @property
+    def n_windows(self):
+        return len(self.boundaries) + 1
+
+    def __len__(self):
+        return len(self.campaigns)
+
+    def __iter__(self):
+        return iter(self.campaigns)
+
+    def __eq__(self, other):
+        return isinstance(other, CampaignRegistry) and [c.as_dict() for c in self] == [c.as_dict() for c in other]
+
+    def windows(self, dates):
+        """Window of every date, in one searchsorted pass"""
+        return bin_codes(dates, self.boundaries).astype(np.int16)
+
+    def period_windows(self, campaign_index, periods):
+        """Windows in which the campaign is in any of the given periods"""
+        return np.flatnonzero(np.isin(self.window_periods[campaign_index], periods))
+
+    def period_groups(self, campaign_index):
+        """One-hot (window, CAMPAIGN_PERIOD_GROUPS) table of the dashboard period of every window for a campaign"""
+        groups = np.zeros((len(PERIODS), len(CAMPAIGN_PERIOD_GROUPS)), dtype=np.int64)
+        for g, periods in enumerate(CAMPAIGN_PERIOD_GROUPS.values()):
+            groups[periods, g] = 1
+        return groups[self.window_periods[campaign_index]]
+
+    def running(self, categories):
+        """Boolean (window, category) table: is any campaign for that category running in that window"""
+        running = self.window_periods == CAMPAIGN
+        eligible = np.array([[category in campaign.categories for category in categories] for campaign in self],
+                            dtype=bool).reshape(len(self), len(categories))
+        return (running[:, :, None] & eligible[:, None, :]).any(axis=0)
+
+    def as_frames(self):
+        """(campaigns, campaign_categories) DataFrames, e.g. for SQL engines"""
+        campaigns = pd.DataFrame({
+            'campaign_id': [c.campaign_id for c in self],
+            'name': [c.name for c in self],
+            'start_date': pd.to_datetime([c.start for c in self]),
+            'end_date': pd.to_datetime([c.end for c in self]),
+            'baseline_start': pd.to_datetime([c.baseline_start for c in self]),
+            'baseline_end': pd.to_datetime([c.baseline_end for c in self]),
+            'campaign_months': [c.months for c in self],
+            'baseline_months': [c.baseline_months for c in self],
+        })
+        categories = pd.DataFrame(
+            [(c.campaign_id, category) for c in self for category in c.categories], columns=['campaign_id', 'category']
+        )
+        return campaigns, categories
+
+
+def load_campaigns(path):
+    """Registry from a JSON file holding a list of campaign objects"""
+    with open(path) as handle:
+        return CampaignRegistry([Campaign.from_dict(record) for record in json.load(handle)])
@@ -0,0 +1,262 @@
+"""Per-customer feature table
+
+Customer-level endpoints (segmentation, campaign response, top customers)
+need per-customer rollups. Rather than grouping the transactions by customer
+on every request, the features are materialized once as arrays aligned by
+integer customer code and folded forward batch by batch:
+
+- count, spend_cents: lifetime transaction count and spend;
+- region, segment: customer attributes as of the latest transaction (codes on
+  the cube's axes, -1 unknown);
+- region_cells: bit-packed presence per region, and segment_count,
+  segment_spend_cents: count and spend per segment, so a customer with rows
+  in several regions or segments counts in each of them;
+- cells: bit-packed category x campaign window presence, for exact distinct
+  counts and categories_used;
+- categories_used: number of distinct categories transacted in;
+- last_day: day of the latest transaction (days since 1970-01-01, NO_DAY if none);
+- campaign_spend_cents: spend in each campaign's categories during its
+  baseline, campaign and after periods (customer x campaign x FEATURE_PERIODS).
+
+Average ticket and recency are derived from these on demand.
+"""
+
+import numpy as np
+
+from campaigns import AFTER, BASELINE, CAMPAIGN, PERIODS
+
+# Campaign periods with a per-customer spend feature: pre (the baseline window), during and post
+FEATURE_PERIODS = [BASELINE, CAMPAIGN, AFTER]
+
+# last_day of a customer without transactions
+NO_DAY = np.iinfo(np.int32).min
+
+# A customer responded to a campaign when its campaign spend exceeds this multiple of the expected spend
+RESPONSE_THRESHOLD = 1.2
+
+
+def _accumulate(target, index, weights=None):
+    """target[index] += 1 (or weights), at a cost proportional to the batch rather than to target"""
+    if len(index) >= len(target):
+        counts = np.bincount(index, weights=weights, minlength=len(target))
+        target += counts.round().astype(target.dtype) if weights is not None else counts
+        return
+    positions, inverse = np.unique(index, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights)
+    target[positions] += counts.round().astype(target.dtype) if weights is not None else counts
+
+
+def expand_cells(cells, category_positions, n_categories, n_windows):
+    """Re-lay bit-packed customer presence for a category axis grown to n_categories"""
+    n_cells = len(category_positions) * n_windows
+    presence = np.unpackbits(cells, axis=1, count=n_cells, bitorder='little')
+    presence = presence.reshape(len(presence), len(category_positions), n_windows)
+    expanded = np.zeros((len(presence), n_categories, n_windows), dtype=presence.dtype)
+    expanded[:, category_positions] = presence
+    return np.packbits(expanded.reshape(len(presence), -1), axis=1, bitorder='little')
+
+
+class CustomerFeatures:
+    def __init__(self, n_customers, n_categories, campaigns, n_regions=0, n_segments=0):
+        self.campaigns = campaigns
+        self.n_windows = campaigns.n_windows
+        self.n_categories = n_categories
+        self.n_regions = n_regions
+        self.count = np.zeros(n_customers, dtype=np.int64)
+        self.spend_cents = np.zeros(n_customers, dtype=np.int64)
+        self.region = np.full(n_customers, -1, dtype=np.int8)
+        self.segment = np.full(n_customers, -1, dtype=np.int8)
+        self.region_cells = np.zeros((n_customers, (n_regions + 7) // 8), dtype=np.uint8)
+        self.segment_count = np.zeros((n_customers, n_segments), dtype=np.int64)
+        self.segment_spend_cents = np.zeros((n_customers, n_segments), dtype=np.int64)
+        self.cells = np.zeros((n_customers, (n_categories * self.n_windows + 7) // 8), dtype=np.uint8)
+        self.categories_used = np.zeros(n_customers, dtype=np.int16)
+        self.last_day = np.full(n_customers, NO_DAY, dtype=np.int32)
+        self.campaign_spend_cents = np.zeros((n_customers, len(campaigns), len(FEATURE_PERIODS)), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.count)
+
+    def add(self, customer, category, region, segment, window, day, cents, categories):
+        """Fold transaction rows, given as aligned code arrays, into the features in place
+
+        category, region and segment are codes on the cube's axes, categories
+        the labels of the category axis, window the campaign window of each
+        row and day its day number.
+        """
+        _accumulate(self.count, customer)
+        _accumulate(self.spend_cents, customer, cents)
+        self.region[customer] = region
+        self.segment[customer] = segment
+        np.maximum.at(self.last_day, customer, day.astype(np.int32))
+
+        known = region >= 0
+        np.bitwise_or.at(self.region_cells, (customer[known], region[known] // 8),
+                         (1 << (region[known] % 8)).astype(np.uint8))
+        known = segment >= 0
+        segment_cell = customer[known].astype(np.int64) * self.segment_count.shape[1] + segment[known]
+        _accumulate(self.segment_count.reshape(-1), segment_cell)
+        _accumulate(self.segment_spend_cents.reshape(-1), segment_cell, cents[known])
+
+        # Campaign spend: a (category, window) -> feature slot table per campaign, one gather per row
+        slots = self._campaign_slots(categories)
+        campaign_cell = customer.astype(np.int64) * (len(self.campaigns) * len(FEATURE_PERIODS))
+        for c in range(len(self.campaigns)):
+            slot = slots[c][category, window]
+            keep = slot >= 0
+            _accumulate(self.campaign_spend_cents.reshape(-1),
+                        campaign_cell[keep] + c * len(FEATURE_PERIODS) + slot[keep], cents[keep])
+
+        bit = category.astype(np.int64) * self.n_windows + window
+        np.bitwise_or.at(self.cells, (customer, bit // 8), (1 << (bit % 8)).astype(np.uint8))
+        self._count_categories(np.unique(customer))
+
+    def merge(self, other, customer_positions, category_positions, region_positions, segment_positions):
+        """Add another table's features into this one in place, mapping other's codes through the positions"""
+        self.count[customer_positions] += other.count
+        self.spend_cents[customer_positions] += other.spend_cents
+        for codes, attribute, positions in [(other.region, 'region', region_positions),
+                                            (other.segment, 'segment', segment_positions)]:
+            known = codes >= 0
+            getattr(self, attribute)[customer_positions[known]] = positions[codes[known]]
+        self.last_day[customer_positions] = np.maximum(self.last_day[customer_positions], other.last_day)
+        self.region_cells[customer_positions] |= expand_cells(other.region_cells, region_positions, self.n_regions, 1)
+        segments = np.ix_(customer_positions, segment_positions)
+        self.segment_count[segments] += other.segment_count
+        self.segment_spend_cents[segments] += other.segment_spend_cents
+        self.campaign_spend_cents[customer_positions] += other.campaign_spend_cents
+        self.cells[customer_positions] |= expand_cells(other.cells, category_positions, self.n_categories, self.n_windows)
+        self._count_categories(customer_positions)
+
+    def grow(self, n_customers):
+        """Extend every array to n_customers customers"""
+        extra = n_customers - len(self)
+        if extra <= 0:
+            return
+        grow = lambda array, fill: np.concatenate([array, np.full((extra,) + array.shape[1:], fill, dtype=array.dtype)])
+        self.count = grow(self.count, 0)
+        self.spend_cents = grow(self.spend_cents, 0)
+        self.region = grow(self.region, -1)
+        self.segment = grow(self.segment, -1)
+        self.region_cells = grow(self.region_cells, 0)
+        self.segment_count = grow(self.segment_count, 0)
+        self.segment_spend_cents = grow(self.segment_spend_cents, 0)
+        self.cells = grow(self.cells, 0)
+        self.categories_used = grow(self.categories_used, 0)
+        self.last_day = grow(self.last_day, NO_DAY)
+        self.campaign_spend_cents = grow(self.campaign_spend_cents, 0)
+
+    def recode(self, attribute, positions, size):
+        """Follow an axis of the cube that grew to size labels: old code i becomes positions[i]"""
+        if attribute == 'category':
+            self.cells = expand_cells(self.cells, positions, size, self.n_windows)
+            self.n_categories = size
+            return
+        codes = getattr(self, attribute)
+        known = codes >= 0
+        codes[known] = positions[codes[known]]
+        if attribute == 'region':
+            self.region_cells = expand_cells(self.region_cells, positions, size, 1)
+            self.n_regions = size
+        else:
+            for name in ('segment_count', 'segment_spend_cents'):
+                expanded = np.zeros((len(self), size), dtype=np.int64)
+                expanded[:, positions] = getattr(self, name)
+                setattr(self, name, expanded)
+
+    def _campaign_slots(self, categories):
+        """(campaign, category, window) table of the FEATURE_PERIODS slot each cell adds to, -1 for none"""
+        slot_of_period = np.full(len(PERIODS), -1, dtype=np.int8)
+        slot_of_period[FEATURE_PERIODS] = np.arange(len(FEATURE_PERIODS))
+        slots = np.full((len(self.campaigns), len(categories), self.n_windows), -1, dtype=np.int8)
+        for c, campaign in enumerate(self.campaigns):
+            eligible = categories.get_indexer(campaign.categories)
+            slots[c, eligible[eligible >= 0]] = slot_of_period[self.campaigns.window_periods[c]]
+        return slots
+
+    def _count_categories(self, customers):
+        n_cells = self.n_categories * self.n_windows
+        presence = np.unpackbits(self.cells[customers], axis=1, count=n_cells, bitorder='little')
+        presence = presence.reshape(len(presence), self.n_categories, self.n_windows)
+        self.categories_used[customers] = presence.any(axis=2).sum(axis=1)
+
+    def active(self):
+        """Codes of the customers with at least one transaction"""
+        return np.flatnonzero(self.count)
+
+    def avg_ticket(self, customers=None):
+        customers = self.active() if customers is None else customers
+        return self.spend_cents[customers] / 100 / self.count[customers]
+
+    def recency_days(self, customers=None, as_of=None):
+        """Days from each customer's latest transaction to as_of (a date; default the latest transaction day)"""
+        customers = self.active() if customers is None else customers
+        as_of = int(self.last_day.max()) if as_of is None else np.datetime64(as_of, 'D').astype(np.int64)
+        return as_of - self.last_day[customers].astype(np.int64)
+
+    def campaign_spend(self, campaign_index, customers=None):
+        """(baseline, campaign, after) spend of each customer in the campaign's categories, in dollars"""
+        customers = self.active() if customers is None else customers
+        return self.campaign_spend_cents[customers, campaign_index] / 100
+
+    def response_counts(self, threshold=RESPONSE_THRESHOLD, groups=None, n_groups=1):
+        """(eligible, responded) customer counts per campaign x group, as in the campaign_response_rate SQL
+
+        Eligible customers have baseline spend in the campaign's categories;
+        they responded when their campaign spend exceeds threshold x the
+        expected spend (the baseline monthly average times the campaign
+        months). groups is every customer's group code (default all in group
+        0); customers with a negative code are left out.
+        """
+        eligible = np.zeros((len(self.campaigns), n_groups), dtype=np.int64)
+        responded = np.zeros((len(self.campaigns), n_groups), dtype=np.int64)
+        slot = {period: FEATURE_PERIODS.index(period) for period in (BASELINE, CAMPAIGN)}
+        if groups is not None and (groups < 0).any():
+            # Unknown groups count in an extra group that is dropped
+            groups = np.where(groups < 0, n_groups, groups)
+        for c, campaign in enumerate(self.campaigns):
+            baseline = self.campaign_spend_cents[:, c, slot[BASELINE]]
+            campaign_spend = self.campaign_spend_cents[:, c, slot[CAMPAIGN]]
+            customer_eligible = baseline > 0
+            expected = baseline * (campaign.months / campaign.baseline_months)
+            customer_responded = customer_eligible & (campaign_spend > expected * threshold)
+            if groups is None:
+                eligible[c], responded[c] = np.count_nonzero(customer_eligible), np.count_nonzero(customer_responded)
+                continue
+            # One bincount over group x (not eligible, eligible, responded)
+            state = customer_eligible.view(np.int8) + customer_responded.view(np.int8)
+            counts = np.bincount(groups * 3 + state, minlength=3 * (n_groups + 1)).reshape(-1, 3)[:n_groups]
+            eligible[c], responded[c] = counts[:, 1] + counts[:, 2], counts[:, 2]
+        return eligible, responded
+
+    def top_spenders(self, n, customers=None):
+        """Codes of the n customers (among the given codes, default all) with the highest spend, highest first
+
+        Partial selection: one np.partition finds the n-th highest spend and
+        only the customers at or above it are sorted. Ties go to the lower code.
+        """
+        spend = self.spend_cents if customers is None else self.spend_cents[customers]
+        n = min(n, len(spend))
+        if not n:
+            return np.zeros(0, dtype=np.int64)
+        threshold = np.partition(spend, len(spend) - n)[len(spend) - n]
+        above = np.flatnonzero(spend > threshold)
+        top = np.concatenate([above, np.flatnonzero(spend == threshold)[:n - len(above)]])
+        top = top[np.lexsort((top, -spend[top]))]
+        return top if customers is None else customers[top]
+
+    def region_customers(self):
+        """Number of customers with a transaction in each region"""
+        presence = np.unpackbits(self.region_cells, axis=1, count=self.n_regions, bitorder='little')
+        return presence.sum(axis=0, dtype=np.int64)
+
+    def distinct(self, mask):
+        """Number of customers with any of the bit-packed cells in mask"""
+        return int(np.count_nonzero((self.cells & mask).any(axis=1)))
+
+    def nbytes(self):
+        arrays = [self.count, self.spend_cents, self.region, self.segment, self.region_cells, self.segment_count,
+                  self.segment_spend_cents, self.cells, self.categories_used,
+                  self.last_day, self.campaign_spend_cents]
+        return sum(array.nbytes for array in arrays)
+
@@ -1,17 +1,34 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from faker import Faker
-import random
-import json
+import argparse
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-fake = Faker()
-Faker.seed(42)
-np.random.seed(42)
-random.seed(42)
+from campaigns import CAMPAIGN, CampaignRegistry
+
+# Customers per generation shard. Every shard draws from its own RNG streams,
+# so output depends on the seed and shard size but not on the worker count.
+SHARD_SIZE = 10000
+
+# Rows per chunk handed to dataset sinks
+DEFAULT_CHUNK_SIZE = 500000
+
+CUSTOMER_COLUMNS = [
+    'customer_id', 'name', 'email', 'region', 'member_since', 'credit_limit', 'customer_segment'
+]
+
+TRANSACTION_COLUMNS = [
+    'transaction_id', 'customer_id', 'transaction_date', 'category', 'amount',
+    'merchant_name', 'region', 'customer_segment', 'in_campaign_period'
+]
 
 class CreditCardDataGenerator:
-    def __init__(self):
+    def __init__(self, seed=42, campaigns=None):
+        self.seed = seed
+
         self.categories = {
             'Travel': {'base_amount': 300, 'std': 200, 'weight': 0.15},
             'Dining': {'base_amount': 75, 'std': 40, 'weight': 0.20},
@@ -24,106 +41,13 @@ class CreditCardDataGenerator:
         
         self.regions = ['Northeast', 'Southeast', 'Midwest', 'West', 'Southwest']
         
-        # Campaign details: Premium Dining & Travel Rewards (July-Sept 2024)
-        self.campaign_start = datetime(2024, 7, 1)
-        self.campaign_end = datetime(2024, 9, 30)
+        # Campaigns that boost spend (default: Premium Dining & Travel Rewards, July-Sept 2024)
+        self.campaigns = campaigns if campaigns is not None else CampaignRegistry()
         
-    def generate_customers(self, n_customers=5000):
-        """Generate customer profiles"""
-        customers = []
-        for i in range(n_customers):
-            customer = {
-                'customer_id': f'CUST{str(i+1).zfill(6)}',
-                'name': fake.name(),
-                'email': fake.email(),
-                'region': random.choice(self.regions),
-                'member_since': fake.date_between(start_date='-5y', end_date='-1y'),
-                'credit_limit': random.choice([5000, 10000, 15000, 25000, 50000]),
-                'customer_segment': random.choice(['Bronze', 'Silver', 'Gold', 'Platinum'])
-            }
-            customers.append(customer)
-        return pd.DataFrame(customers)
-    
-    def generate_transactions(self, customers_df, start_date, end_date):
-        """Generate realistic credit card transactions"""
-        transactions = []
-        transaction_id = 1
-        
-        for _, customer in customers_df.iterrows():
-            current_date = start_date
-            
-            # Number of transactions per customer (4-15 per month)
-            n_months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month) + 1
-            transactions_per_month = random.randint(4, 15)
-            
-            while current_date <= end_date:
-                # Generate random number of transactions this month
-                n_transactions = random.randint(transactions_per_month - 2, transactions_per_month + 3)
-                
-                for _ in range(n_transactions):
-                    # Random day in the month
-                    if current_date.month == 12:
-                        next_month = datetime(current_date.year + 1, 1, 1)
-                    else:
-                        next_month = datetime(current_date.year, current_date.month + 1, 1)
-                    
-                    days_in_month = (next_month - current_date).days
-                    transaction_date = current_date + timedelta(days=random.randint(0, days_in_month - 1))
-                    
-                    if transaction_date > end_date:
-                        break
-                    
-                    # Select category based on weights
-                    category = random.choices(
-                        list(self.categories.keys()),
-                        weights=[cat['weight'] for cat in self.categories.values()]
-                    )[0]
-                    
-                    # Base amount for category
-                    base_amount = self.categories[category]['base_amount']
-                    std_amount = self.categories[category]['std']
-                    
-                    # Campaign boost for Travel and Dining during campaign period
-                    campaign_boost = 1.0
-                    in_campaign = False
-                    
-                    if self.campaign_start <= transaction_date <= self.campaign_end:
-                        in_campaign = True
-                        # Only certain customers respond to campaign (40% response rate)
-                        if random.random() < 0.40:
-                            if category in ['Travel', 'Dining']:
-                                campaign_boost = random.uniform(1.25, 1.60)  # 25-60% increase
-                    
-                    # Generate amount with some randomness
-                    amount = abs(np.random.normal(base_amount * campaign_boost, std_amount))
-                    amount = round(max(5, amount), 2)  # Minimum $5 transaction
-                    
-                    transaction = {
-                        'transaction_id': f'TXN{str(transaction_id).zfill(8)}',
-                        'customer_id': customer['customer_id'],
-                        'transaction_date': transaction_date.strftime('%Y-%m-%d'),
-                        'category': category,
-                        'amount': amount,
-                        'merchant_name': self._get_merchant_name(category),
-                        'region': customer['region'],
-                        'customer_segment': customer['customer_segment'],
-                        'in_campaign_period': in_campaign
-                    }
-                    
-                    transactions.append(transaction)
-                    transaction_id += 1
-                
-                # Move to next month
-                if current_date.month == 12:
-                    current_date = datetime(current_date.year + 1, 1, 1)
-                else:
-                    current_date = datetime(current_date.year, current_date.month + 1, 1)
+        # member_since is drawn 1-5 years before this date
+        self.reference_date = datetime(2025, 1, 1)
         
-        return pd.DataFrame(transactions)
-    
-    def _get_merchant_name(self, category):
-        """Generate realistic merchant names"""
-        merchants = {
+        self.merchants = {
             'Travel': ['Delta Airlines', 'Marriott Hotels', 'Hilton', 'United Airlines', 'Airbnb', 'Expedia'],
             'Dining': ['The Gourmet Kitchen', 'Starbucks', 'Olive Garden', 'Cheesecake Factory', 'Local Bistro'],
             'Retail': ['Amazon', 'Target', 'Walmart', 'Best Buy', 'Macy\'s', 'Apple Store'],
@@ -132,31 +56,249 @@ class CreditCardDataGenerator:
             'Gas': ['Shell', 'Chevron', 'BP', 'Exxon', 'Mobil'],
             'Other': ['CVS Pharmacy', 'Walgreens', 'Home Depot', 'Lowe\'s']
         }
-        return random.choice(merchants.get(category, ['Generic Merchant']))
-    
-    def generate_dataset(self):
-        """Generate complete dataset"""
-        print("Generating customers...")
-        customers = self.generate_customers(5000)
-        
-        print("Generating transactions...")
-        start_date = datetime(2024, 1, 1)
-        end_date = datetime(2024, 12, 31)
-        transactions = self.generate_transactions(customers, start_date, end_date)
         
-        print(f"Generated {len(customers)} customers and {len(transactions)} transactions")
+        # Array lookups used by the vectorized transaction generator
+        self._category_names = np.array(list(self.categories.keys()), dtype=object)
+        weights = np.array([cat['weight'] for cat in self.categories.values()])
+        self._category_weights = weights / weights.sum()
+        self._base_amounts = np.array([cat['base_amount'] for cat in self.categories.values()], dtype=float)
+        self._std_amounts = np.array([cat['std'] for cat in self.categories.values()], dtype=float)
+        # Per campaign window: is any campaign running, and is one running for each category
+        self._campaign_running = (self.campaigns.window_periods == CAMPAIGN).any(axis=0)
+        self._campaign_boosted = self.campaigns.running(self._category_names)
+        merchant_lists = [self.merchants.get(category, ['Generic Merchant']) for category in self.categories]
+        self._merchant_counts = np.array([len(names) for names in merchant_lists])
+        self._merchant_offsets = np.concatenate([[0], np.cumsum(self._merchant_counts)[:-1]])
+        self._merchant_names = np.array([name for names in merchant_lists for name in names], dtype=object)
         
-        return customers, transactions
+    def _shard_streams(self, shard_index):
+        """Independent customer RNG, transaction RNG and Faker for one shard, derived from the master seed"""
+        customer_seq, transaction_seq, faker_seq = np.random.SeedSequence(
+            self.seed, spawn_key=(shard_index,)
+        ).spawn(3)
+        fake = Faker()
+        fake.seed_instance(int(faker_seq.generate_state(1)[0]))
+        return np.random.default_rng(customer_seq), np.random.default_rng(transaction_seq), fake
 
-if __name__ == "__main__":
-    generator = CreditCardDataGenerator()
-    customers, transactions = generator.generate_dataset()
+    def generate_customers(self, n_customers=5000, shard_size=SHARD_SIZE):
+        """Generate customer profiles"""
+        shards = [
+            self._generate_customer_shard(shard_index, first_id, min(shard_size, n_customers - first_id))
+            for shard_index, first_id in enumerate(range(0, n_customers, shard_size))
+        ]
+        if not shards:
+            return pd.DataFrame(columns=CUSTOMER_COLUMNS)
+        return pd.concat(shards, ignore_index=True)
+
+    def _generate_customer_shard(self, shard_index, first_id, n_customers):
+        """Generate the customers CUST{first_id + 1}..CUST{first_id + n_customers}"""
+        rng, _, fake = self._shard_streams(shard_index)
+        ids = np.arange(first_id + 1, first_id + n_customers + 1)
+
+        earliest = np.datetime64(self.reference_date.replace(year=self.reference_date.year - 5).date(), 'D')
+        latest = np.datetime64(self.reference_date.replace(year=self.reference_date.year - 1).date(), 'D')
+        member_since = earliest + rng.integers(0, (latest - earliest).astype(np.int64) + 1, size=n_customers)
+
+        return pd.DataFrame({
+            'customer_id': np.char.add('CUST', np.char.zfill(ids.astype(str), 6)),
+            'name': [fake.name() for _ in range(n_customers)],
+            'email': [fake.email() for _ in range(n_customers)],
+            'region': rng.choice(self.regions, size=n_customers),
+            'member_since': member_since.astype(str),
+            'credit_limit': rng.choice([5000, 10000, 15000, 25000, 50000], size=n_customers),
+            'customer_segment': rng.choice(['Bronze', 'Silver', 'Gold', 'Platinum'], size=n_customers)
+        })
     
-    # Save to CSV
-    customers.to_csv('/app/backend/data/customers.csv', index=False)
-    transactions.to_csv('/app/backend/data/transactions.csv', index=False)
+    def generate_transactions(self, customers_df, start_date, end_date, shard_size=SHARD_SIZE):
+        """Generate realistic credit card transactions"""
+        chunks = list(self.iter_transactions(customers_df, start_date, end_date, shard_size))
+        if not chunks:
+            return pd.DataFrame(columns=TRANSACTION_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_transactions(self, customers_df, start_date, end_date, shard_size=SHARD_SIZE):
+        """Yield transactions as DataFrames, one per shard of customers"""
+        months = self._month_calendar(start_date, end_date)
+        next_id = 1
+
+        for shard_index, shard_start in enumerate(range(0, len(customers_df), shard_size)):
+            shard = customers_df.iloc[shard_start:shard_start + shard_size]
+            _, rng, _ = self._shard_streams(shard_index)
+            chunk = self._generate_block(shard, months, end_date, rng)
+            next_id = _number_transactions(chunk, next_id)
+            yield chunk
+
+    def iter_shards(self, n_customers, start_date, end_date, n_workers=1, shard_size=SHARD_SIZE):
+        """Yield (customers, transactions) per shard, in customer-id order, generated on n_workers processes"""
+        tasks = [
+            (self.seed, shard_index, first_id, min(shard_size, n_customers - first_id), start_date, end_date, self.campaigns)
+            for shard_index, first_id in enumerate(range(0, n_customers, shard_size))
+        ]
+        next_id = 1
+
+        if n_workers <= 1:
+            results = (_generate_shard(*task) for task in tasks)
+        else:
+            results = _ordered_pool_results(tasks, n_workers)
+
+        for customers, transactions in results:
+            next_id = _number_transactions(transactions, next_id)
+            yield customers, transactions
+
+    def _month_calendar(self, start_date, end_date):
+        """First day and length (in days) of every month between start_date and end_date"""
+        first = np.datetime64(start_date.date(), 'D')
+        month_starts = np.arange(
+            np.datetime64(start_date.date(), 'M'),
+            np.datetime64(end_date.date(), 'M') + 1
+        )
+        days_in_month = ((month_starts + 1).astype('datetime64[D]') - month_starts.astype('datetime64[D]')).astype(np.int64)
+
+        # The first month starts on start_date, not necessarily on the 1st
+        starts = month_starts.astype('datetime64[D]')
+        days_in_month[0] -= (first - starts[0]).astype(np.int64)
+        starts[0] = first
+        return starts, days_in_month
+
+    def _generate_block(self, customers, months, end_date, rng):
+        """Draw every transaction of a block of customers as NumPy arrays"""
+        month_starts, days_in_month = months
+        n_customers = len(customers)
+        n_months = len(month_starts)
+
+        # Number of transactions per customer (4-15 per month), jittered each month
+        transactions_per_month = rng.integers(4, 16, size=n_customers)
+        counts = rng.integers(
+            transactions_per_month[:, None] - 2,
+            transactions_per_month[:, None] + 4,
+            size=(n_customers, n_months)
+        ).ravel()
+
+        customer_idx = np.repeat(np.repeat(np.arange(n_customers), n_months), counts)
+        month_idx = np.repeat(np.tile(np.arange(n_months), n_customers), counts)
+        n = len(customer_idx)
+
+        # Random day in the month
+        offsets = (rng.random(n) * days_in_month[month_idx]).astype(np.int64)
+        dates = month_starts[month_idx] + offsets
+        keep = dates <= np.datetime64(end_date.date(), 'D')
+        customer_idx, dates = customer_idx[keep], dates[keep]
+        n = len(dates)
+
+        # Select category based on weights
+        category_idx = rng.choice(len(self._category_names), size=n, p=self._category_weights)
+
+        # Campaign boost for a campaign's categories while it runs, all campaigns tagged in one pass
+        window = self.campaigns.windows(dates)
+        in_campaign = self._campaign_running[window]
+        # Only certain customers respond to campaign (40% response rate)
+        responded = rng.random(n) < 0.40
+        boosted = responded & self._campaign_boosted[window, category_idx]
+        campaign_boost = np.where(boosted, rng.uniform(1.25, 1.60, size=n), 1.0)  # 25-60% increase
+
+        # Generate amount with some randomness
+        amount = np.abs(rng.normal(self._base_amounts[category_idx] * campaign_boost, self._std_amounts[category_idx]))
+        amount = np.round(np.maximum(5, amount), 2)  # Minimum $5 transaction
+
+        # Pick a merchant uniformly from the category's list
+        merchant_pick = (rng.random(n) * self._merchant_counts[category_idx]).astype(np.int64)
+        merchant = self._merchant_names[self._merchant_offsets[category_idx] + merchant_pick]
+
+        return pd.DataFrame({
+            'customer_id': customers['customer_id'].to_numpy()[customer_idx],
+            'transaction_date': dates.astype(str),
+            'category': self._category_names[category_idx],
+            'amount': amount,
+            'merchant_name': merchant,
+            'region': customers['region'].to_numpy()[customer_idx],
+            'customer_segment': customers['customer_segment'].to_numpy()[customer_idx],
+            'in_campaign_period': in_campaign
+        })
     
-    print("\nDataset saved to /app/backend/data/")
-    print(f"Customers: {len(customers)}")
-    print(f"Transactions: {len(transactions)}")
-    print(f"\nSample transactions:\n{transactions.head()}")
+    def generate_dataset(self, n_customers=5000, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 12, 31),
+                         chunk_size=DEFAULT_CHUNK_SIZE, n_workers=1, customers_sink=None):
+        """Yield transactions in chunks of exactly chunk_size rows (last one may be shorter)
+
+        Customers are generated shard by shard alongside their transactions and
+        written to customers_sink when one is given.
+        """
+        pending = []
+        pending_rows = 0
+
+        for customers, block in self.iter_shards(n_customers, start_date, end_date, n_workers):
+            if customers_sink is not None:
+                customers_sink.write(customers)
+
+            pending.append(block)
+            pending_rows += len(block)
+
+            if pending_rows >= chunk_size:
+                buffered = pd.concat(pending, ignore_index=True)
+                n_full = len(buffered) // chunk_size * chunk_size
+                for offset in range(0, n_full, chunk_size):
+                    yield buffered.iloc[offset:offset + chunk_size].reset_index(drop=True)
+                pending = [buffered.iloc[n_full:]]
+                pending_rows = len(buffered) - n_full
+
+        if pending_rows:
+            yield pd.concat(pending, ignore_index=True)
+
+
+def _generate_shard(seed, shard_index, first_id, n_customers, start_date, end_date, campaigns=None):
+    """Generate one shard of customers and their (unnumbered) transactions; runs in pool workers"""
+    generator = CreditCardDataGenerator(seed=seed, campaigns=campaigns)
+    customers = generator._generate_customer_shard(shard_index, first_id, n_customers)
+    _, rng, _ = generator._shard_streams(shard_index)
+    months = generator._month_calendar(start_date, end_date)
+    return customers, generator._generate_block(customers, months, end_date, rng)
+
+
+def _ordered_pool_results(tasks, n_workers):
+    """Run shard tasks on a process pool, yielding results in task order with bounded look-ahead"""
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(_generate_shard, *task))
+            if len(in_flight) >= 2 * n_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _number_transactions(transactions, next_id):
+    """Prepend sequential TXN ids starting at next_id and return the next free id"""
+    ids = np.arange(next_id, next_id + len(transactions))
+    transactions.insert(0, 'transaction_id', np.char.add('TXN', np.char.zfill(ids.astype(str), 8)))
+    return next_id + len(transactions)
+
+if __name__ == "__main__":
+    from campaigns import load_campaigns
+    from dataset_io import SINKS, CsvSink, write_dataset
+
+    parser = argparse.ArgumentParser(description="Generate the synthetic credit card dataset")
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--format', choices=sorted(SINKS), default='csv')
+    parser.add_argument('--output', type=Path, default=Path(__file__).parent / 'data')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--campaigns', type=Path, help='JSON list of campaigns (default: the 2024 Dining & Travel campaign)')
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    generator = CreditCardDataGenerator(seed=args.seed, campaigns=load_campaigns(args.campaigns) if args.campaigns else None)
+
+    print(f"Generating customers and transactions on {args.workers} worker(s)...")
+    customers_sink = CsvSink(args.output / 'customers.csv')
+    sink = SINKS[args.format](args.output / ('transactions.csv' if args.format == 'csv' else 'transactions'))
+    chunks = generator.generate_dataset(
+        args.customers, chunk_size=args.chunk_size, n_workers=args.workers, customers_sink=customers_sink
+    )
+    try:
+        n_transactions = write_dataset(chunks, sink)
+    finally:
+        customers_sink.close()
+
+    print(f"\nDataset saved to {args.output}")
+    print(f"Customers: {args.customers}")
+    print(f"Transactions: {n_transactions}")
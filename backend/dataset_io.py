@@ -0,0 +1,252 @@
+"""Streaming sinks and readers for generated transaction datasets
+
+Sinks receive transaction chunks one at a time so the full dataset never has
+to be resident in memory:
+
+- CsvSink: a single CSV file, appended chunk by chunk
+- PartitionedSink: Hive-style ``year_month=YYYY-MM/category=X/`` directories
+  of Parquet or Arrow IPC files, one file per chunk and partition
+"""
+
+import io
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+PARTITION_COLUMNS = ['year_month', 'category']
+
+PARTITION_SCHEMA = pa.schema([('year_month', pa.string()), ('category', pa.string())])
+
+# Declared column types for transaction CSVs, so nothing is inferred; strings with few
+# distinct values are dictionary-encoded while parsing and arrive as categoricals
+_DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+TRANSACTION_CSV_TYPES = {
+    'transaction_id': pa.string(),
+    'customer_id': pa.string(),
+    'transaction_date': pa.timestamp('s'),
+    'category': _DICTIONARY,
+    'amount': pa.float64(),
+    'merchant_name': _DICTIONARY,
+    'region': _DICTIONARY,
+    'customer_segment': _DICTIONARY,
+    'in_campaign_period': pa.bool_(),
+}
+DATE_FORMAT = '%Y-%m-%d'
+
+FILE_FORMATS = {
+    'parquet': ('parquet', 'parquet'),
+    'arrow': ('ipc', 'arrow'),
+}
+
+
+class CsvSink:
+    """Append transaction chunks to a single CSV file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+
+    def write(self, chunk):
+        header = self._file is None
+        if header:
+            self._file = open(self.path, 'w', newline='')
+        chunk.to_csv(self._file, header=header, index=False)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PartitionedSink:
+    """Write transaction chunks as columnar files partitioned by year_month and category"""
+
+    def __init__(self, root, file_format='parquet', partition_columns=PARTITION_COLUMNS):
+        self.root = Path(root)
+        self.file_format = file_format
+        self.partition_columns = list(partition_columns)
+        self._n_chunks = 0
+
+    def write(self, chunk):
+        if 'year_month' not in chunk.columns:
+            chunk = chunk.assign(year_month=chunk['transaction_date'].astype(str).str[:7])
+
+        format_name, extension = FILE_FORMATS[self.file_format]
+        ds.write_dataset(
+            pa.Table.from_pandas(chunk, preserve_index=False),
+            self.root,
+            format=format_name,
+            partitioning=self.partition_columns,
+            partitioning_flavor='hive',
+            basename_template=f'part-{self._n_chunks:05d}-{{i}}.{extension}',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        self._n_chunks += 1
+
+    def close(self):
+        pass
+
+
+SINKS = {
+    'csv': CsvSink,
+    'parquet': lambda path: PartitionedSink(path, 'parquet'),
+    'arrow': lambda path: PartitionedSink(path, 'arrow'),
+}
+
+
+def write_dataset(chunks, sink):
+    """Stream chunks into sink and return the number of rows written"""
+    n_rows = 0
+    try:
+        for chunk in chunks:
+            sink.write(chunk)
+            n_rows += len(chunk)
+    finally:
+        sink.close()
+    return n_rows
+
+
+def _detect_format(root):
+    """Infer the file format of a partitioned dataset directory"""
+    for file_format, (format_name, extension) in FILE_FORMATS.items():
+        if next(Path(root).rglob(f'*.{extension}'), None) is not None:
+            return format_name
+    raise FileNotFoundError(f"No Parquet or Arrow files found under {root}")
+
+
+def read_transaction_chunks(path, chunk_size=500000):
+    """Stream transactions from a CSV file or a partitioned directory as DataFrames of at most chunk_size rows"""
+    path = Path(path)
+    if not path.is_dir():
+        yield from _batch_frames(_open_csv(path), chunk_size)
+        return
+    partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+    dataset = ds.dataset(path, format=_detect_format(path), partitioning=partitioning)
+    yield from _batch_frames(dataset.to_batches(batch_size=chunk_size), chunk_size)
+
+
+def _open_csv(source, column_names=None):
+    """Incremental reader of a transactions CSV with the declared column types
+
+    column_names is given for a headerless slice of the file.
+    """
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=column_names),
+        convert_options=pa_csv.ConvertOptions(column_types=TRANSACTION_CSV_TYPES, timestamp_parsers=[DATE_FORMAT])
+    )
+
+
+def _batch_frames(batches, chunk_size):
+    """DataFrames of at most chunk_size rows from a stream of record batches
+
+    Partition files and CSV blocks rarely line up with chunk_size, so small
+    batches are coalesced and large ones sliced.
+    """
+    pending, n_pending = [], 0
+    for batch in batches:
+        for offset in range(0, batch.num_rows, chunk_size):
+            piece = batch.slice(offset, chunk_size)
+            if n_pending + piece.num_rows > chunk_size and pending:
+                yield pa.Table.from_batches(pending).to_pandas()
+                pending, n_pending = [], 0
+            pending.append(piece)
+            n_pending += piece.num_rows
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of file bytes up to end, so a CSV slice can be parsed incrementally"""
+
+    def __init__(self, file, end):
+        self._file = file
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._end - self._file.tell())
+        if n <= 0:
+            return 0
+        data = self._file.read(n)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def transaction_parts(path, n_parts):
+    """Split a transactions CSV or partitioned directory into at most n_parts independently readable parts
+
+    CSV files are split into byte ranges on line boundaries (fields must not
+    contain newlines); directories are split by month partition. Parts are
+    picklable, so worker processes can read them without the parent loading
+    any rows.
+    """
+    path = Path(path)
+    if path.is_dir():
+        file_format = _detect_format(path)
+        extension = dict(FILE_FORMATS.values())[file_format]
+        months = {}
+        for file in sorted(path.rglob(f'*.{extension}')):
+            month = next((p.split('=', 1)[1] for p in file.relative_to(path).parts if p.startswith('year_month=')), '')
+            months.setdefault(month, []).append(str(file))
+        groups = [[] for _ in range(min(n_parts, len(months)) or 1)]
+        for i, files in enumerate(months.values()):
+            groups[i * len(groups) // len(months)].extend(files)
+        return [('dataset', str(path), file_format, files) for files in groups if files]
+
+    size = path.stat().st_size
+    boundaries = [0]
+    with open(path, 'rb') as file:
+        header_end = len(file.readline())
+        for i in range(1, n_parts):
+            file.seek(max(size * i // n_parts, header_end))
+            file.readline()
+            boundaries.append(max(file.tell(), boundaries[-1]))
+    boundaries.append(size)
+    boundaries[0] = header_end
+    return [('csv', str(path), start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def read_transaction_part(part, chunk_size=500000):
+    """Stream one part from transaction_parts as DataFrames of at most chunk_size rows"""
+    if part[0] == 'dataset':
+        _, root, file_format, files = part
+        partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+        dataset = ds.dataset(files, format=file_format, partitioning=partitioning, partition_base_dir=root)
+        yield from _batch_frames(dataset.to_batches(batch_size=chunk_size), chunk_size)
+        return
+
+    _, path, start, end = part
+    with open(path, 'rb') as file:
+        names = pd.read_csv(file, nrows=0).columns.tolist()
+        file.seek(start)
+        reader = io.BufferedReader(_ByteRange(file, end))
+        yield from _batch_frames(_open_csv(reader, column_names=names), chunk_size)
+
+
+def read_transactions(path):
+    """Load transactions from a CSV file or a partitioned Parquet/Arrow directory"""
+    path = Path(path)
+    if path.is_dir():
+        partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+        dataset = ds.dataset(path, format=_detect_format(path), partitioning=partitioning)
+        return dataset.to_table().to_pandas()
+    return read_transactions_csv(path)
+
+
+def read_transactions_csv(source):
+    """Parse a transactions CSV (a path or a binary file object) with the declared column types on all cores
+
+    Raises pyarrow.ArrowInvalid, a ValueError, when a value does not parse as its column's type.
+    """
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(column_types=TRANSACTION_CSV_TYPES, timestamp_parsers=[DATE_FORMAT])
+    )
+    return table.to_pandas()
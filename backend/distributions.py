@@ -0,0 +1,136 @@
+"""Exact per-group amount distributions for percentile and histogram queries
+
+A ValueCounts table holds the sorted distinct (group, value) pairs of a set
+of integer values (amounts in cents) with the running count through each
+pair. Pairs are encoded as one int64 key, group * 2**32 + value + 2**31, so
+the keys of all groups form one sorted array: the value of any rank in any
+group is one binary search over the running counts, and histogram bins for
+every group are one searchsorted of the encoded bin edges. Tables are
+built at load with one sort of the encoded keys per grouping, and merge
+exactly, so they follow the cube through ingest and partial builds.
+"""
+
+import numpy as np
+
+# Added to values so negative amounts encode below positive ones within a group
+VALUE_OFFSET = 1 << 31
+GROUP_SHIFT = 32
+
+
+def _encode(groups, values):
+    return (np.asarray(groups, dtype=np.int64) << GROUP_SHIFT) + (np.asarray(values, dtype=np.int64) + VALUE_OFFSET)
+
+
+def _decode_values(keys):
+    return (keys & ((1 << GROUP_SHIFT) - 1)) - VALUE_OFFSET
+
+
+def _run_lengths(sorted_keys):
+    """Distinct keys of a sorted array and how often each occurs"""
+    if not len(sorted_keys):
+        return sorted_keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+    return sorted_keys[starts], np.diff(np.append(starts, len(sorted_keys)))
+
+
+class ValueCounts:
+    def __init__(self, n_groups, keys=None, counts=None):
+        self.n_groups = n_groups
+        self.keys = np.zeros(0, dtype=np.int64) if keys is None else keys
+        self.cumulative = np.cumsum(np.zeros(0, dtype=np.int64) if counts is None else counts)
+
+    @classmethod
+    def from_values(cls, n_groups, groups, values):
+        """Table of values by group code"""
+        keys = _encode(groups, values)
+        keys.sort()
+        return cls(n_groups, *_run_lengths(keys))
+
+    @classmethod
+    def concatenate(cls, tables):
+        """Table whose groups are those of the given tables in turn"""
+        keys, counts, first_group = [], [], 0
+        for table in tables:
+            keys.append(table.keys + (first_group << GROUP_SHIFT))
+            counts.append(table.counts())
+            first_group += table.n_groups
+        return cls(first_group, np.concatenate(keys or [np.zeros(0, dtype=np.int64)]),
+                   np.concatenate(counts or [np.zeros(0, dtype=np.int64)]))
+
+    def counts(self):
+        return np.diff(self.cumulative, prepend=0)
+
+    def nbytes(self):
+        return self.keys.nbytes + self.cumulative.nbytes
+
+    def add(self, other, group_positions=None):
+        """Add another table's counts in place, its group g landing on group_positions[g] (default g)"""
+        keys = other.keys
+        if group_positions is not None:
+            keys = _encode(np.asarray(group_positions)[other.keys >> GROUP_SHIFT], _decode_values(other.keys))
+        self._reset(np.concatenate([self.keys, keys]), np.concatenate([self.counts(), other.counts()]))
+
+    def regroup(self, positions, n_groups):
+        """Follow a grown group axis: group g becomes positions[g]"""
+        self.n_groups = n_groups
+        counts = self.counts()
+        self._reset(_encode(np.asarray(positions)[self.keys >> GROUP_SHIFT], _decode_values(self.keys)), counts)
+
+    def _reset(self, keys, counts):
+        keys, inverse = np.unique(keys, return_inverse=True)
+        self.keys = keys
+        self.cumulative = np.cumsum(np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64))
+
+    def _count_before(self, positions):
+        """Values at key positions before the given ones"""
+        if not len(self.cumulative):
+            return np.zeros(np.shape(positions), dtype=np.int64)
+        return np.where(positions > 0, self.cumulative[np.maximum(positions - 1, 0)], 0)
+
+    def sizes(self):
+        """Number of values in every group"""
+        bounds = np.searchsorted(self.keys, np.arange(self.n_groups + 1, dtype=np.int64) << GROUP_SHIFT)
+        return np.diff(self._count_before(bounds))
+
+    def value_at(self, groups, ranks):
+        """Value of the given 0-based rank within each group (ranks must be below the group sizes)"""
+        first = self._count_before(np.searchsorted(self.keys, np.asarray(groups, dtype=np.int64) << GROUP_SHIFT))
+        return _decode_values(self.keys[np.searchsorted(self.cumulative, first + ranks, side='right')])
+
+    def quantiles(self, quantiles):
+        """(group, quantile) values, linearly interpolated between ranks as numpy.quantile; NaN for empty groups"""
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        sizes = self.sizes()
+        groups = np.flatnonzero(sizes)
+        position = quantiles[None, :] * (sizes[groups, None] - 1)
+        lower, upper = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+        group_index = np.broadcast_to(groups[:, None], position.shape)
+        low = self.value_at(group_index.ravel(), lower.ravel()).reshape(position.shape)
+        high = self.value_at(group_index.ravel(), upper.ravel()).reshape(position.shape)
+        result = np.full((self.n_groups, len(quantiles)), np.nan)
+        result[groups] = low + (high - low) * (position - lower)
+        return result
+
+    def extremes(self):
+        """(min, max) of every group, NaN for empty groups"""
+        sizes = self.sizes()
+        groups = np.flatnonzero(sizes)
+        low, high = np.full(self.n_groups, np.nan), np.full(self.n_groups, np.nan)
+        low[groups] = self.value_at(groups, np.zeros(len(groups), dtype=np.int64))
+        high[groups] = self.value_at(groups, sizes[groups] - 1)
+        return low, high
+
+    def histogram(self, edges):
+        """(group, bin) counts for sorted edges, bins [edges[i], edges[i + 1]) with the last bin closed
+
+        Values are integers, so a bin holds the values from ceil(edges[i]).
+        Bounds are clipped to the encodable value range: -2**31 is the start
+        of a group's keys and 2**31 the start of the next group's.
+        """
+        edges = np.asarray(edges, dtype=np.float64)
+        bounds = np.ceil(edges)
+        bounds[-1] = np.floor(edges[-1]) + 1
+        bounds = np.clip(bounds, -VALUE_OFFSET, VALUE_OFFSET).astype(np.int64)
+        groups = np.arange(self.n_groups, dtype=np.int64)
+        positions = np.searchsorted(self.keys, _encode(groups[:, None], bounds[None, :]).ravel())
+        return np.diff(self._count_before(positions).reshape(self.n_groups, len(edges)), axis=1)
@@ -0,0 +1,86 @@
+"""Concurrent dashboard load test
+
+Simulates N users that each load the dashboard (the nine analytics requests
+the frontend issues in parallel) in a loop, and reports latency percentiles
+per endpoint. Start the server first, e.g.:
+
+    uvicorn server:app --port 8001
+    python load_test.py --url http://localhost:8001 --users 50 --duration 30
+
+--bust-cache adds a unique query parameter to every request so each one
+misses the response cache and exercises the executor path.
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+import httpx
+import numpy as np
+
+DASHBOARD_ENDPOINTS = [
+    'overview', 'spend-by-category', 'spend-by-region', 'monthly-trends', 'campaign-effectiveness',
+    'customer-segmentation', 'recommendations', 'sql-queries', 'statistical-summary'
+]
+
+# A cheap route that should stay responsive while analytics work is running
+PROBE_ENDPOINT = '/api/'
+
+
+async def _timed_get(client, path, params, latencies, errors):
+    start = time.perf_counter()
+    try:
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        errors[path] = errors.get(path, 0) + 1
+        return
+    latencies.setdefault(path, []).append(time.perf_counter() - start)
+
+
+async def _user(client, deadline, bust_cache, counter, latencies, errors):
+    while time.perf_counter() < deadline:
+        params = {'nocache': next(counter)} if bust_cache else None
+        await asyncio.gather(
+            *(_timed_get(client, f'/api/analytics/{endpoint}', params, latencies, errors)
+              for endpoint in DASHBOARD_ENDPOINTS),
+            _timed_get(client, PROBE_ENDPOINT, None, latencies, errors)
+        )
+
+
+async def run_load_test(url, users=50, duration=30.0, bust_cache=False):
+    latencies, errors = {}, {}
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=users * (len(DASHBOARD_ENDPOINTS) + 1))
+
+    async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(_user(client, deadline, bust_cache, counter, latencies, errors) for _ in range(users)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{users} users for {elapsed:.1f}s: {total:,} requests ({total / elapsed:,.0f} req/s), "
+          f"{sum(errors.values())} errors")
+    print(f"  {'path':<42}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    all_samples = []
+    for path in sorted(latencies):
+        samples = np.array(latencies[path]) * 1000
+        all_samples.append(samples)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        print(f"  {path:<42}{len(samples):>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+    if all_samples:
+        p50, p95, p99 = np.percentile(np.concatenate(all_samples), [50, 95, 99])
+        print(f"  {'all':<42}{total:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8001')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--bust-cache', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.url, args.users, args.duration, args.bust_cache))
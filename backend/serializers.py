@@ -0,0 +1,61 @@
+"""Response body encoders for analytics payloads
+
+Payloads are dicts/lists whose table columns may be NumPy arrays. JSON is
+written with orjson, which serializes NumPy buffers directly instead of
+walking them value by value. Arrow IPC is offered for clients that can
+read columnar data.
+"""
+
+import numpy as np
+import orjson
+import pyarrow as pa
+
+JSON_MEDIA_TYPE = 'application/json'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Response formats accepted by the analytics endpoints: records/columns are JSON
+RESPONSE_FORMATS = ['records', 'columns', 'arrow']
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Fallback for values orjson does not handle natively"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def render_json(payload):
+    return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+
+
+def _arrow_table(payload):
+    """Arrow table for a payload: a column dict, a list of records, or one flat record"""
+    if isinstance(payload, dict) and len(payload) == 1 and isinstance(next(iter(payload.values())), (dict, list)):
+        payload = next(iter(payload.values()))
+    if isinstance(payload, list):
+        return pa.Table.from_pylist(payload)
+    if payload and all(isinstance(v, (list, np.ndarray)) for v in payload.values()):
+        return pa.Table.from_pydict(payload)
+    if payload and all(isinstance(v, str) for v in payload.values()):
+        return pa.Table.from_pydict({'name': list(payload), 'value': list(payload.values())})
+    return pa.Table.from_pylist([payload])
+
+
+def render_arrow(payload):
+    """Arrow IPC stream with the payload's table"""
+    table = _arrow_table(payload)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def render(payload, response_format='records'):
+    """Encode payload for response_format, returning (body, media type)"""
+    if response_format == 'arrow':
+        return render_arrow(payload), ARROW_MEDIA_TYPE
+    return render_json(payload), JSON_MEDIA_TYPE
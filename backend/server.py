@@ -1,5 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Query, UploadFile, File
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,15 +7,28 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any
+from typing import List, Optional
 import uuid
+import copy
+import io
+import hashlib
+import asyncio
+import time
 from datetime import datetime, timezone
 import pandas as pd
 import json
 
 # Import analytics modules
-from analytics_engine import CreditCardAnalytics
-from sql_queries import get_all_queries
+from analytics_engine import DEFAULT_QUANTILES, CreditCardAnalytics
+from campaigns import CampaignRegistry, load_campaigns
+from customer_features import RESPONSE_THRESHOLD
+from dataset_io import read_transactions_csv
+from sql_queries import SQL_QUERIES, get_all_queries
+from sql_backend import ANALYTICS_BACKENDS, SqlAnalytics
+from response_cache import CachedResponse, ResponseCache, etag_matches
+from analytics_executor import AnalyticsExecutor, AnalyticsTimeout
+from serializers import RESPONSE_FORMATS, render, render_json
+from store_cache import process_memory
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -25,24 +38,360 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Load data
-TRANSACTIONS_PATH = ROOT_DIR / 'data' / 'transactions.csv'
-CUSTOMERS_PATH = ROOT_DIR / 'data' / 'customers.csv'
+# Load data (a CSV file or a partitioned Parquet/Arrow directory)
+TRANSACTIONS_PATH = Path(os.environ.get('TRANSACTIONS_PATH', ROOT_DIR / 'data' / 'transactions.csv'))
+CUSTOMERS_PATH = Path(os.environ.get('CUSTOMERS_PATH', ROOT_DIR / 'data' / 'customers.csv'))
+
+# Engine behind the endpoints: 'pandas' (in-memory aggregate cube) or 'duckdb' (SQL over the data files)
+ANALYTICS_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'pandas')
+if ANALYTICS_BACKEND not in ANALYTICS_BACKENDS:
+    raise ValueError(f"ANALYTICS_BACKEND must be one of: {', '.join(ANALYTICS_BACKENDS)}")
+
+# ANALYTICS_STREAMING=1 builds the pandas engine chunk by chunk without keeping rows, for files larger than memory
+ANALYTICS_STREAMING = os.environ.get('ANALYTICS_STREAMING', '').lower() in ('1', 'true', 'yes')
+ANALYTICS_CHUNK_SIZE = int(os.environ.get('ANALYTICS_CHUNK_SIZE', 500000))
+# Keep a memory-mappable copy of the normalized store next to the data so later loads skip parsing
+ANALYTICS_STORE_CACHE = os.environ.get('ANALYTICS_STORE_CACHE', '1').lower() in ('1', 'true', 'yes')
+# Processes that read and aggregate parts of the data in parallel when (re)loading
+ANALYTICS_BUILD_WORKERS = int(os.environ.get('ANALYTICS_BUILD_WORKERS', 1))
+# JSON list of the campaigns to evaluate, re-read on every reload (default: the 2024 Dining & Travel campaign)
+CAMPAIGNS_PATH = os.environ.get('CAMPAIGNS_PATH')
 
 # Initialize analytics engine
-transactions_df = None
 customers_df = None
 analytics = None
 
-def load_analytics_data():
-    global transactions_df, customers_df, analytics
+# Identifies the loaded data; part of every response cache key
+dataset_version = None
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 256)),
+    ttl_seconds=float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+)
+_load_count = 0
+
+def _endpoint_limits(spec):
+    """Parse 'endpoint=limit,endpoint=limit' into a dict"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        endpoint, limit = item.split('=')
+        limits[endpoint.strip()] = int(limit)
+    return limits
+
+# Blocking engine work runs here, never on the event loop
+executor = AnalyticsExecutor(
+    thread_workers=int(os.environ.get('ANALYTICS_THREADS', 8)),
+    process_workers=int(os.environ.get('ANALYTICS_PROCESSES', 0)),
+    timeout_seconds=float(os.environ.get('ANALYTICS_TIMEOUT', 30)),
+    default_limit=int(os.environ.get('ANALYTICS_CONCURRENCY', 4)),
+    endpoint_limits=_endpoint_limits(os.environ.get('ANALYTICS_ENDPOINT_LIMITS', '')),
+    process_endpoints=[e.strip() for e in os.environ.get('ANALYTICS_PROCESS_ENDPOINTS', '').split(',') if e.strip()]
+)
+
+def _dataset_fingerprint(load_count):
+    """Fingerprint of the data files (path, size, mtime) plus a per-load counter"""
+    parts = [str(load_count)]
+    for path in [TRANSACTIONS_PATH, CUSTOMERS_PATH]:
+        files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            stat = file.stat()
+            parts.append(f"{file}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+# Outcome of the most recent load attempt, served by /api/analytics/reload-status
+last_reload = None
+# Serializes reloads and ingests, which both replace the live engine
+_reload_lock = asyncio.Lock()
+# False once batches have been ingested that the process-pool workers (loaded from the files) lack
+_engine_from_files = True
+
+# Columns a settlement file must carry to be ingested
+INGEST_COLUMNS = ['transaction_id', 'customer_id', 'transaction_date', 'category', 'amount', 'region', 'customer_segment']
+
+def _build_analytics():
+    """Read the data files and build a new engine without touching the live one"""
+    started = time.perf_counter()
+    customers = pd.read_csv(CUSTOMERS_PATH)
+    campaigns = load_campaigns(CAMPAIGNS_PATH) if CAMPAIGNS_PATH else CampaignRegistry()
+    if ANALYTICS_BACKEND == 'duckdb':
+        engine = SqlAnalytics(
+            TRANSACTIONS_PATH, CUSTOMERS_PATH,
+            threads=os.environ.get('DUCKDB_THREADS'),
+            memory_limit=os.environ.get('DUCKDB_MEMORY_LIMIT'),
+            temp_directory=os.environ.get('DUCKDB_TEMP_DIRECTORY'),
+            campaigns=campaigns
+        )
+        rows = engine.get_overview_metrics()['total_transactions']
+    elif ANALYTICS_STREAMING or ANALYTICS_BUILD_WORKERS > 1:
+        engine = CreditCardAnalytics.from_files(
+            TRANSACTIONS_PATH, customers, n_workers=ANALYTICS_BUILD_WORKERS,
+            chunk_size=ANALYTICS_CHUNK_SIZE, keep_store=not ANALYTICS_STREAMING, campaigns=campaigns
+        )
+        rows = int(engine.cube.count.sum())
+    else:
+        engine = CreditCardAnalytics.from_path(TRANSACTIONS_PATH, customers, cache=ANALYTICS_STORE_CACHE, campaigns=campaigns)
+        rows = len(engine.transactions)
+    if ANALYTICS_BACKEND == 'pandas' and not ANALYTICS_STREAMING:
+        engine.index  # Built now so the first filtered request does not pay for it
+    return customers, engine, rows, time.perf_counter() - started
+
+async def load_analytics_data(reason="startup"):
+    """Build a new engine off the event loop, warm its responses and swap it in
+
+    Requests already running keep the engine and dataset version they started
+    with. If the load fails the current engine stays in service.
+    """
+    global customers_df, analytics, dataset_version, _load_count, last_reload, _engine_from_files
+    async with _reload_lock:
+        requested_at = datetime.now(timezone.utc).isoformat()
+        try:
+            loop = asyncio.get_running_loop()
+            customers, engine, rows, load_seconds = await loop.run_in_executor(None, _build_analytics)
+            version = await loop.run_in_executor(None, _dataset_fingerprint, _load_count + 1)
+            
+            # Render every panel for the new version before any request can see it
+            started = time.perf_counter()
+            for endpoint in DASHBOARD_PANELS:
+                await _panel_entry(endpoint, engine=engine, version=version)
+            warm_seconds = time.perf_counter() - started
+        except Exception as e:
+            logging.error(f"Error loading data: {e}")
+            last_reload = {"reason": reason, "requested_at": requested_at, "status": "failed",
+                           "error": str(e), "dataset_version": dataset_version}
+            return last_reload
+        
+        # Nothing awaits between these assignments, so requests see the old or the new state, never a mix
+        customers_df, analytics = customers, engine
+        _load_count += 1
+        dataset_version = version
+        _engine_from_files = True
+        response_cache.discard_stale(version)
+        if ANALYTICS_BACKEND == 'pandas':
+            executor.start_process_pool(TRANSACTIONS_PATH, CUSTOMERS_PATH,
+                                        ANALYTICS_CHUNK_SIZE if ANALYTICS_STREAMING else None, engine.campaigns)
+        
+        last_reload = {
+            "reason": reason,
+            "requested_at": requested_at,
+            "status": "ok",
+            "dataset_version": version,
+            "backend": ANALYTICS_BACKEND,
+            "rows": rows,
+            "customers": len(customers),
+            "load_seconds": round(load_seconds, 3),
+            "rows_per_second": round(rows / load_seconds) if load_seconds else None,
+            "warm_seconds": round(warm_seconds, 3)
+        }
+        logging.info(f"Loaded {rows} transactions and {len(customers)} customers "
+                     f"in {load_seconds:.2f}s ({last_reload['rows_per_second']} rows/s), warmed in {warm_seconds:.2f}s")
+        return last_reload
+
+async def ingest_analytics_data(batch_df):
+    """Append a transaction batch to a copy of the live engine, warm it and swap it in
+
+    Ingested rows live in memory only; a reload re-reads the data files.
+    """
+    global analytics, dataset_version, _load_count, _engine_from_files
+    async with _reload_lock:
+        loop = asyncio.get_running_loop()
+        engine = copy.copy(analytics)
+        started = time.perf_counter()
+        rows = await loop.run_in_executor(None, engine.ingest, batch_df)
+        ingest_seconds = time.perf_counter() - started
+        version = await loop.run_in_executor(None, _dataset_fingerprint, _load_count + 1)
+        for endpoint in DASHBOARD_PANELS:
+            await _panel_entry(endpoint, engine=engine, version=version)
+        
+        analytics = engine
+        _load_count += 1
+        dataset_version = version
+        _engine_from_files = False
+        response_cache.discard_stale(version)
+        return {
+            "dataset_version": version,
+            "rows": rows,
+            "total_rows": int(engine.cube.count.sum()),
+            "ingest_seconds": round(ingest_seconds, 3),
+            "rows_per_second": round(rows / ingest_seconds) if ingest_seconds else None
+        }
+
+async def _watch_data_files():
+    """Reload whenever the data files or the campaigns file change (enabled with ANALYTICS_WATCH=1)"""
+    from watchfiles import awatch
+    paths = [TRANSACTIONS_PATH, CUSTOMERS_PATH] + ([Path(CAMPAIGNS_PATH)] if CAMPAIGNS_PATH else [])
+    watched = [path if path.is_dir() else path.parent for path in paths]
+    targets = {str(path.resolve()) for path in paths}
+    async for changes in awatch(*dict.fromkeys(watched)):
+        if any(path == target or path.startswith(target + os.sep) for _, path in changes for target in targets):
+            await load_analytics_data("file-change")
+
+# Dashboard panels: endpoint name -> (engine method, key the result is nested under)
+DASHBOARD_PANELS = {
+    "overview": ("get_overview_metrics", None),
+    "spend-by-category": ("get_spend_by_category", "data"),
+    "spend-by-region": ("get_spend_by_region", "data"),
+    "monthly-trends": ("get_monthly_trends", "data"),
+    "campaign-effectiveness": ("get_campaign_effectiveness", "data"),
+    "customer-segmentation": ("get_customer_segmentation", "data"),
+    "recommendations": ("get_recommended_segments", "data"),
+    "sql-queries": (None, "queries"),
+    "statistical-summary": ("get_statistical_summary", None),
+}
+
+# Query parameters that restrict a panel to matching transactions: inclusive YYYY-MM-DD dates,
+# and lists of accepted values given as repeated or comma-separated parameters
+FILTER_PARAMS = ['start_date', 'end_date', 'region', 'segment', 'category', 'customer_id']
+
+def _panel_filters(query_params):
+    """Engine filters from the request's query parameters"""
+    filters = {}
+    for name in FILTER_PARAMS:
+        values = [v.strip() for value in query_params.getlist(name) for v in value.split(',') if v.strip()]
+        if not values:
+            continue
+        if name.endswith('_date'):
+            try:
+                filters[name] = datetime.strptime(values[-1], '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{name} must be a YYYY-MM-DD date")
+        else:
+            filters[name] = values
+    if filters and (ANALYTICS_BACKEND != 'pandas' or ANALYTICS_STREAMING):
+        raise HTTPException(status_code=400, detail="Filters need the pandas backend with the transaction store loaded")
+    return filters
+
+# Panels that answer ?approx=true from sketches: the quantile-sketch median (see sketches.py for the
+# error bound). Distinct customer counts are always exact; other panels ignore approx
+APPROX_PANELS = {"statistical-summary"}
+
+def _panel_approx(query_params):
+    """Whether the request opts into approximate answers"""
+    approx = query_params.get('approx', '').lower() in ('1', 'true', 'yes')
+    if approx and ANALYTICS_BACKEND != 'pandas':
+        raise HTTPException(status_code=400, detail="approx=true needs the pandas backend")
+    return approx
+
+def _cache_key(endpoint, params=(), version=None):
+    return (endpoint, tuple(sorted(params)), version)
+
+def _etag_response(request, entry):
+    """Send a cached entry, or 304 when the client's If-None-Match matches its ETag"""
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache', 'X-Dataset-Version': str(dataset_version)}
+    if etag_matches(request.headers.get('if-none-match'), entry.etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+async def _panel_entry(endpoint, params=(), engine=None, version=None, filters=None, approx=False):
+    """Cached rendered body of a dashboard panel, computed on the executor on a miss
+
+    engine/version default to the live ones, read once so a reload mid-request
+    cannot mix them. filters (see _panel_filters) and approx must also appear
+    in params.
+    """
+    if engine is None:
+        engine, version = analytics, dataset_version
+    local = engine is not analytics or not _engine_from_files
+    key = _cache_key(endpoint, params, version)
+    entry = response_cache.get(key)
+    if entry is None:
+        response_format = dict(params).get('format', 'records')
+        method_name, wrap_key = DASHBOARD_PANELS[endpoint]
+        # Table panels can hand back their NumPy columns for the columnar formats
+        args = (('records' if response_format == 'records' else 'columns'),) if wrap_key == "data" else ()
+        if approx and endpoint in APPROX_PANELS:
+            args += (True,)
+        if method_name is None:
+            result = get_all_queries()
+        elif filters:
+            result = await executor.run_engine(endpoint, engine, "run_filtered", filters, method_name, *args, local=local)
+        else:
+            result = await executor.run_engine(endpoint, engine, method_name, *args, local=local)
+        payload = result if wrap_key is None else {wrap_key: result}
+        body, media_type = await executor.run("render", render, payload, response_format)
+        entry = response_cache.put(key, CachedResponse(body, media_type))
+    return entry
+
+async def analytics_response(request, endpoint):
+    """Serve a dashboard panel through the response cache and the executor layer
+
+    ?format=records (default), columns (a list per column) or arrow (Arrow IPC stream).
+    The FILTER_PARAMS restrict the panel to the matching transactions.
+    ?approx=true answers the APPROX_PANELS from sketches.
+    """
+    if analytics is None and DASHBOARD_PANELS[endpoint][0] is not None:
+        raise HTTPException(status_code=500, detail="Analytics data not loaded")
+    response_format = request.query_params.get('format', 'records')
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    filters = _panel_filters(request.query_params)
+    approx = _panel_approx(request.query_params)
+    
     try:
-        transactions_df = pd.read_csv(TRANSACTIONS_PATH)
-        customers_df = pd.read_csv(CUSTOMERS_PATH)
-        analytics = CreditCardAnalytics(transactions_df, customers_df)
-        logging.info(f"Loaded {len(transactions_df)} transactions and {len(customers_df)} customers")
+        entry = await _panel_entry(endpoint, request.query_params.multi_items(), filters=filters, approx=approx)
+        return _etag_response(request, entry)
+    except AnalyticsTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        logging.error(f"Error loading data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def query_response(request, endpoint, method_name, args, wrap_key=None, response_format='records', filters=None):
+    """Serve an engine method that takes request parameters (args) through the response cache and the executor layer
+
+    The pandas backend only. The FILTER_PARAMS apply (or the given filters,
+    already read from them); a ValueError from the engine is a 400.
+    """
+    if analytics is None:
+        raise HTTPException(status_code=500, detail="Analytics data not loaded")
+    if ANALYTICS_BACKEND != 'pandas':
+        raise HTTPException(status_code=400, detail=f"{endpoint} needs the pandas backend")
+    if filters is None:
+        filters = _panel_filters(request.query_params)
+    
+    engine, version = analytics, dataset_version
+    local = not _engine_from_files
+    key = _cache_key(endpoint, request.query_params.multi_items(), version)
+    entry = response_cache.get(key)
+    try:
+        if entry is None:
+            if filters:
+                result = await executor.run_engine(endpoint, engine, "run_filtered", filters, method_name, *args, local=local)
+            else:
+                result = await executor.run_engine(endpoint, engine, method_name, *args, local=local)
+            payload = result if wrap_key is None else {wrap_key: result}
+            body, media_type = await executor.run("render", render, payload, response_format)
+            entry = response_cache.put(key, CachedResponse(body, media_type))
+        return _etag_response(request, entry)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except AnalyticsTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+async def _stream_dashboard(panels, ndjson, filters=None, approx=False):
+    """Yield panels as they finish: one JSON object, or one {"panel", "payload"} line each for NDJSON"""
+    params = [(name, ','.join(value) if isinstance(value, list) else value) for name, value in (filters or {}).items()]
+    params += [('approx', 'true')] if approx else []
+    pending = {asyncio.ensure_future(_panel_entry(panel, params, filters=filters, approx=approx)): panel
+               for panel in panels}
+    first = True
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                panel = pending.pop(task)
+                try:
+                    body = task.result().body
+                except Exception as e:
+                    body = render_json({"error": str(e)})
+                if ndjson:
+                    yield b'{"panel":' + json.dumps(panel).encode() + b',"payload":' + body + b'}\n'
+                else:
+                    yield (b'{' if first else b',') + json.dumps(panel).encode() + b':' + body
+                first = False
+        if not ndjson:
+            yield b'{}' if first else b'}'
+    finally:
+        for task in pending:
+            task.cancel()
 
 # Create the main app without a prefix
 app = FastAPI(title="Credit Card Analytics API")
@@ -86,114 +435,223 @@ async def get_status_checks():
 
 # Analytics Routes
 @api_router.get("/analytics/overview")
-async def get_overview():
+async def get_overview(request: Request):
     """Get overview metrics including campaign ROI"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        metrics = analytics.get_overview_metrics()
-        return metrics
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "overview")
 
 @api_router.get("/analytics/spend-by-category")
-async def get_spend_by_category():
+async def get_spend_by_category(request: Request):
     """Get spend analysis by category"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_spend_by_category()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "spend-by-category")
 
 @api_router.get("/analytics/spend-by-region")
-async def get_spend_by_region():
+async def get_spend_by_region(request: Request):
     """Get spend analysis by geographic region"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_spend_by_region()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "spend-by-region")
 
 @api_router.get("/analytics/monthly-trends")
-async def get_monthly_trends():
+async def get_monthly_trends(request: Request):
     """Get monthly spend trends"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_monthly_trends()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "monthly-trends")
 
 @api_router.get("/analytics/campaign-effectiveness")
-async def get_campaign_effectiveness():
+async def get_campaign_effectiveness(request: Request):
     """Get campaign effectiveness analysis (Pre vs During vs Post)"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_campaign_effectiveness()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "campaign-effectiveness")
 
 @api_router.get("/analytics/customer-segmentation")
-async def get_customer_segmentation():
+async def get_customer_segmentation(request: Request):
     """Get customer segmentation analysis"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_customer_segmentation()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "customer-segmentation")
 
 @api_router.get("/analytics/recommendations")
-async def get_recommendations():
+async def get_recommendations(request: Request):
     """Get recommended customer segments for future campaigns"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
-    try:
-        data = analytics.get_recommended_segments()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await analytics_response(request, "recommendations")
 
 @api_router.get("/analytics/statistical-summary")
-async def get_statistical_summary():
+async def get_statistical_summary(request: Request):
     """Get statistical summary of transactions"""
-    if analytics is None:
-        raise HTTPException(status_code=500, detail="Analytics data not loaded")
-    
+    return await analytics_response(request, "statistical-summary")
+
+def _float_list(query_params, name):
+    """Comma-separated numbers of a query parameter, None when absent"""
+    value = query_params.get(name)
+    if value is None:
+        return None
     try:
-        data = analytics.get_statistical_summary()
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return [float(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be comma-separated numbers")
+
+@api_router.get("/analytics/distribution")
+async def get_amount_distribution(request: Request, by: str = "all", bins: int = Query(20, ge=1, le=1000),
+                                  scale: str = "linear"):
+    """Get exact transaction amount percentiles and a histogram per group
+
+    by: all, category, region, segment or period (each campaign's Pre / During / Post).
+    ?quantiles=0.5,0.9,0.99 picks the percentiles (fractions in [0, 1]); the
+    histogram has bins linear or log-scale bins over all amounts, or the bins
+    between explicit ?edges=0,50,100,500 (dollars). The FILTER_PARAMS apply.
+    """
+    quantiles = _float_list(request.query_params, 'quantiles')
+    edges = _float_list(request.query_params, 'edges')
+    args = (by, DEFAULT_QUANTILES if quantiles is None else quantiles, bins, scale, edges)
+    return await query_response(request, "distribution", "get_amount_distribution", args)
+
+@api_router.get("/analytics/trend-windows")
+async def get_trend_windows(request: Request, granularity: str = "month", window: int = Query(3, ge=1, le=1000),
+                            lag: int = Query(1, ge=1, le=1000), response_format: str = Query("records", alias="format")):
+    """Get spend per category and period with a moving average, period-over-period growth and running total
+
+    granularity: day, week or month. moving_avg_spend averages the last
+    window periods and growth_percentage compares with lag periods earlier.
+    ?format=records (default), columns or arrow; the FILTER_PARAMS apply.
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    orient = 'records' if response_format == 'records' else 'columns'
+    return await query_response(request, "trend-windows", "get_trend_windows", (granularity, window, lag, orient),
+                                wrap_key="data", response_format=response_format)
+
+@api_router.get("/analytics/campaign-response")
+async def get_campaign_response(request: Request, by: str = "segment", threshold: float = Query(RESPONSE_THRESHOLD, gt=0),
+                                response_format: str = Query("records", alias="format")):
+    """Get per-customer campaign response rates by customer segment, region or overall (by=all)
+
+    A customer with baseline spend in a campaign's categories responded when
+    its campaign spend exceeds threshold x the expected spend.
+    ?format=records (default), columns or arrow; the FILTER_PARAMS apply.
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    orient = 'records' if response_format == 'records' else 'columns'
+    return await query_response(request, "campaign-response", "get_campaign_response", (by, threshold, orient),
+                                wrap_key="data", response_format=response_format)
+
+@api_router.get("/analytics/top-customers")
+async def get_top_customers(request: Request, n: int = Query(20, ge=1, le=10000),
+                            response_format: str = Query("records", alias="format")):
+    """Get the top n customers by total spend
+
+    ?segment= and ?region= select customers by attribute straight from the
+    customer features; ?category= and the start_date / end_date period rank
+    customers by their spend in the matching transactions.
+    ?format=records (default), columns or arrow.
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    orient = 'records' if response_format == 'records' else 'columns'
+    filters = _panel_filters(request.query_params)
+    segment, region = filters.pop('segment', None), filters.pop('region', None)
+    return await query_response(request, "top-customers", "get_top_customers", (n, segment, region, orient),
+                                wrap_key="data", response_format=response_format, filters=filters)
 
 @api_router.get("/analytics/sql-queries")
-async def get_sql_queries():
+async def get_sql_queries(request: Request):
     """Get all SQL queries used in the analysis"""
+    return await analytics_response(request, "sql-queries")
+
+@api_router.get("/analytics/sql-queries/{query_name}/results")
+async def get_sql_query_results(query_name: str):
+    """Run one of the SQL queries against the loaded data (duckdb backend only)"""
+    if query_name not in SQL_QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query: {query_name}")
+    if ANALYTICS_BACKEND != 'duckdb' or analytics is None:
+        raise HTTPException(status_code=400, detail="SQL queries run only with ANALYTICS_BACKEND=duckdb")
+    
+    try:
+        rows = await executor.run_engine("sql-query", analytics, "run_query", query_name)
+    except AnalyticsTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return Response(content=render_json({"query": query_name, "data": rows}), media_type="application/json")
+
+@api_router.get("/analytics/dashboard")
+async def get_dashboard(request: Request, panels: Optional[str] = None, response_format: str = Query("json", alias="format")):
+    """Get several dashboard panels in one streamed response, each panel sent as soon as it is ready
+
+    panels is a comma-separated subset of the panel endpoints (default: all).
+    format=ndjson streams one {"panel": ..., "payload": ...} line per panel.
+    The panel FILTER_PARAMS and approx apply to every panel.
+    """
+    selected = list(DASHBOARD_PANELS) if not panels else [p.strip() for p in panels.split(',') if p.strip()]
+    unknown = [p for p in selected if p not in DASHBOARD_PANELS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown panels: {', '.join(unknown)}")
+    if analytics is None and any(DASHBOARD_PANELS[p][0] is not None for p in selected):
+        raise HTTPException(status_code=500, detail="Analytics data not loaded")
+    
+    filters = _panel_filters(request.query_params)
+    approx = _panel_approx(request.query_params)
+    
+    ndjson = response_format == "ndjson"
+    return StreamingResponse(
+        _stream_dashboard(dict.fromkeys(selected), ndjson, filters, approx),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers={'X-Dataset-Version': str(dataset_version)}
+    )
+
+@api_router.get("/analytics/campaigns")
+async def get_campaigns():
+    """Get the registered campaigns the campaign metrics evaluate"""
+    if analytics is None:
+        raise HTTPException(status_code=500, detail="Analytics data not loaded")
+    return {"dataset_version": dataset_version, "campaigns": [campaign.as_dict() for campaign in analytics.campaigns]}
+
+@api_router.get("/analytics/cache-stats")
+async def get_cache_stats():
+    """Get response cache hit/miss counters"""
+    return {"dataset_version": dataset_version, **response_cache.stats()}
+
+@api_router.get("/analytics/executor-stats")
+async def get_executor_stats():
+    """Get executor queue depth, concurrency and timeout counters per endpoint"""
+    return executor.stats()
+
+@api_router.get("/analytics/memory")
+async def get_memory():
+    """Get this worker's memory (rss/pss/uss) and how much of the loaded store is memory-mapped"""
+    store = analytics.memory_usage() if hasattr(analytics, 'memory_usage') else None
+    return {"pid": os.getpid(), **process_memory(), "store": store}
+
+@api_router.post("/analytics/reload")
+async def reload_data():
+    """Reload the data files and swap in a new engine without interrupting requests"""
+    result = await load_analytics_data("admin")
+    if result["status"] != "ok":
+        raise HTTPException(status_code=500, detail=result)
+    return result
+
+@api_router.post("/analytics/ingest")
+async def ingest_transactions(file: UploadFile = File(...)):
+    """Append a settlement file (CSV with the transactions.csv columns) to the live data"""
+    if analytics is None:
+        raise HTTPException(status_code=500, detail="Analytics data not loaded")
+    if ANALYTICS_BACKEND != 'pandas':
+        raise HTTPException(status_code=409, detail=f"Ingest needs the pandas backend; the {ANALYTICS_BACKEND} backend "
+                                                    "reads the data files directly, so append to them and reload")
     try:
-        queries = get_all_queries()
-        return {"queries": queries}
+        batch_df = read_transactions_csv(io.BytesIO(await file.read()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"CSV does not match the transactions schema: {e}")
+    missing = [column for column in INGEST_COLUMNS if column not in batch_df.columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing)}")
+    
+    try:
+        return await ingest_analytics_data(batch_df)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/analytics/reload-status")
+async def get_reload_status():
+    """Get the outcome, duration and throughput of the most recent data load"""
+    return last_reload or {"status": "never"}
+
 @api_router.get("/analytics/download-data")
 async def download_transactions():
     """Download transactions CSV"""
-    if not TRANSACTIONS_PATH.exists():
+    if not TRANSACTIONS_PATH.is_file():
         raise HTTPException(status_code=404, detail="Data file not found")
     
     return FileResponse(
@@ -223,9 +681,14 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     """Load analytics data on startup"""
-    load_analytics_data()
-    logger.info("Analytics data loaded successfully")
+    await load_analytics_data()
+    if os.environ.get('ANALYTICS_WATCH', '').lower() in ('1', 'true', 'yes'):
+        app.state.watcher = asyncio.create_task(_watch_data_files())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    watcher = getattr(app.state, 'watcher', None)
+    if watcher is not None:
+        watcher.cancel()
+    executor.shutdown()
\ No newline at end of file
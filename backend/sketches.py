@@ -0,0 +1,56 @@
+"""Mergeable amount sketch behind the approximate query mode (?approx=true)
+
+The exact median walks the amount value-count table, so it grows with the
+number of distinct amounts. QuantileSketch answers the same question in
+time that depends only on its fixed size, and merges by summing bucket
+counts, so the cube maintains one sketch of every amount through add(),
+merge() and ingest.
+
+Error bound: QuantileSketch keeps log-spaced buckets (as in DDSketch), so
+every quantile it returns is within RELATIVE_ACCURACY (1%) of the exact
+lower q-quantile of the values added, whatever their distribution.
+
+Distinct customer counts have no approximate mode. They are read from the
+per-customer feature table, which keeps every customer's presence per
+region, segment and category x campaign window, so an exact count is one
+pass over a bit matrix that a HyperLogLog would not undercut.
+"""
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+
+# Largest value the quantile sketch resolves (larger values land in the last bucket)
+MAX_SKETCH_VALUE = 1e10
+
+
+class QuantileSketch:
+    """A row of log-spaced bucket counts per sketch, for values >= 1 (e.g. amounts in cents)"""
+
+    def __init__(self, n_sketches, relative_accuracy=RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        n_buckets = int(np.ceil(np.log(MAX_SKETCH_VALUE) / np.log(self.gamma))) + 1
+        self.counts = np.zeros((n_sketches, n_buckets), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def keys(self, values):
+        """Bucket of every value: bucket k covers (gamma**(k-1), gamma**k]"""
+        values = np.maximum(np.asarray(values, dtype=np.float64), 1.0)
+        keys = np.ceil(np.log(values) / np.log(self.gamma)).astype(np.int64)
+        return np.minimum(keys, self.counts.shape[1] - 1)
+
+    def add(self, sketches, keys):
+        """Add bucket keys[i] (see keys()) to sketch sketches[i]"""
+        flat = np.asarray(sketches, dtype=np.int64) * self.counts.shape[1] + keys
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def quantile(self, q, sketches=None):
+        """Estimated q-quantile of the values in the given sketches (default all), NaN if they are empty"""
+        counts = (self.counts if sketches is None else self.counts[list(sketches)]).sum(axis=0)
+        n = int(counts.sum())
+        if n == 0:
+            return np.nan
+        bucket = int(np.searchsorted(np.cumsum(counts), int(q * (n - 1)), side='right'))
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
@@ -0,0 +1,319 @@
+"""DuckDB execution backend for the analytics endpoints
+
+SqlAnalytics exposes the same get_* methods as CreditCardAnalytics but
+answers them by running the statements in sql_queries.SQL_QUERIES (plus a
+few dashboard queries defined here) inside an embedded DuckDB database. The
+data files are registered as views rather than loaded, so DuckDB scans them
+with its own thread pool and can spill to temp_directory when a query
+needs more than memory_limit. Select it with ANALYTICS_BACKEND=duckdb.
+
+Check parity with the pandas engine on a dataset:
+
+    python sql_backend.py data/transactions.csv data/customers.csv
+"""
+
+import argparse
+import math
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from analytics_engine import CreditCardAnalytics, table_output
+from campaigns import CampaignRegistry, load_campaigns
+from dataset_io import FILE_FORMATS, PARTITION_SCHEMA, _detect_format, read_transactions
+from sql_queries import SQL_QUERIES
+
+ANALYTICS_BACKENDS = ['pandas', 'duckdb']
+
+# Dashboard metrics without a counterpart in SQL_QUERIES
+DASHBOARD_QUERIES = {
+    "overview": """
+    SELECT
+        COUNT(*) as total_transactions,
+        SUM(amount) as total_spend,
+        AVG(amount) as avg_transaction_size,
+        COUNT(DISTINCT customer_id) as unique_customers
+    FROM transactions;
+    """,
+
+    "campaign_revenue": """
+    SELECT
+        SUM(CASE WHEN t.transaction_date BETWEEN c.start_date AND c.end_date THEN t.amount ELSE 0 END) as campaign_spend,
+        SUM(CASE WHEN t.transaction_date BETWEEN c.baseline_start AND c.baseline_end
+                 THEN t.amount / c.baseline_months * c.campaign_months ELSE 0 END) as expected_spend
+    FROM transactions t
+    JOIN campaign_categories cc ON t.category = cc.category
+    JOIN campaigns c ON c.campaign_id = cc.campaign_id;
+    """,
+
+    "segment_uplift": """
+    SELECT
+        t.customer_segment as segment,
+        SUM(CASE WHEN t.transaction_date BETWEEN c.start_date AND c.end_date THEN t.amount END) as campaign_spend,
+        SUM(CASE WHEN t.transaction_date BETWEEN c.baseline_start AND c.baseline_end
+                 THEN t.amount / c.baseline_months * c.campaign_months END) as expected_spend
+    FROM transactions t
+    JOIN campaign_categories cc ON t.category = cc.category
+    JOIN campaigns c ON c.campaign_id = cc.campaign_id
+    GROUP BY t.customer_segment;
+    """,
+
+    "statistical_summary": """
+    WITH campaign_rows AS (
+        SELECT
+            t.amount,
+            t.transaction_date BETWEEN c.start_date AND c.end_date as in_campaign,
+            t.transaction_date BETWEEN c.baseline_start AND c.baseline_end as in_baseline
+        FROM transactions t
+        JOIN campaign_categories cc ON t.category = cc.category
+        JOIN campaigns c ON c.campaign_id = cc.campaign_id
+    )
+    SELECT
+        AVG(amount) as mean_transaction,
+        MEDIAN(amount) as median_transaction,
+        STDDEV_SAMP(amount) as std_transaction,
+        MIN(amount) as min_transaction,
+        MAX(amount) as max_transaction,
+        (SELECT AVG(CASE WHEN in_campaign THEN amount END) FROM campaign_rows) as campaign_mean,
+        (SELECT AVG(CASE WHEN in_baseline THEN amount END) FROM campaign_rows) as pre_campaign_mean
+    FROM transactions;
+    """
+}
+
+CAMPAIGN_PERIOD_ORDER = ['During-Campaign', 'Post-Campaign', 'Pre-Campaign']
+
+
+def _source_sql(path):
+    """FROM-clause expression reading a CSV file or a partitioned Parquet directory"""
+    path = Path(path)
+    if not path.is_dir():
+        return f"read_csv_auto('{path}')"
+    return f"read_parquet('{path}/**/*.{FILE_FORMATS['parquet'][1]}', hive_partitioning = true)"
+
+
+class SqlAnalytics:
+    def __init__(self, transactions_path, customers_path, database=':memory:',
+                 threads=None, memory_limit=None, temp_directory=None, campaigns=None):
+        self.campaigns = campaigns if campaigns is not None else CampaignRegistry()
+        self.connection = duckdb.connect(database)
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.connection.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory:
+            self.connection.execute(f"SET temp_directory = '{temp_directory}'")
+
+        transactions_path = Path(transactions_path)
+        self._arrow_dataset = None
+        if transactions_path.is_dir() and _detect_format(transactions_path) == 'ipc':
+            # DuckDB has no built-in Arrow IPC reader; scan it through a pyarrow dataset
+            import pyarrow.dataset as ds
+            self._arrow_dataset = ds.dataset(
+                transactions_path, format='ipc', partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+            )
+            self.connection.register('transactions_source', self._arrow_dataset)
+            source = 'transactions_source'
+        else:
+            source = _source_sql(transactions_path)
+
+        self.connection.execute(
+            f"CREATE VIEW transactions AS SELECT * REPLACE (CAST(transaction_date AS DATE) AS transaction_date) "
+            f"FROM {source}"
+        )
+        self.connection.execute(f"CREATE VIEW customers AS SELECT * FROM {_source_sql(customers_path)}")
+
+        # The campaign registry as the campaigns / campaign_categories tables the campaign queries join
+        campaigns_frame, categories_frame = self.campaigns.as_frames()
+        self.connection.register('campaigns_frame', campaigns_frame)
+        self.connection.register('campaign_categories_frame', categories_frame)
+        self.connection.execute(
+            "CREATE OR REPLACE TABLE campaigns AS SELECT * REPLACE ("
+            + ", ".join(f"CAST({column} AS DATE) AS {column}"
+                        for column in ['start_date', 'end_date', 'baseline_start', 'baseline_end'])
+            + ") FROM campaigns_frame"
+        )
+        self.connection.execute("CREATE OR REPLACE TABLE campaign_categories AS SELECT * FROM campaign_categories_frame")
+        self.connection.unregister('campaigns_frame')
+        self.connection.unregister('campaign_categories_frame')
+
+    def _query(self, sql):
+        # A cursor per call: a DuckDB connection must not be shared between threads
+        cursor = self.connection.cursor()
+        if self._arrow_dataset is not None:
+            # Registered objects are per connection
+            cursor.register('transactions_source', self._arrow_dataset)
+        return cursor.execute(sql).df()
+
+    def run_query(self, query_name):
+        """Execute one of the SQL_QUERIES and return its rows as records"""
+        if query_name not in SQL_QUERIES:
+            raise KeyError(f"Unknown query: {query_name}")
+        result = self._query(SQL_QUERIES[query_name])
+        for column in result.select_dtypes(include=['datetime', 'datetimetz']).columns:
+            result[column] = result[column].dt.strftime('%Y-%m-%d')
+        return result.astype(object).where(result.notna(), None).to_dict('records')
+
+    def get_overview_metrics(self):
+        """Calculate key overview metrics"""
+        overview = self._query(DASHBOARD_QUERIES["overview"]).iloc[0]
+        # Summed over the registered campaigns
+        revenue = self._query(DASHBOARD_QUERIES["campaign_revenue"]).iloc[0]
+        campaign_spend = float(revenue['campaign_spend']) if pd.notna(revenue['campaign_spend']) else 0.0
+        expected = float(revenue['expected_spend']) if pd.notna(revenue['expected_spend']) else 0.0
+        incremental = campaign_spend - expected
+        return {
+            'total_transactions': int(overview['total_transactions']),
+            'total_spend': round(float(overview['total_spend']), 2),
+            'avg_transaction_size': round(float(overview['avg_transaction_size']), 2),
+            'unique_customers': int(overview['unique_customers']),
+            'campaign_revenue': round(campaign_spend, 2),
+            'incremental_revenue': round(incremental, 2),
+            'roi_percentage': round(incremental / expected * 100, 2) if expected > 0 else 0
+        }
+
+    def get_spend_by_category(self, orient='records'):
+        """Analyze spend by category"""
+        result = self._query(SQL_QUERIES["spend_by_category"])
+        return table_output({
+            'category': result['category'].tolist(),
+            'transaction_count': result['transaction_count'].to_numpy(),
+            'total_spend': result['total_spend'].to_numpy(),
+            'avg_transaction': result['avg_transaction_size'].to_numpy(),
+            'spend_percentage': result['spend_percentage'].to_numpy()
+        }, orient)
+
+    def get_spend_by_region(self, orient='records'):
+        """Analyze spend by geographic region"""
+        result = self._query(SQL_QUERIES["spend_by_region"])
+        return table_output({column: result[column].to_numpy() for column in result.columns}, orient)
+
+    def get_monthly_trends(self, orient='records'):
+        """Analyze monthly spend trends"""
+        result = self._query(SQL_QUERIES["monthly_spend_trend"])
+        return table_output({
+            'month': result['month'].dt.strftime('%Y-%m').tolist(),
+            'category': result['category'].tolist(),
+            'transaction_count': result['transaction_count'].to_numpy(),
+            'total_spend': result['total_spend'].to_numpy()
+        }, orient)
+
+    def get_campaign_effectiveness(self, orient='records'):
+        """Analyze campaign effectiveness (Pre vs During vs Post) for every registered campaign"""
+        result = self._query(SQL_QUERIES["campaign_effectiveness"])
+        # Registry order: campaigns as registered, categories as listed by their campaign
+        campaign_order = {c.campaign_id: i for i, c in enumerate(self.campaigns)}
+        categories = {c.campaign_id: c.categories for c in self.campaigns}
+        result['campaign_order'] = result['campaign_id'].map(campaign_order)
+        result['category_order'] = [categories[c].index(category) for c, category in zip(result['campaign_id'], result['category'])]
+        result['campaign_period'] = pd.Categorical(result['campaign_period'], CAMPAIGN_PERIOD_ORDER, ordered=True)
+        result = result.sort_values(['campaign_order', 'category_order', 'campaign_period'])
+
+        # Uplift of campaign spend over the scaled baseline spend, per campaign and category
+        spend = result.pivot_table(index=['campaign_id', 'category'], columns='campaign_period', values='total_spend',
+                                   aggfunc='sum', observed=False).reindex(columns=CAMPAIGN_PERIOD_ORDER)
+        baseline = result.groupby(['campaign_id', 'category'], observed=True)['baseline_spend'].sum().reindex(spend.index)
+        months = pd.Series({c.campaign_id: c.months / c.baseline_months for c in self.campaigns})
+        expected = baseline.fillna(0) * months.reindex(spend.index.get_level_values(0)).to_numpy()
+        uplift = ((spend['During-Campaign'].fillna(0) - expected) / expected * 100).where(expected > 0, 0).round(2)
+        during = result['campaign_period'] == 'During-Campaign'
+        keys = pd.MultiIndex.from_arrays([result['campaign_id'], result['category']])
+
+        return table_output({
+            'campaign_id': result['campaign_id'].tolist(),
+            'campaign_period': result['campaign_period'].astype(str).tolist(),
+            'category': result['category'].astype(str).tolist(),
+            'transaction_count': result['transaction_count'].to_numpy(),
+            'total_spend': result['total_spend'].to_numpy(),
+            'avg_transaction': result['avg_transaction_size'].to_numpy(),
+            'unique_customers': result['unique_customers'].to_numpy(),
+            'uplift_percentage': np.where(during, uplift.reindex(keys).to_numpy(dtype=float), 0.0)
+        }, orient)
+
+    def get_customer_segmentation(self, orient='records'):
+        """Analyze customer segments"""
+        result = self._query(SQL_QUERIES["customer_segmentation"])
+        return table_output({column: result[column].to_numpy() for column in result.columns}, orient)
+
+    def get_recommended_segments(self, orient='records'):
+        """Recommend customer segments for future campaigns"""
+        result = self._query(DASHBOARD_QUERIES["segment_uplift"]).dropna()
+        result['uplift_percentage'] = ((result['campaign_spend'] - result['expected_spend'])
+                                       / result['expected_spend'] * 100).round(2)
+        result = result.sort_values('uplift_percentage', ascending=False, kind='stable')
+        uplift = result['uplift_percentage']
+        return table_output({
+            'segment': result['segment'].tolist(),
+            'uplift_percentage': uplift.to_numpy(),
+            'recommendation': [
+                'High Priority' if value > 20 else 'Medium Priority' if value > 10 else 'Low Priority' for value in uplift
+            ]
+        }, orient)
+
+    def get_statistical_summary(self):
+        """Generate statistical summary"""
+        stats = {key: float(value) for key, value in self._query(DASHBOARD_QUERIES["statistical_summary"]).iloc[0].items()}
+        for key in ['campaign_mean', 'pre_campaign_mean']:
+            if math.isnan(stats[key]):
+                stats[key] = 0
+        stats['mean_uplift'] = (
+            float((stats['campaign_mean'] - stats['pre_campaign_mean']) / stats['pre_campaign_mean'] * 100)
+            if stats['pre_campaign_mean'] > 0 else 0
+        )
+        return stats
+
+
+def _compare(expected, actual, path, tolerance, differences):
+    if isinstance(expected, dict):
+        if set(expected) != set(actual):
+            differences.append(f"{path}: keys {sorted(expected)} != {sorted(actual)}")
+            return
+        for key in expected:
+            _compare(expected[key], actual[key], f"{path}.{key}", tolerance, differences)
+    elif isinstance(expected, list):
+        if len(expected) != len(actual):
+            differences.append(f"{path}: {len(expected)} rows != {len(actual)} rows")
+            return
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            _compare(left, right, f"{path}[{i}]", tolerance, differences)
+    elif isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        if not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=tolerance):
+            differences.append(f"{path}: {expected} != {actual}")
+    elif expected != actual:
+        differences.append(f"{path}: {expected!r} != {actual!r}")
+
+
+def check_parity(pandas_engine, sql_engine, tolerance=0.01):
+    """Differences between the two backends' dashboard results
+
+    SQL_QUERIES round amounts to cents, so numbers are compared to within
+    tolerance.
+    """
+    differences = []
+    for method_name in ['get_overview_metrics', 'get_spend_by_category', 'get_spend_by_region',
+                        'get_monthly_trends', 'get_campaign_effectiveness', 'get_customer_segmentation',
+                        'get_recommended_segments', 'get_statistical_summary']:
+        _compare(getattr(pandas_engine, method_name)(), getattr(sql_engine, method_name)(),
+                 method_name, tolerance, differences)
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the pandas and DuckDB backends on a dataset")
+    parser.add_argument('transactions', help='transactions CSV file or partitioned directory')
+    parser.add_argument('customers', help='customers CSV file')
+    parser.add_argument('--tolerance', type=float, default=0.01)
+    parser.add_argument('--campaigns', help='JSON list of campaigns (default: the 2024 Dining & Travel campaign)')
+    args = parser.parse_args()
+
+    campaigns = load_campaigns(args.campaigns) if args.campaigns else None
+    pandas_engine = CreditCardAnalytics(read_transactions(args.transactions), pd.read_csv(args.customers), campaigns)
+    sql_engine = SqlAnalytics(args.transactions, args.customers, campaigns=campaigns)
+    for query_name in SQL_QUERIES:
+        print(f"{query_name}: {len(sql_engine.run_query(query_name))} rows")
+    differences = check_parity(pandas_engine, sql_engine, args.tolerance)
+    for difference in differences:
+        print(difference)
+    print(f"{len(differences)} differences")
+    raise SystemExit(1 if differences else 0)
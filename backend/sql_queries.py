@@ -2,6 +2,11 @@
 
 This module contains SQL queries that would be used in a production database.
 For demonstration purposes, we'll also have pandas equivalents.
+
+Campaign queries read the campaign registry from two tables:
+campaigns (campaign_id, name, start_date, end_date, baseline_start,
+baseline_end, campaign_months, baseline_months) and
+campaign_categories (campaign_id, category), and report every campaign.
 """
 
 SQL_QUERIES = {
@@ -45,31 +50,36 @@ SQL_QUERIES = {
     """,
     
     "campaign_effectiveness": """
-    -- Campaign Effectiveness Analysis (Pre vs During vs Post)
+    -- Campaign Effectiveness Analysis (Pre vs During vs Post) per campaign
     WITH campaign_periods AS (
         SELECT 
-            transaction_date,
-            customer_id,
-            category,
-            amount,
+            c.campaign_id,
+            t.transaction_date,
+            t.customer_id,
+            t.category,
+            t.amount,
             CASE 
-                WHEN transaction_date < '2024-07-01' THEN 'Pre-Campaign'
-                WHEN transaction_date BETWEEN '2024-07-01' AND '2024-09-30' THEN 'During-Campaign'
+                WHEN t.transaction_date < c.start_date THEN 'Pre-Campaign'
+                WHEN t.transaction_date <= c.end_date THEN 'During-Campaign'
                 ELSE 'Post-Campaign'
-            END as campaign_period
-        FROM transactions
+            END as campaign_period,
+            t.transaction_date BETWEEN c.baseline_start AND c.baseline_end as in_baseline
+        FROM transactions t
+        JOIN campaign_categories cc ON t.category = cc.category
+        JOIN campaigns c ON c.campaign_id = cc.campaign_id
     )
     SELECT 
+        campaign_id,
         campaign_period,
         category,
         COUNT(*) as transaction_count,
         ROUND(SUM(amount), 2) as total_spend,
         ROUND(AVG(amount), 2) as avg_transaction_size,
-        COUNT(DISTINCT customer_id) as unique_customers
+        COUNT(DISTINCT customer_id) as unique_customers,
+        SUM(CASE WHEN in_baseline THEN amount ELSE 0 END) as baseline_spend
     FROM campaign_periods
-    WHERE category IN ('Travel', 'Dining')
-    GROUP BY campaign_period, category
-    ORDER BY category, campaign_period;
+    GROUP BY campaign_id, campaign_period, category
+    ORDER BY campaign_id, category, campaign_period;
     """,
     
     "customer_segmentation": """
@@ -114,45 +124,54 @@ SQL_QUERIES = {
     """,
     
     "campaign_response_rate": """
-    -- Campaign Response Rate Analysis
+    -- Campaign Response Rate Analysis per campaign
     WITH campaign_customers AS (
         SELECT 
-            customer_id,
-            SUM(CASE WHEN transaction_date BETWEEN '2024-07-01' AND '2024-09-30' 
-                     AND category IN ('Travel', 'Dining') 
-                     THEN amount ELSE 0 END) as campaign_spend,
-            SUM(CASE WHEN transaction_date < '2024-07-01' 
-                     AND category IN ('Travel', 'Dining') 
-                     THEN amount ELSE 0 END) / 6.0 as avg_monthly_pre_campaign
-        FROM transactions
-        GROUP BY customer_id
+            c.campaign_id,
+            t.customer_id,
+            c.campaign_months,
+            SUM(CASE WHEN t.transaction_date BETWEEN c.start_date AND c.end_date 
+                     THEN t.amount ELSE 0 END) as campaign_spend,
+            SUM(CASE WHEN t.transaction_date BETWEEN c.baseline_start AND c.baseline_end 
+                     THEN t.amount ELSE 0 END) / c.baseline_months as avg_monthly_pre_campaign
+        FROM transactions t
+        JOIN campaign_categories cc ON t.category = cc.category
+        JOIN campaigns c ON c.campaign_id = cc.campaign_id
+        GROUP BY c.campaign_id, t.customer_id, c.campaign_months, c.baseline_months
     )
     SELECT 
+        campaign_id,
         COUNT(*) as total_customers,
-        SUM(CASE WHEN campaign_spend > avg_monthly_pre_campaign * 3 * 1.2 THEN 1 ELSE 0 END) as responded_customers,
-        ROUND(100.0 * SUM(CASE WHEN campaign_spend > avg_monthly_pre_campaign * 3 * 1.2 THEN 1 ELSE 0 END) / COUNT(*), 2) as response_rate_percentage
+        SUM(CASE WHEN campaign_spend > avg_monthly_pre_campaign * campaign_months * 1.2 THEN 1 ELSE 0 END) as responded_customers,
+        ROUND(100.0 * SUM(CASE WHEN campaign_spend > avg_monthly_pre_campaign * campaign_months * 1.2 THEN 1 ELSE 0 END) / COUNT(*), 2) as response_rate_percentage
     FROM campaign_customers
-    WHERE avg_monthly_pre_campaign > 0;
+    WHERE avg_monthly_pre_campaign > 0
+    GROUP BY campaign_id
+    ORDER BY campaign_id;
     """,
     
     "incremental_revenue": """
-    -- Calculate Incremental Revenue from Campaign
+    -- Calculate Incremental Revenue per Campaign
     WITH spend_comparison AS (
         SELECT 
-            SUM(CASE WHEN transaction_date BETWEEN '2024-07-01' AND '2024-09-30' 
-                     AND category IN ('Travel', 'Dining') 
-                     THEN amount ELSE 0 END) as campaign_period_spend,
-            SUM(CASE WHEN transaction_date BETWEEN '2024-01-01' AND '2024-06-30' 
-                     AND category IN ('Travel', 'Dining') 
-                     THEN amount ELSE 0 END) / 6.0 * 3 as expected_spend
-        FROM transactions
+            c.campaign_id,
+            SUM(CASE WHEN t.transaction_date BETWEEN c.start_date AND c.end_date 
+                     THEN t.amount ELSE 0 END) as campaign_period_spend,
+            SUM(CASE WHEN t.transaction_date BETWEEN c.baseline_start AND c.baseline_end 
+                     THEN t.amount ELSE 0 END) / c.baseline_months * c.campaign_months as expected_spend
+        FROM transactions t
+        JOIN campaign_categories cc ON t.category = cc.category
+        JOIN campaigns c ON c.campaign_id = cc.campaign_id
+        GROUP BY c.campaign_id, c.baseline_months, c.campaign_months
     )
     SELECT 
+        campaign_id,
         ROUND(campaign_period_spend, 2) as actual_campaign_spend,
         ROUND(expected_spend, 2) as expected_baseline_spend,
         ROUND(campaign_period_spend - expected_spend, 2) as incremental_revenue,
         ROUND(((campaign_period_spend - expected_spend) / expected_spend) * 100, 2) as revenue_lift_percentage
-    FROM spend_comparison;
+    FROM spend_comparison
+    ORDER BY campaign_id;
     """,
     
     "category_trends_window": """
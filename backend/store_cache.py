@@ -0,0 +1,146 @@
+"""Memory-mapped cache of the normalized transaction store
+
+Parsing and normalizing a large CSV dominates cold start. The normalized
+store (integer codes, cents, second-resolution dates, categoricals) is
+written once as a directory of .npy files next to the data, named by a
+fingerprint of the source. Later loads memory-map those files read-only
+and wrap them in a DataFrame without copying, so every process that loads
+the same data (uvicorn workers, process-pool workers) shares one copy of
+the store through the page cache instead of holding its own.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bytes hashed from each end of every source file, on top of its size and mtime
+SAMPLE_BYTES = 1 << 20
+
+CACHE_SUFFIX = '.store'
+
+
+def source_fingerprint(path):
+    """Hash of a data file or directory: sizes, mtimes and the first and last SAMPLE_BYTES of each file
+
+    Hashing every byte of a multi-gigabyte file would cost as much as
+    parsing it; the sampled content guards against edits that keep the size
+    and mtime.
+    """
+    path = Path(path)
+    digest = hashlib.sha1()
+    for file in sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]:
+        stat = file.stat()
+        digest.update(f"{file.relative_to(path) if path.is_dir() else file.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(file, 'rb') as handle:
+            digest.update(handle.read(SAMPLE_BYTES))
+            if stat.st_size > SAMPLE_BYTES:
+                handle.seek(max(stat.st_size - SAMPLE_BYTES, SAMPLE_BYTES))
+                digest.update(handle.read())
+    return digest.hexdigest()[:16]
+
+
+def cache_path(path, fingerprint):
+    path = Path(path)
+    return path.parent / f".{path.name}.{fingerprint}{CACHE_SUFFIX}"
+
+
+def write_store(target, store, customer_ids):
+    """Write the store and customer ids to the target directory, one .npy file per array
+
+    Categorical columns are saved as their codes plus a JSON list of
+    categories. The directory is written under a temporary name and renamed,
+    so concurrent writers (several workers starting at once) are safe.
+    """
+    partial = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    partial.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for column in store.columns:
+        values = store[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(partial / f"{column}.npy", values.array.codes)
+            columns.append({'name': column, 'categories': values.cat.categories.tolist()})
+        else:
+            np.save(partial / f"{column}.npy", values.to_numpy())
+            columns.append({'name': column})
+    np.save(partial / 'customer_ids.npy', np.asarray(customer_ids, dtype=str))
+    (partial / 'columns.json').write_text(json.dumps(columns))
+    try:
+        partial.rename(target)
+    except OSError:
+        # Another process finished first
+        shutil.rmtree(partial, ignore_errors=True)
+
+
+def read_store(target):
+    """Map a cached store read-only, returning (store, customer ids); store columns are views of the files"""
+    columns = {}
+    for column in json.loads((target / 'columns.json').read_text()):
+        values = np.load(target / f"{column['name']}.npy", mmap_mode='r')
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, categories=column['categories'], validate=False)
+        columns[column['name']] = values
+    customer_ids = np.load(target / 'customer_ids.npy').astype(object)
+    return pd.DataFrame(columns, copy=False), customer_ids
+
+
+def is_mapped(array):
+    """Whether array is a view of a memory-mapped file"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def process_memory():
+    """Memory of the current process in bytes: rss, plus pss (shared pages split between processes)
+    and uss (pages private to this process) where /proc/self/smaps_rollup is available
+    """
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as rollup:
+            fields = dict(line.split(':', 1) for line in rollup if ':' in line and not line.startswith(' '))
+        kilobytes = {key: int(value.split()[0]) * 1024 for key, value in fields.items() if value.strip().endswith('kB')}
+        memory['rss'] = kilobytes.get('Rss', 0)
+        memory['pss'] = kilobytes.get('Pss', 0)
+        memory['uss'] = kilobytes.get('Private_Clean', 0) + kilobytes.get('Private_Dirty', 0)
+    except OSError:
+        import resource
+        memory['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memory
+
+
+def load_store(path, build):
+    """Return (store, customer ids) for a data file, from its cache or by calling build() and caching the result
+
+    Caches of earlier versions of the file, and an unreadable cache of this
+    version, are removed. A cache that cannot be written (e.g. a read-only
+    data directory) is skipped with a warning.
+    """
+    path = Path(path)
+    target = cache_path(path, source_fingerprint(path))
+    if target.exists():
+        try:
+            return read_store(target)
+        except (OSError, ValueError, KeyError) as e:
+            # Removed, or the rebuilt store could not be renamed into its place
+            logging.warning(f"Rebuilding unreadable store cache {target}: {e}")
+            shutil.rmtree(target, ignore_errors=True)
+
+    store, customer_ids = build()
+    try:
+        write_store(target, store, customer_ids)
+        for stale in path.parent.glob(f".{path.name}.*{CACHE_SUFFIX}"):
+            if stale != target:
+                shutil.rmtree(stale, ignore_errors=True)
+    except OSError as e:
+        logging.warning(f"Could not write store cache {target}: {e}")
+        return store, customer_ids
+    # Serve from the mapped files so this process shares the store like later ones
+    return read_store(target)
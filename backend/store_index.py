@@ -0,0 +1,123 @@
+"""Secondary indexes over the columnar transaction store for filtered queries
+
+Unfiltered requests are answered from the aggregate cube. A filtered request
+(date range, customers, regions, segments, categories) aggregates only the
+matching rows, so finding them must not cost a scan of the whole store.
+StoreIndex keeps:
+
+- the row ids in transaction-day order, so a date range is one pair of
+  binary searches and a contiguous slice of row ids;
+- the row ids grouped by customer code with per-customer offsets (CSR), so
+  a customer's rows are one slice;
+- a packed bitmap per value of each categorical filter column, plus the
+  value counts, so categorical filters combine with bitwise OR/AND.
+
+select() fetches rows through the most selective filter and checks the
+other filters only on those rows.
+"""
+
+import numpy as np
+
+# Filter name -> categorical store column it applies to
+FILTER_COLUMNS = {'region': 'region', 'segment': 'customer_segment', 'category': 'category'}
+
+
+def _day(date):
+    return np.datetime64(date, 'D').astype(np.int64)
+
+
+class StoreIndex:
+    def __init__(self, store, n_customers):
+        self.store = store
+        self.n_rows = len(store)
+        row_dtype = np.int32 if self.n_rows < 2 ** 31 else np.int64
+
+        days = store['transaction_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        self.date_order = np.argsort(days, kind='stable').astype(row_dtype)
+        self.sorted_days = days[self.date_order].astype(np.int32)
+
+        customer = store['customer_code'].to_numpy()
+        self.customer_order = np.argsort(customer, kind='stable').astype(row_dtype)
+        self.customer_offsets = np.concatenate([[0], np.cumsum(np.bincount(customer, minlength=n_customers))])
+
+        self.value_counts = {}
+        self.bitmaps = {}
+        for column in FILTER_COLUMNS.values():
+            codes = store[column].cat.codes.to_numpy()
+            n_values = len(store[column].cat.categories)
+            self.value_counts[column] = np.bincount(codes, minlength=n_values)
+            self.bitmaps[column] = np.array(
+                [np.packbits(codes == value, bitorder='little') for value in range(n_values)], dtype=np.uint8
+            ).reshape(n_values, -1)
+
+    def nbytes(self):
+        arrays = [self.date_order, self.sorted_days, self.customer_order, self.customer_offsets,
+                  *self.value_counts.values(), *self.bitmaps.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def _date_range(self, start_date, end_date):
+        start = 0 if start_date is None else np.searchsorted(self.sorted_days, _day(start_date), side='left')
+        end = self.n_rows if end_date is None else np.searchsorted(self.sorted_days, _day(end_date), side='right')
+        return int(start), int(max(end, start))
+
+    def _customer_rows(self, customer_codes):
+        starts, ends = self.customer_offsets[customer_codes], self.customer_offsets[customer_codes + 1]
+        return np.concatenate([self.customer_order[start:end] for start, end in zip(starts, ends)] or
+                              [self.customer_order[:0]])
+
+    def _bitmap_rows(self, value_codes):
+        """Rows whose value is accepted in every column: OR of bitmaps within a column, AND across columns"""
+        bits = None
+        for column, codes in value_codes.items():
+            column_bits = np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+            bits = column_bits if bits is None else bits & column_bits
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows, bitorder='little'))
+
+    def select(self, start_date=None, end_date=None, customer_codes=None, value_codes=None):
+        """Ascending row ids matching every given filter
+
+        Dates are inclusive bounds, customer_codes the accepted customer codes
+        and value_codes maps a categorical column to its accepted category
+        codes; None leaves a field unfiltered.
+        """
+        value_codes = {column: np.asarray(codes, dtype=np.int64) for column, codes in (value_codes or {}).items()}
+        dated = start_date is not None or end_date is not None
+        start, end = self._date_range(start_date, end_date)
+        if customer_codes is not None:
+            customer_codes = np.unique(np.asarray(customer_codes, dtype=np.int64))
+
+        # (estimated rows, fetch) per access path; the estimates are exact except for the bitmap AND
+        paths = []
+        if dated:
+            paths.append((end - start, 'date', lambda: self.date_order[start:end]))
+        if customer_codes is not None:
+            n_rows = int((self.customer_offsets[customer_codes + 1] - self.customer_offsets[customer_codes]).sum())
+            paths.append((n_rows, 'customer', lambda: self._customer_rows(customer_codes)))
+        if value_codes:
+            n_rows = min(int(self.value_counts[column][codes].sum()) for column, codes in value_codes.items())
+            paths.append((n_rows, 'values', lambda: self._bitmap_rows(value_codes)))
+        if not paths:
+            return np.arange(self.n_rows)
+
+        n_rows, driver, fetch = min(paths, key=lambda path: path[0])
+        if n_rows == 0:
+            return np.array([], dtype=np.int64)
+        rows = fetch()
+
+        # Check the remaining filters on the fetched rows only
+        if dated and driver != 'date':
+            days = self.store['transaction_date'].to_numpy()[rows].astype('datetime64[D]').astype(np.int64)
+            keep = np.ones(len(rows), dtype=bool)
+            if start_date is not None:
+                keep &= days >= _day(start_date)
+            if end_date is not None:
+                keep &= days <= _day(end_date)
+            rows = rows[keep]
+        if customer_codes is not None and driver != 'customer':
+            rows = rows[np.isin(self.store['customer_code'].to_numpy()[rows], customer_codes)]
+        if driver != 'values':
+            for column, codes in value_codes.items():
+                accepted = np.zeros(len(self.value_counts[column]), dtype=bool)
+                accepted[codes] = True
+                rows = rows[accepted[self.store[column].cat.codes.to_numpy()[rows]]]
+        return np.sort(rows)
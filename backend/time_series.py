@@ -0,0 +1,134 @@
+"""Dense category x day time series of transaction counts and spend
+
+The cube's month axis answers monthly totals, but trend windows (moving
+averages, period-over-period growth, running totals) need every category's
+series laid out in calendar order. TimeSeries keeps one row per category
+and one column per day, from the first to the last transaction day, folded
+forward batch by batch like the rest of the cube. Week and month series are
+reduced from the days with one np.add.reduceat and cached with their prefix
+sums, so any rolling window over any granularity is two gathers from the
+prefix sums instead of a rescan of the transactions.
+
+Windows run over calendar periods: a period without transactions is a zero,
+where the category_trends_window SQL skips its row.
+"""
+
+import numpy as np
+
+GRANULARITIES = ['day', 'week', 'month']
+
+
+def _period_keys(days, granularity):
+    """Period of every day number: the day itself, its Monday-based week, or its month"""
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        # Day 0 (1970-01-01) is a Thursday
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def _period_starts(keys, granularity):
+    """First day of every period key, as datetime64"""
+    if granularity == 'month':
+        return keys.astype('datetime64[M]')
+    if granularity == 'week':
+        keys = keys * 7 - 3
+    return keys.astype('datetime64[D]')
+
+
+def rolling_mean(prefix, window):
+    """Mean of the last window periods (fewer at the start) of every period
+
+    prefix holds running sums along the last axis with a leading zero column.
+    """
+    end = np.arange(1, prefix.shape[-1])
+    start = np.maximum(end - window, 0)
+    return (prefix[..., end] - prefix[..., start]) / (end - start)
+
+
+def growth_percentage(values, lag=1):
+    """Percentage change of every period over the one lag periods before, NaN without one or when it is zero"""
+    values = np.asarray(values, dtype=np.float64)
+    growth = np.full(values.shape, np.nan)
+    previous = values[..., :-lag] if lag < values.shape[-1] else values[..., :0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (values[..., lag:] - previous) / previous * 100
+    growth[..., lag:] = np.where(previous != 0, change, np.nan)
+    return growth
+
+
+class TimeSeries:
+    def __init__(self, n_categories):
+        self.first_day = 0
+        self.count = np.zeros((n_categories, 0), dtype=np.int64)
+        self.sum_cents = np.zeros((n_categories, 0), dtype=np.int64)
+        self._resampled = {}
+
+    @property
+    def n_days(self):
+        return self.count.shape[1]
+
+    def add(self, category, day, cents):
+        """Add transaction rows given as category codes, day numbers and amounts in cents"""
+        if not len(day):
+            return
+        self._grow_days(int(day.min()), int(day.max()))
+        cell = category.astype(np.int64) * self.n_days + (day - self.first_day)
+        size = self.count.size
+        self.count += np.bincount(cell, minlength=size).reshape(self.count.shape)
+        self.sum_cents += np.bincount(cell, weights=cents, minlength=size).round().astype(np.int64).reshape(self.count.shape)
+        self._resampled.clear()
+
+    def merge(self, other, category_positions):
+        """Add another series in place, its category i landing on category_positions[i]"""
+        if not other.n_days:
+            return
+        self._grow_days(other.first_day, other.first_day + other.n_days - 1)
+        index = np.ix_(category_positions, np.arange(other.n_days) + (other.first_day - self.first_day))
+        self.count[index] += other.count
+        self.sum_cents[index] += other.sum_cents
+        self._resampled.clear()
+
+    def recode(self, positions, size):
+        """Follow a grown category axis: category i becomes positions[i] of size"""
+        for name in ('count', 'sum_cents'):
+            expanded = np.zeros((size, self.n_days), dtype=np.int64)
+            expanded[positions] = getattr(self, name)
+            setattr(self, name, expanded)
+        self._resampled.clear()
+
+    def _grow_days(self, first_day, last_day):
+        if self.n_days:
+            first_day = min(first_day, self.first_day)
+            last_day = max(last_day, self.first_day + self.n_days - 1)
+        n_days = last_day - first_day + 1
+        if n_days == self.n_days and first_day == self.first_day:
+            return
+        days = slice(self.first_day - first_day, self.first_day - first_day + self.n_days)
+        for name in ('count', 'sum_cents'):
+            expanded = np.zeros((len(self.count), n_days), dtype=np.int64)
+            expanded[:, days] = getattr(self, name)
+            setattr(self, name, expanded)
+        self.first_day = first_day
+
+    def resample(self, granularity):
+        """(period starts, count, sum_cents, sum_cents prefix sums) of every category x period
+
+        Periods run from the first to the last transaction day; the prefix
+        sums have a leading zero column (see rolling_mean). Cached until the
+        series changes.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        if granularity not in self._resampled:
+            keys = _period_keys(self.first_day + np.arange(self.n_days, dtype=np.int64), granularity)
+            starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else keys
+            count = np.add.reduceat(self.count, starts, axis=1) if len(starts) else self.count
+            sum_cents = np.add.reduceat(self.sum_cents, starts, axis=1) if len(starts) else self.sum_cents
+            prefix = np.concatenate([np.zeros((len(sum_cents), 1), dtype=np.int64), np.cumsum(sum_cents, axis=1)], axis=1)
+            self._resampled[granularity] = (_period_starts(keys[starts], granularity), count, sum_cents, prefix)
+        return self._resampled[granularity]
+
+    def nbytes(self):
+        return self.count.nbytes + self.sum_cents.nbytes
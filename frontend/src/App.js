@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from 'react';
 import '@/App.css';
-import axios from 'axios';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
@@ -31,30 +30,46 @@ function App() {
     fetchAllData();
   }, []);
 
+  // Panel name from /api/analytics/dashboard -> state setter for its payload
+  const panelHandlers = {
+    'overview': (payload) => setOverview(payload),
+    'spend-by-category': (payload) => setCategoryData(payload.data),
+    'spend-by-region': (payload) => setRegionData(payload.data),
+    'monthly-trends': (payload) => setMonthlyTrends(payload.data),
+    'campaign-effectiveness': (payload) => setCampaignData(payload.data),
+    'customer-segmentation': (payload) => setSegmentData(payload.data),
+    'recommendations': (payload) => setRecommendations(payload.data),
+    'sql-queries': (payload) => setSqlQueries(payload.queries),
+    'statistical-summary': (payload) => setStats(payload)
+  };
+
   const fetchAllData = async () => {
     try {
       setLoading(true);
-      const [overviewRes, categoryRes, regionRes, trendsRes, campaignRes, segmentRes, recsRes, sqlRes, statsRes] = await Promise.all([
-        axios.get(`${API}/analytics/overview`),
-        axios.get(`${API}/analytics/spend-by-category`),
-        axios.get(`${API}/analytics/spend-by-region`),
-        axios.get(`${API}/analytics/monthly-trends`),
-        axios.get(`${API}/analytics/campaign-effectiveness`),
-        axios.get(`${API}/analytics/customer-segmentation`),
-        axios.get(`${API}/analytics/recommendations`),
-        axios.get(`${API}/analytics/sql-queries`),
-        axios.get(`${API}/analytics/statistical-summary`)
-      ]);
+      // One streamed request; each NDJSON line carries a panel as soon as the server has it
+      const response = await fetch(`${API}/analytics/dashboard?format=ndjson`);
+      if (!response.ok) {
+        throw new Error(`Dashboard request failed with status ${response.status}`);
+      }
 
-      setOverview(overviewRes.data);
-      setCategoryData(categoryRes.data.data);
-      setRegionData(regionRes.data.data);
-      setMonthlyTrends(trendsRes.data.data);
-      setCampaignData(campaignRes.data.data);
-      setSegmentData(segmentRes.data.data);
-      setRecommendations(recsRes.data.data);
-      setSqlQueries(sqlRes.data.queries);
-      setStats(statsRes.data);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const { panel, payload } = JSON.parse(line);
+          if (panelHandlers[panel] && !payload.error) {
+            panelHandlers[panel](payload);
+            if (panel === 'overview') setLoading(false);
+          }
+        }
+        if (done) break;
+      }
       setLoading(false);
     } catch (error) {
       console.error('Error fetching data:', error);
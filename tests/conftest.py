@@ -0,0 +1,106 @@
+"""Shared fixtures: one small seeded dataset, written as CSV, Parquet and Arrow, and an engine built on it"""
+
+import math
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from analytics_engine import CreditCardAnalytics  # noqa: E402
+from campaigns import Campaign, CampaignRegistry  # noqa: E402
+from data_generator import CreditCardDataGenerator  # noqa: E402
+from dataset_io import SINKS, write_dataset  # noqa: E402
+
+N_CUSTOMERS = 300
+
+# Endpoint methods of both backends, called with their default arguments
+ENDPOINT_METHODS = ['get_overview_metrics', 'get_spend_by_category', 'get_spend_by_region', 'get_monthly_trends',
+                    'get_campaign_effectiveness', 'get_customer_segmentation', 'get_recommended_segments',
+                    'get_statistical_summary']
+
+# Overlapping campaigns, so every campaign metric spans several windows
+CAMPAIGNS = CampaignRegistry([
+    Campaign('dining-travel-2024', '2024-07-01', '2024-09-30', ['Travel', 'Dining'], '2024-01-01', '2024-06-30'),
+    Campaign('spring-retail', '2024-05-15', '2024-06-20', ['Dining', 'Retail'], '2024-02-01', '2024-04-30'),
+    Campaign('fuel-h2', '2024-08-10', '2024-12-31', ['Gas'], '2024-03-03', '2024-08-01'),
+])
+
+
+def assert_close(expected, actual, path='result', tolerance=1e-6):
+    """Assert two endpoint results (nested dicts, lists and numbers) are equal, numbers within tolerance"""
+    if isinstance(expected, dict):
+        assert set(expected) == set(actual), path
+        for key in expected:
+            assert_close(expected[key], actual[key], f"{path}.{key}", tolerance)
+    elif isinstance(expected, list):
+        assert len(expected) == len(actual), path
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            assert_close(left, right, f"{path}[{i}]", tolerance)
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert isinstance(actual, float) and math.isnan(actual), path
+    elif isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        assert math.isclose(expected, actual, rel_tol=1e-9, abs_tol=tolerance), f"{path}: {expected} != {actual}"
+    else:
+        assert expected == actual, f"{path}: {expected!r} != {actual!r}"
+
+
+def assert_engines_match(expected, actual, methods=ENDPOINT_METHODS):
+    for method_name in methods:
+        assert_close(getattr(expected, method_name)(), getattr(actual, method_name)(), method_name)
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    """Seeded customers and a year of transactions, with the transactions written in every file format"""
+    root = tmp_path_factory.mktemp('dataset')
+    generator = CreditCardDataGenerator(seed=7)
+    customers = generator.generate_customers(N_CUSTOMERS)
+    transactions = generator.generate_transactions(customers, datetime(2024, 1, 1), datetime(2024, 12, 31))
+
+    customers_path = root / 'customers.csv'
+    customers.to_csv(customers_path, index=False)
+    paths = {'csv': root / 'transactions.csv', 'parquet': root / 'parquet', 'arrow': root / 'arrow'}
+    for file_format, path in paths.items():
+        write_dataset([transactions], SINKS[file_format](path))
+    return SimpleNamespace(customers=customers, transactions=transactions, customers_path=customers_path,
+                           paths=paths, campaigns=CAMPAIGNS)
+
+
+@pytest.fixture(scope='session')
+def engine(dataset):
+    return CreditCardAnalytics(dataset.transactions, dataset.customers, dataset.campaigns)
+
+
+@pytest.fixture(scope='session')
+def client(dataset):
+    """A test client of the API server over the dataset's CSV files, started once for the session
+
+    The server's executor cannot restart after shutdown, so tests that change
+    the served data (ingest) reload it before they return.
+    """
+    from fastapi.testclient import TestClient
+    import server
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(server, 'TRANSACTIONS_PATH', dataset.paths['csv'])
+        patch.setattr(server, 'CUSTOMERS_PATH', dataset.customers_path)
+        with TestClient(server.app) as client:
+            yield client
+
+
+@pytest.fixture
+def serve(client, dataset):
+    """serve(path) reloads the server from another transactions file; the dataset is served again after the test"""
+    import server
+
+    def serve(path):
+        server.TRANSACTIONS_PATH = Path(path)
+        return client.post('/api/analytics/reload').json()
+
+    yield serve
+    server.TRANSACTIONS_PATH = dataset.paths['csv']
+    assert client.post('/api/analytics/reload').json()['status'] == 'ok'
@@ -0,0 +1,61 @@
+"""Exact amount percentiles and histograms match NumPy over the raw amounts of every group"""
+
+import numpy as np
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+
+QUANTILES = [0, 0.01, 0.25, 0.5, 0.9, 0.99, 1]
+
+GROUP_COLUMNS = {'all': None, 'category': 'category', 'region': 'region', 'segment': 'customer_segment'}
+
+
+@pytest.mark.parametrize('by', GROUP_COLUMNS)
+@pytest.mark.parametrize('scale', ['linear', 'log'])
+def test_percentiles_and_histogram_match_numpy(dataset, engine, by, scale):
+    transactions = dataset.transactions
+    amounts = np.round(transactions['amount'].to_numpy() * 100) / 100
+    distribution = engine.get_amount_distribution(by, QUANTILES, 13, scale)
+    edge_cents = np.array(distribution['bin_edges']) * 100
+
+    column = GROUP_COLUMNS[by]
+    groups = ['all'] if column is None else sorted(transactions[column].unique())
+    assert [group.get(by, 'all') for group in distribution['groups']] == groups
+    for group in distribution['groups']:
+        selected = amounts if column is None else amounts[(transactions[column] == group[by]).to_numpy()]
+        assert group['count'] == len(selected)
+        assert group['min'] == selected.min() and group['max'] == selected.max()
+        np.testing.assert_allclose(group['quantile_values'], np.percentile(selected, np.array(QUANTILES) * 100), atol=1e-9)
+        histogram, _ = np.histogram(np.round(selected * 100), bins=edge_cents)
+        assert group['histogram'] == histogram.tolist()
+
+
+def test_explicit_edges_and_ingest(dataset, engine):
+    transactions = dataset.transactions
+    half = len(transactions) // 2
+    incremental = CreditCardAnalytics(transactions.iloc[:half], dataset.customers, dataset.campaigns)
+    incremental.ingest(transactions.iloc[half:])
+    edges = [0, 25, 50, 100, 1000, 5000]
+    assert incremental.get_amount_distribution('segment', edges=edges) == engine.get_amount_distribution('segment', edges=edges)
+
+    amounts = np.round(transactions['amount'].to_numpy() * 100)
+    histogram, _ = np.histogram(amounts, bins=np.array(edges) * 100)
+    assert engine.get_amount_distribution(edges=edges)['groups'][0]['histogram'] == histogram.tolist()
+
+
+def test_invalid_arguments(engine):
+    for kwargs in [dict(by='merchant'), dict(scale='cubic'), dict(quantiles=[1.5]), dict(edges=[10, 5])]:
+        with pytest.raises(ValueError):
+            engine.get_amount_distribution(**kwargs)
+
+
+@pytest.mark.parametrize('edges', [[0, 100000000], [-1e12, 50, 1e12], [-1e30, -5e7, 0, 3e7, 1e30]])
+def test_edges_beyond_the_encoded_value_range(dataset, engine, edges):
+    transactions = dataset.transactions
+    amounts = np.round(transactions['amount'].to_numpy() * 100)
+    distribution = engine.get_amount_distribution('category', edges=edges)
+    for group in distribution['groups']:
+        selected = amounts[(transactions['category'] == group['category']).to_numpy()]
+        histogram, _ = np.histogram(selected, bins=np.array(edges, dtype=np.float64) * 100)
+        assert group['histogram'] == histogram.tolist()
+        assert sum(group['histogram']) == group['count']
@@ -0,0 +1,27 @@
+"""?approx=true: the sketch median is within the sketch's relative accuracy and survives ingest"""
+
+import numpy as np
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+from sketches import RELATIVE_ACCURACY
+
+
+def _median(engine, approx):
+    return engine.get_statistical_summary(approx=approx)['median_transaction']
+
+
+def test_approx_median_within_relative_accuracy(dataset, engine):
+    exact = float(np.median(dataset.transactions['amount']))
+    assert _median(engine, False) == pytest.approx(exact)
+    # One cent of rounding on top of the sketch's bound
+    assert abs(_median(engine, True) - exact) <= exact * RELATIVE_ACCURACY + 0.01
+
+
+def test_approx_median_after_ingest(dataset, engine):
+    transactions = dataset.transactions
+    half = len(transactions) // 2
+    incremental = CreditCardAnalytics(transactions.iloc[:half], dataset.customers, dataset.campaigns)
+    incremental.ingest(transactions.iloc[half:])
+    assert _median(incremental, True) == _median(engine, True)
+    np.testing.assert_array_equal(incremental.cube.amount_sketch.counts, engine.cube.amount_sketch.counts)
@@ -0,0 +1,44 @@
+"""Campaign uplift compares campaign spend with the scaled spend of the baseline window only"""
+
+import pandas as pd
+import pytest
+
+from sql_backend import SqlAnalytics
+
+
+def _uplift(transactions, campaign, category):
+    """Uplift of one campaign category by hand: campaign spend over baseline spend scaled to the campaign length"""
+    rows = transactions[transactions['category'] == category]
+    dates = pd.to_datetime(rows['transaction_date'])
+    spend = rows['amount'][dates.between(pd.Timestamp(campaign.start), pd.Timestamp(campaign.end))].sum()
+    baseline = rows['amount'][dates.between(pd.Timestamp(campaign.baseline_start),
+                                            pd.Timestamp(campaign.baseline_end))].sum()
+    expected = baseline / campaign.baseline_months * campaign.months
+    return round((spend - expected) / expected * 100, 2)
+
+
+def _during_uplift(effectiveness):
+    return {(row['campaign_id'], row['category']): row['uplift_percentage']
+            for row in effectiveness if row['campaign_period'] == 'During-Campaign'}
+
+
+def test_uplift_uses_the_baseline_window(dataset, engine):
+    # spring-retail's baseline starts a month after the data and ends two weeks before the campaign,
+    # so its Pre-Campaign period holds more than the baseline
+    transactions = dataset.transactions
+    assert transactions['transaction_date'].min() < '2024-02-01'
+    uplift = _during_uplift(engine.get_campaign_effectiveness())
+    assert len(uplift) == sum(len(campaign.categories) for campaign in dataset.campaigns)
+    for campaign in dataset.campaigns:
+        for category in campaign.categories:
+            assert uplift[campaign.campaign_id, category] == pytest.approx(_uplift(transactions, campaign, category),
+                                                                            abs=0.011)
+
+
+def test_sql_uplift_uses_the_baseline_window(dataset, engine):
+    sql_engine = SqlAnalytics(dataset.paths['csv'], dataset.customers_path, campaigns=dataset.campaigns)
+    expected = _during_uplift(engine.get_campaign_effectiveness())
+    actual = _during_uplift(sql_engine.get_campaign_effectiveness())
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert actual[key] == pytest.approx(expected[key], abs=0.011)
@@ -0,0 +1,59 @@
+"""Campaign response rates from the feature table match the campaign_response_rate SQL"""
+
+import duckdb
+import pandas as pd
+import pytest
+
+from sql_queries import SQL_QUERIES
+
+
+def _response_sql(transactions, campaigns):
+    connection = duckdb.connect()
+    connection.register('transactions', transactions.assign(transaction_date=pd.to_datetime(transactions['transaction_date'])))
+    campaign_frame, category_frame = campaigns.as_frames()
+    connection.register('campaigns', campaign_frame)
+    connection.register('campaign_categories', category_frame)
+    return connection.execute(SQL_QUERIES['campaign_response_rate']).df()
+
+
+def _response_by(transactions, campaigns, column, threshold):
+    """Per-group response counts with pandas, a customer's group being the one of their last transaction"""
+    dates = pd.to_datetime(transactions['transaction_date'])
+    groups = transactions.groupby('customer_id')[column].last()
+    rows = []
+    for campaign in campaigns:
+        in_categories = transactions['category'].isin(campaign.categories)
+        amounts, customers = transactions['amount'][in_categories], transactions['customer_id'][in_categories]
+        spend = amounts.where(dates.between(pd.Timestamp(campaign.start), pd.Timestamp(campaign.end)), 0).groupby(customers).sum()
+        baseline = amounts.where(dates.between(pd.Timestamp(campaign.baseline_start), pd.Timestamp(campaign.baseline_end)), 0)
+        baseline = baseline.groupby(customers).sum() / campaign.baseline_months
+        eligible = baseline > 0
+        responded = spend[eligible] > baseline[eligible] * campaign.months * threshold
+        counts = responded.groupby(groups.reindex(responded.index)).agg(['size', 'sum'])
+        rows += [(campaign.campaign_id, group, int(total), int(hits)) for group, (total, hits) in counts.iterrows()]
+    return pd.DataFrame(rows, columns=['campaign_id', 'group', 'total_customers', 'responded_customers'])
+
+
+def test_matches_sql(dataset, engine):
+    expected = _response_sql(dataset.transactions, dataset.campaigns)
+    # The SQL orders by campaign_id, the engine keeps registry order
+    actual = pd.DataFrame(engine.get_campaign_response('all')).sort_values('campaign_id', ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('by,column', [('segment', 'customer_segment'), ('region', 'region')])
+@pytest.mark.parametrize('threshold', [1.2, 1.5])
+def test_matches_pandas_by_group(dataset, engine, by, column, threshold):
+    expected = _response_by(dataset.transactions, dataset.campaigns, column, threshold)
+    actual = pd.DataFrame(engine.get_campaign_response(by, threshold)).rename(columns={by: 'group'})
+    key = ['campaign_id', 'group']
+    expected = expected.sort_values(key, ignore_index=True)
+    actual = actual[expected.columns].sort_values(key, ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_invalid_arguments(engine):
+    with pytest.raises(ValueError):
+        engine.get_campaign_response('merchant')
+    with pytest.raises(ValueError):
+        engine.get_campaign_response(threshold=0)
@@ -0,0 +1,49 @@
+"""Customers with rows in several regions or segments count in each of them"""
+
+import pandas as pd
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+from .conftest import assert_close
+
+
+@pytest.fixture(scope='module')
+def moved(dataset):
+    """The dataset with the second half of one customer's rows in another region and segment"""
+    transactions = dataset.transactions.copy()
+    rows = transactions.index[transactions['customer_id'] == transactions['customer_id'].iloc[0]]
+    moved = rows[len(rows) // 2:]
+    first = transactions.loc[rows[0]]
+    transactions.loc[moved, 'region'] = next(r for r in transactions['region'].unique() if r != first['region'])
+    transactions.loc[moved, 'customer_segment'] = next(
+        s for s in transactions['customer_segment'].unique() if s != first['customer_segment'])
+    return transactions, moved
+
+
+def _segmentation(transactions):
+    per_customer = transactions.groupby(['customer_id', 'customer_segment'])['amount'].agg(['count', 'sum', 'mean'])
+    return per_customer.groupby('customer_segment').agg(
+        customer_count=('count', 'size'), avg_customer_spend=('sum', 'mean'),
+        avg_transactions_per_customer=('count', 'mean'), avg_transaction_size=('mean', 'mean'))
+
+
+def _check(engine, transactions):
+    regions = pd.DataFrame(engine.get_spend_by_region()).set_index('region')['unique_customers']
+    expected = transactions.groupby('region')['customer_id'].nunique()
+    assert regions.sort_index().to_dict() == expected.sort_index().to_dict()
+
+    segments = pd.DataFrame(engine.get_customer_segmentation()).set_index('customer_segment')
+    expected = _segmentation(transactions)
+    assert_close(expected.sort_index().to_dict('index'), segments[expected.columns].sort_index().to_dict('index'))
+
+
+def test_customer_counts_in_every_region_and_segment(dataset, moved):
+    transactions, _ = moved
+    _check(CreditCardAnalytics(transactions, dataset.customers, dataset.campaigns), transactions)
+
+
+def test_ingested_rows_in_another_region_and_segment(dataset, moved):
+    transactions, rows = moved
+    engine = CreditCardAnalytics(transactions.drop(rows), dataset.customers, dataset.campaigns)
+    engine.ingest(transactions.loc[rows])
+    _check(engine, transactions)
@@ -0,0 +1,46 @@
+"""GET /api/analytics/dashboard: every selected panel, as one JSON object or one NDJSON line each"""
+
+import json
+
+import pytest
+
+from .conftest import assert_close
+
+URL = '/api/analytics/dashboard'
+
+
+def _panel(client, panel, **params):
+    return client.get(f'/api/analytics/{panel}', params=params).json()
+
+
+def test_ndjson_streams_one_line_per_panel(client):
+    panels = ['overview', 'spend-by-region', 'statistical-summary']
+    response = client.get(URL, params={'panels': ','.join(panels), 'format': 'ndjson'})
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line['panel'] for line in lines) == sorted(panels)
+    for line in lines:
+        assert_close(_panel(client, line['panel']), line['payload'], line['panel'])
+
+
+def test_json_holds_every_panel(client):
+    dashboard = client.get(URL).json()
+    assert set(dashboard) == {'overview', 'spend-by-category', 'spend-by-region', 'monthly-trends',
+                              'campaign-effectiveness', 'customer-segmentation', 'recommendations',
+                              'sql-queries', 'statistical-summary'}
+    for panel, payload in dashboard.items():
+        assert_close(_panel(client, panel), payload, panel)
+
+
+def test_filters_apply_to_every_panel(client):
+    params = {'region': 'West', 'start_date': '2024-03-01', 'end_date': '2024-08-31'}
+    response = client.get(URL, params={'panels': 'overview,spend-by-category', 'format': 'ndjson', **params})
+    for line in map(json.loads, response.text.splitlines()):
+        assert_close(_panel(client, line['panel'], **params), line['payload'], line['panel'])
+        assert line['payload'] != _panel(client, line['panel'])
+
+
+@pytest.mark.parametrize('panels', ['overview,nope', 'trend-windows'])
+def test_unknown_panels_are_rejected(client, panels):
+    response = client.get(URL, params={'panels': panels})
+    assert response.status_code == 400
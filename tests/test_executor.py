@@ -0,0 +1,80 @@
+"""The executor layer: timeouts, concurrency limits and an event loop that stays free"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from analytics_executor import AnalyticsExecutor, AnalyticsTimeout
+
+
+def test_timeout_abandons_the_wait_not_the_job():
+    executor = AnalyticsExecutor(thread_workers=2, timeout_seconds=0.05, default_limit=1)
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(AnalyticsTimeout):
+            await executor.run('slow', release.wait, 5)
+        # The job still holds the endpoint's only permit, so the next request times out in the queue
+        stats = executor.stats()['endpoints']['slow']
+        assert stats['timeouts'] == 1 and stats['running'] == 1
+        with pytest.raises(AnalyticsTimeout):
+            await executor.run('slow', time.sleep, 0)
+        release.set()
+        await asyncio.sleep(0.05)
+        assert await executor.run('slow', sum, [1, 2]) == 3
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()['endpoints']['slow']
+        assert stats == {**stats, 'running': 0, 'waiting': 0, 'timeouts': 2, 'completed': 1}
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_concurrency_limit_queues_requests():
+    executor = AnalyticsExecutor(thread_workers=4, endpoint_limits={'limited': 1})
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def job():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def scenario():
+        await asyncio.gather(*[executor.run('limited', job) for _ in range(4)])
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    stats = executor.stats()['endpoints']['limited']
+    assert peak == 1
+    assert stats['limit'] == 1 and stats['max_waiting'] == 4 and stats['completed'] == 4
+
+
+def test_event_loop_runs_while_a_job_blocks():
+    executor = AnalyticsExecutor(thread_workers=2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(executor.run('slow', time.sleep, 0.2), ticker())
+
+    try:
+        started = time.perf_counter()
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert len(ticks) == 5 and ticks[-1] - started < 0.15
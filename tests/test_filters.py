@@ -0,0 +1,82 @@
+"""Filtered engines match an engine built on the pre-filtered transactions"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+
+from .conftest import ENDPOINT_METHODS, assert_engines_match
+
+FILTER_COLUMNS = {'region': 'region', 'segment': 'customer_segment', 'category': 'category', 'customer_id': 'customer_id'}
+
+CASES = [
+    dict(region=['Northeast']),
+    dict(start_date='2024-07-01', end_date='2024-07-31'),
+    dict(start_date='2024-03-05', end_date='2024-10-17'),
+    dict(category=['Travel', 'Dining']),
+    dict(customer_id=['CUST000001', 'CUST000002', 'CUST000003']),
+    dict(start_date='2024-03-05', region=['Southeast', 'West'], segment=['Gold']),
+    dict(category=['Travel'], region=['West'], segment=['Gold', 'Platinum']),
+    dict(end_date='2024-02-10', category=['Dining'], customer_id=['CUST000010', 'CUST000020', 'CUST000030']),
+    dict(start_date='2024-02-01', end_date='2024-08-31', region=['West'], category=['Travel', 'Gas']),
+    dict(end_date='2024-02-29', segment=['Gold', 'Silver']),
+    dict(start_date='2024-06-01', region=['Nowhere']),
+]
+
+
+def _matching(transactions, filters):
+    dates = pd.to_datetime(transactions['transaction_date'])
+    mask = np.ones(len(transactions), dtype=bool)
+    for name, value in filters.items():
+        if name == 'start_date':
+            mask &= (dates >= value).to_numpy()
+        elif name == 'end_date':
+            mask &= (dates <= value).to_numpy()
+        else:
+            mask &= transactions[FILTER_COLUMNS[name]].isin(value).to_numpy()
+    return transactions[mask]
+
+
+@pytest.mark.parametrize('filters', CASES, ids=lambda filters: ','.join(filters))
+def test_filtered_matches_build_on_filtered_rows(dataset, engine, filters):
+    expected = CreditCardAnalytics(_matching(dataset.transactions, filters), dataset.customers, dataset.campaigns)
+    filtered = engine.filtered(**filters)
+    assert_engines_match(expected, filtered)
+    for args in [(), (5, ['Gold'])]:
+        assert filtered.get_top_customers(*args) == expected.get_top_customers(*args)
+
+
+def test_filters_matching_nothing(engine):
+    for filters in [dict(region=['Nowhere']), dict(customer_id=['x']), dict(start_date='2030-01-01')]:
+        filtered = engine.filtered(**filters)
+        assert filtered.get_overview_metrics()['total_transactions'] == 0
+        for method_name in ENDPOINT_METHODS:
+            getattr(filtered, method_name)()
+
+
+def test_no_filters_return_the_engine(engine):
+    assert engine.filtered() is engine
+    assert engine.run_filtered({}, 'get_overview_metrics') == engine.get_overview_metrics()
+
+
+@pytest.mark.parametrize('filters,sliced', [(dict(region=['West'], segment=['Gold']), True),
+                                            (dict(start_date='2024-04-01', end_date='2024-06-30'), True),
+                                            (dict(start_date='2024-04-02'), False),
+                                            (dict(region=['West'], customer_id=['CUST000001']), False)])
+def test_axis_filters_slice_the_cells(engine, filters, sliced):
+    cube = engine.filtered(**filters).cube
+    assert ('count' in vars(cube)) == sliced
+    assert 'customers' not in vars(cube) and 'amounts' not in vars(cube)
+    cube.totals()
+    assert 'count' in vars(cube) and 'customers' not in vars(cube)
+
+
+def test_filtered_after_ingest(dataset, engine):
+    transactions = dataset.transactions
+    initial = (transactions['transaction_date'] < '2024-05-01').to_numpy()
+    incremental = CreditCardAnalytics(transactions[initial], dataset.customers, dataset.campaigns)
+    incremental.ingest(transactions[~initial])
+    for filters in [dict(region=['Northeast']), dict(start_date='2024-03-01', end_date='2024-06-30', category=['Dining'])]:
+        expected = CreditCardAnalytics(_matching(transactions, filters), dataset.customers, dataset.campaigns)
+        assert_engines_match(expected, incremental.filtered(**filters))
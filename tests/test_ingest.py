@@ -0,0 +1,48 @@
+"""Incremental ingest matches a full build over the same transactions"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+from .conftest import assert_engines_match
+
+SPLITS = {
+    'half': lambda t: np.arange(len(t)) < len(t) // 2,
+    'new customers': lambda t: t['customer_id'] < 'CUST000150',
+    'new months': lambda t: t['transaction_date'] < '2024-05-01',
+    'new category': lambda t: t['category'] != 'Travel',
+}
+
+
+@pytest.mark.parametrize('split', SPLITS)
+def test_ingest_matches_full_build(dataset, engine, split):
+    transactions = dataset.transactions
+    initial = np.asarray(SPLITS[split](transactions))
+    incremental = CreditCardAnalytics(transactions[initial], dataset.customers, dataset.campaigns)
+    rest = transactions[~initial]
+    for _, batch in rest.groupby(rest['transaction_date'].str[:7]):
+        assert incremental.ingest(batch) == len(batch)
+    assert_engines_match(engine, incremental)
+
+
+def test_ingest_adds_customer_records(dataset, engine):
+    transactions, customers = dataset.transactions, dataset.customers
+    initial = (transactions['customer_id'] < 'CUST000150').to_numpy()
+    known = customers['customer_id'] < 'CUST000150'
+    incremental = CreditCardAnalytics(transactions[initial], customers[known], dataset.campaigns)
+    incremental.ingest(transactions[~initial], customers[~known])
+    assert_engines_match(engine, incremental)
+    assert pd.DataFrame(incremental.get_top_customers(50)).equals(pd.DataFrame(engine.get_top_customers(50)))
+
+
+def test_ingest_keeps_earlier_copies_unchanged(dataset):
+    transactions = dataset.transactions
+    half = len(transactions) // 2
+    incremental = CreditCardAnalytics(transactions.iloc[:half], dataset.customers, dataset.campaigns)
+    before = incremental.get_overview_metrics()
+    snapshot = CreditCardAnalytics.__new__(CreditCardAnalytics)
+    snapshot.__dict__.update(incremental.__dict__)
+    incremental.ingest(transactions.iloc[half:])
+    assert snapshot.get_overview_metrics() == before
+    assert incremental.get_overview_metrics()['total_transactions'] == len(transactions)
@@ -0,0 +1,45 @@
+"""POST /api/analytics/ingest parses uploads with the declared transaction schema"""
+
+import io
+
+import pytest
+
+URL = '/api/analytics/ingest'
+
+
+def _upload(client, frame):
+    buffer = io.BytesIO()
+    frame.to_csv(buffer, index=False)
+    return client.post(URL, files={'file': ('batch.csv', buffer.getvalue(), 'text/csv')})
+
+
+@pytest.fixture
+def reload(client):
+    yield
+    assert client.post('/api/analytics/reload').json()['status'] == 'ok'
+
+
+def test_ingest_upload(client, dataset, reload):
+    batch = dataset.transactions.iloc[:100]
+    before = client.get('/api/analytics/overview').json()['total_transactions']
+    response = _upload(client, batch)
+    assert response.status_code == 200, response.text
+    assert response.json()['rows'] == len(batch)
+    assert client.get('/api/analytics/overview').json()['total_transactions'] == before + len(batch)
+
+
+@pytest.mark.parametrize('column, value', [('amount', 'twelve'), ('transaction_date', '03/15/2024'),
+                                           ('in_campaign_period', 'maybe')])
+def test_ingest_rejects_values_of_the_wrong_type(client, dataset, column, value):
+    batch = dataset.transactions.iloc[:10].copy()
+    batch[column] = batch[column].astype(str)
+    batch.loc[batch.index[3], column] = value
+    response = _upload(client, batch)
+    assert response.status_code == 400
+    assert 'schema' in response.json()['detail']
+
+
+def test_ingest_rejects_missing_columns(client, dataset):
+    response = _upload(client, dataset.transactions.iloc[:10].drop(columns=['region']))
+    assert response.status_code == 400
+    assert 'region' in response.json()['detail']
@@ -0,0 +1,23 @@
+"""Parallel builds from files match a serial build and a build from the full frame"""
+
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+
+from .conftest import assert_engines_match
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet', 'arrow'])
+@pytest.mark.parametrize('keep_store', [True, False])
+def test_parallel_build_matches_serial_and_full_build(dataset, engine, file_format, keep_store):
+    path = dataset.paths[file_format]
+    serial = CreditCardAnalytics.from_files(path, dataset.customers, n_workers=1, keep_store=keep_store,
+                                            campaigns=dataset.campaigns)
+    parallel = CreditCardAnalytics.from_files(path, dataset.customers, n_workers=4, chunk_size=5000,
+                                              keep_store=keep_store, campaigns=dataset.campaigns)
+    assert_engines_match(engine, serial)
+    assert_engines_match(engine, parallel)
+    assert_engines_match(serial, parallel, ['get_trend_windows', 'get_campaign_response', 'get_top_customers'])
+    if keep_store:
+        assert len(parallel.transactions) == len(dataset.transactions)
+        assert sorted(parallel.customer_ids) == list(parallel.customer_ids)
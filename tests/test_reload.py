@@ -0,0 +1,50 @@
+"""Hot reload: the new data is swapped in, a failed load keeps the old engine, file changes trigger a reload"""
+
+import time
+
+import server
+from dataset_io import SINKS, write_dataset
+
+URL = '/api/analytics/overview'
+
+
+def _write(transactions, path):
+    write_dataset([transactions], SINKS['csv'](path))
+    return path
+
+
+def test_reload_swaps_in_the_new_data(client, dataset, serve, tmp_path):
+    half = dataset.transactions.iloc[:len(dataset.transactions) // 2]
+    result = serve(_write(half, tmp_path / 'transactions.csv'))
+    assert result['status'] == 'ok' and result['rows'] == len(half)
+    assert result['load_seconds'] >= 0 and result['rows_per_second'] > 0
+    assert client.get('/api/analytics/reload-status').json() == result
+    response = client.get(URL)
+    assert response.json()['total_transactions'] == len(half)
+    assert response.headers['x-dataset-version'] == result['dataset_version']
+
+
+def test_failed_reload_keeps_serving(client, serve, tmp_path):
+    before = client.get(URL)
+    # The reload endpoint answers a failed load with a 500 carrying the outcome
+    result = serve(tmp_path / 'missing.csv')['detail']
+    assert result['status'] == 'failed' and result['dataset_version'] == before.headers['x-dataset-version']
+    assert client.get('/api/analytics/reload-status').json()['status'] == 'failed'
+    after = client.get(URL)
+    assert after.status_code == 200 and after.json() == before.json()
+
+
+def test_file_change_triggers_a_reload(client, dataset, serve, tmp_path):
+    path = _write(dataset.transactions, tmp_path / 'transactions.csv')
+    assert serve(path)['status'] == 'ok'
+    watcher = client.portal.start_task_soon(server._watch_data_files)
+    try:
+        time.sleep(0.5)
+        _write(dataset.transactions.iloc[:1000], path)
+        deadline = time.monotonic() + 10
+        while client.get('/api/analytics/reload-status').json()['reason'] != 'file-change':
+            assert time.monotonic() < deadline, "no reload after the file changed"
+            time.sleep(0.1)
+    finally:
+        watcher.cancel()
+    assert client.get(URL).json()['total_transactions'] == 1000
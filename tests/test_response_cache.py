@@ -0,0 +1,72 @@
+"""Rendered responses are cached per dataset version and revalidated with ETags"""
+
+import io
+import time
+
+import server
+from dataset_io import SINKS, write_dataset
+from response_cache import CachedResponse, ResponseCache, etag_matches
+
+URL = '/api/analytics/overview'
+
+
+def _stale_entries():
+    return [key for key in server.response_cache._entries if key[-1] != server.dataset_version]
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0.05)
+    for key in 'abc':
+        cache.put(key, CachedResponse(key.encode()))
+    assert cache.get('a') is None and cache.get('c').body == b'c'
+    time.sleep(0.06)
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['expirations'] == 1
+
+
+def test_etag_matches():
+    etag = CachedResponse(b'{}').etag
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag) and not etag_matches(None, etag)
+
+
+def test_if_none_match_returns_304(client):
+    response = client.get(URL)
+    etag = response.headers['etag']
+    before = client.get('/api/analytics/cache-stats').json()
+
+    revalidated = client.get(URL, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+    assert revalidated.headers['etag'] == etag
+    assert client.get(URL, headers={'If-None-Match': '"other"'}).status_code == 200
+
+    stats = client.get('/api/analytics/cache-stats').json()
+    assert stats['not_modified'] == before['not_modified'] + 1
+    assert stats['hits'] == before['hits'] + 2 and stats['misses'] == before['misses']
+
+
+def test_ingest_invalidates_cached_responses(client, dataset, serve):
+    response = client.get(URL)
+    buffer = io.BytesIO()
+    dataset.transactions.iloc[:100].to_csv(buffer, index=False)
+    client.post('/api/analytics/ingest', files={'file': ('batch.csv', buffer.getvalue(), 'text/csv')})
+
+    after = client.get(URL, headers={'If-None-Match': response.headers['etag']})
+    assert after.status_code == 200
+    assert after.headers['x-dataset-version'] != response.headers['x-dataset-version']
+    assert after.json()['total_transactions'] == response.json()['total_transactions'] + 100
+    assert not _stale_entries()
+
+
+def test_reload_invalidates_cached_responses(client, dataset, serve, tmp_path):
+    response = client.get(URL)
+    half = dataset.transactions.iloc[:len(dataset.transactions) // 2]
+    write_dataset([half], SINKS['csv'](tmp_path / 'transactions.csv'))
+    assert serve(tmp_path / 'transactions.csv')['status'] == 'ok'
+
+    after = client.get(URL, headers={'If-None-Match': response.headers['etag']})
+    assert after.status_code == 200
+    assert after.json()['total_transactions'] == len(half)
+    assert not _stale_entries()
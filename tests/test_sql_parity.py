@@ -0,0 +1,23 @@
+"""The DuckDB backend answers every endpoint like the pandas engine, whatever the file format"""
+
+import pandas as pd
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+from dataset_io import read_transactions
+from sql_backend import SqlAnalytics, check_parity
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet', 'arrow'])
+def test_backends_match(dataset, file_format):
+    path = dataset.paths[file_format]
+    customers = pd.read_csv(dataset.customers_path)
+    pandas_engine = CreditCardAnalytics(read_transactions(path), customers, dataset.campaigns)
+    sql_engine = SqlAnalytics(path, dataset.customers_path, campaigns=dataset.campaigns)
+    assert check_parity(pandas_engine, sql_engine) == []
+
+
+def test_backends_match_with_default_campaign(dataset):
+    path = dataset.paths['csv']
+    pandas_engine = CreditCardAnalytics(read_transactions(path), pd.read_csv(dataset.customers_path))
+    assert check_parity(pandas_engine, SqlAnalytics(path, dataset.customers_path)) == []
@@ -0,0 +1,80 @@
+"""The binary store cache: built once per source version, memory-mapped on later loads"""
+
+import shutil
+
+import pytest
+
+from analytics_engine import CreditCardAnalytics, normalize_transactions
+from dataset_io import SINKS, read_transactions, write_dataset
+from store_cache import CACHE_SUFFIX, is_mapped, load_store
+from .conftest import assert_engines_match
+
+
+def _counting_build(path):
+    calls = []
+
+    def build():
+        calls.append(path)
+        return normalize_transactions(read_transactions(path))
+    return build, calls
+
+
+@pytest.fixture
+def source(dataset, tmp_path):
+    path = tmp_path / 'transactions.csv'
+    shutil.copy(dataset.paths['csv'], path)
+    return path
+
+
+def _caches(path):
+    return sorted(path.parent.glob(f".{path.name}.*{CACHE_SUFFIX}"))
+
+
+def test_second_load_maps_the_cache(source):
+    build, calls = _counting_build(source)
+    store, customer_ids = load_store(source, build)
+    cached, cached_ids = load_store(source, build)
+    assert len(calls) == 1 and len(_caches(source)) == 1
+    assert all(is_mapped(cached[column].array.codes if hasattr(cached[column], 'cat') else cached[column].to_numpy())
+               for column in cached.columns)
+    assert cached.equals(store) and (cached_ids == customer_ids).all()
+
+
+def test_changed_source_rebuilds_and_drops_the_stale_cache(dataset, source):
+    build, calls = _counting_build(source)
+    load_store(source, build)
+    stale = _caches(source)
+    write_dataset([dataset.transactions.iloc[:1000]], SINKS['csv'](source))
+    store, _ = load_store(source, build)
+    assert len(calls) == 2 and len(store) == 1000
+    assert len(_caches(source)) == 1 and _caches(source) != stale
+
+
+def test_unreadable_cache_is_rebuilt(source):
+    build, calls = _counting_build(source)
+    load_store(source, build)
+    (_caches(source)[0] / 'columns.json').unlink()
+    store, _ = load_store(source, build)
+    assert len(calls) == 2 and len(store) > 0
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_engine_from_the_mapped_store(dataset, engine, tmp_path, file_format):
+    path = tmp_path / dataset.paths[file_format].name
+    copy = shutil.copytree if dataset.paths[file_format].is_dir() else shutil.copy
+    copy(dataset.paths[file_format], path)
+    CreditCardAnalytics.from_path(path, dataset.customers, campaigns=dataset.campaigns)
+    mapped = CreditCardAnalytics.from_path(path, dataset.customers, campaigns=dataset.campaigns)
+    assert is_mapped(mapped.transactions['amount_cents'].to_numpy())
+    assert_engines_match(engine, mapped)
+
+
+def test_ingest_leaves_the_mapped_files_unchanged(dataset, source):
+    # The first load writes the cache, the second maps it
+    CreditCardAnalytics.from_path(source, dataset.customers, campaigns=dataset.campaigns)
+    mapped = CreditCardAnalytics.from_path(source, dataset.customers, campaigns=dataset.campaigns)
+    cents = mapped.transactions['amount_cents'].to_numpy().copy()
+    mapped.ingest(dataset.transactions.iloc[:100])
+    assert mapped.get_overview_metrics()['total_transactions'] == len(dataset.transactions) + 100
+    reloaded = CreditCardAnalytics.from_path(source, dataset.customers, campaigns=dataset.campaigns)
+    assert (reloaded.transactions['amount_cents'].to_numpy() == cents).all()
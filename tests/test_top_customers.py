@@ -0,0 +1,51 @@
+"""Top customers by partial selection match a full sort of per-customer spend"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _sorted_codes(spend, customers):
+    """Customer codes by spend descending, ties by code, from a full stable argsort"""
+    return customers[np.argsort(-spend[customers], kind='stable')]
+
+
+@pytest.mark.parametrize('n', [1, 7, 50, 299, 300, 1000])
+def test_top_spenders_match_full_argsort_with_ties(engine, n):
+    features = copy.deepcopy(engine.cube.customers)
+    # Few distinct values, so the n-th highest spend is shared by many customers
+    features.spend_cents = np.random.default_rng(n).integers(0, 12, len(features.spend_cents)) * 1000
+    everyone = np.arange(len(features.spend_cents))
+    assert features.top_spenders(n).tolist() == _sorted_codes(features.spend_cents, everyone)[:n].tolist()
+
+    subset = np.flatnonzero(everyone % 3 == 1)
+    assert features.top_spenders(n, subset).tolist() == _sorted_codes(features.spend_cents, subset)[:n].tolist()
+    assert features.top_spenders(n, subset[:0]).tolist() == []
+
+
+@pytest.mark.parametrize('n,segment,region', [(20, None, None), (5, ['Gold'], None), (40, None, ['West', 'Midwest']),
+                                              (10, ['Platinum', 'Bronze'], ['Northeast']), (1000, None, None),
+                                              (3, ['Nope'], None)])
+def test_top_customers_match_pandas(dataset, engine, n, segment, region):
+    transactions = dataset.transactions
+    spend = transactions.groupby('customer_id').agg(
+        transaction_count=('amount', 'size'), total_spend=('amount', 'sum'),
+        customer_segment=('customer_segment', 'last'), region=('region', 'last')).reset_index()
+    if segment is not None:
+        spend = spend[spend['customer_segment'].isin(segment)]
+    if region is not None:
+        spend = spend[spend['region'].isin(region)]
+    expected = spend.sort_values(['total_spend', 'customer_id'], ascending=[False, True]).head(n)
+
+    actual = pd.DataFrame(engine.get_top_customers(n, segment, region), columns=['customer_id', 'total_spend',
+                                                                               'transaction_count'])
+    assert actual['customer_id'].tolist() == expected['customer_id'].tolist()
+    assert actual['transaction_count'].tolist() == expected['transaction_count'].tolist()
+    np.testing.assert_allclose(actual['total_spend'].astype(float), expected['total_spend'], atol=1e-6)
+
+
+def test_invalid_count(engine):
+    with pytest.raises(ValueError):
+        engine.get_top_customers(0)
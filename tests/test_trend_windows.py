@@ -0,0 +1,58 @@
+"""Trend windows from the time series match a pandas rolling/pct_change/cumsum over the transactions"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_engine import CreditCardAnalytics
+from .conftest import assert_close
+
+FREQUENCIES = {'day': 'D', 'week': 'W-MON', 'month': 'MS'}
+
+
+def _trend_windows(transactions, granularity, window, lag):
+    dates = pd.to_datetime(transactions['transaction_date'])
+    if granularity == 'week':
+        periods = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    else:
+        periods = dates.dt.to_period(FREQUENCIES[granularity][0]).dt.start_time
+    spend = transactions['amount'].groupby([transactions['category'], periods]).sum().unstack(fill_value=0)
+    calendar = pd.date_range(periods.min(), periods.max(), freq=FREQUENCIES[granularity])
+    spend = spend.reindex(columns=calendar, fill_value=0)
+    return pd.DataFrame({
+        'total_spend': spend.stack(),
+        'moving_avg_spend': spend.T.rolling(window, min_periods=1).mean().T.round(2).stack(),
+        'growth_percentage': (spend.T.pct_change(lag, fill_method=None) * 100).T.replace(np.inf, np.nan).round(2).stack(),
+        'cumulative_spend': spend.cumsum(axis=1).stack(),
+    })
+
+
+def _frame(result):
+    frame = pd.DataFrame(result)
+    frame.index = pd.MultiIndex.from_arrays([frame.pop('category'), pd.to_datetime(frame.pop('period'))])
+    return frame
+
+
+@pytest.mark.parametrize('granularity, window, lag', [('month', 3, 1), ('week', 4, 2), ('day', 7, 7)])
+def test_trend_windows_match_pandas(dataset, engine, granularity, window, lag):
+    expected = _trend_windows(dataset.transactions, granularity, window, lag)
+    actual = _frame(engine.get_trend_windows(granularity, window, lag)).reindex(expected.index)
+    for column in expected.columns:
+        np.testing.assert_allclose(actual[column], expected[column], atol=0.011, err_msg=column)
+
+
+def test_trend_windows_after_ingest(dataset, engine):
+    transactions = dataset.transactions
+    incremental = CreditCardAnalytics(transactions[transactions['transaction_date'] < '2024-07-01'],
+                                      dataset.customers, dataset.campaigns)
+    incremental.get_trend_windows('week')
+    incremental.ingest(transactions[transactions['transaction_date'] >= '2024-07-01'])
+    for granularity in ['day', 'week', 'month']:
+        assert_close(engine.get_trend_windows(granularity), incremental.get_trend_windows(granularity), granularity)
+
+
+@pytest.mark.parametrize('params, status', [({'granularity': 'fortnight'}, 400), ({'window': 0}, 422),
+                                            ({'granularity': 'week', 'window': 5, 'lag': 2}, 200)])
+def test_trend_windows_endpoint(client, params, status):
+    response = client.get('/api/analytics/trend-windows', params=params)
+    assert response.status_code == status